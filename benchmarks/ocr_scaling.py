@@ -0,0 +1,70 @@
+"""
+Scaling curve of process_batch_for_ocr over worker counts.
+
+Builds a synthetic batch of frames with a text overlay in each ROI and times
+the serial path against thread and process pools of increasing size:
+
+    python -m benchmarks.ocr_scaling --frames 200 --rois 4 --workers 1 2 4 8 16 32
+"""
+import argparse
+import time
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from src.config_manager import ROI
+from src.ocr_processor import PytesseractEngine, process_batch_for_ocr
+from src.video_processor import FrameBatch
+
+
+def _synthetic_batch(frame_count: int, roi_count: int) -> Tuple[FrameBatch, List[ROI]]:
+    roi_w, roi_h = 320, 40
+    rois = [ROI(0, i * roi_h, roi_w, roi_h) for i in range(roi_count)]
+    batch = FrameBatch(clip_id=1)
+    for n in range(frame_count):
+        frame = np.zeros((roi_h * roi_count, roi_w, 3), dtype=np.uint8)
+        for i, roi in enumerate(rois):
+            cv2.putText(frame, f"{n:05d} 12.{i}34 km/h", (4, roi.y + 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.9, (255, 255, 255), 2)
+        batch.add_frame(frame, timestamp=n / 10.0)
+    return batch, rois
+
+
+def _time_run(
+    batch: FrameBatch,
+    rois: List[ROI],
+    executor: Optional[str],
+    workers: Optional[int],
+    chunksize: int
+) -> float:
+    start = time.perf_counter()
+    process_batch_for_ocr(batch, rois, 0.0, executor=executor, workers=workers,
+                          chunksize=chunksize, warmup=True,
+                          engine_factory=PytesseractEngine)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--rois", type=int, default=4)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--executors", nargs="+", default=["thread", "process"])
+    parser.add_argument("--chunksize", type=int, default=4)
+    args = parser.parse_args()
+
+    batch, rois = _synthetic_batch(args.frames, args.rois)
+    crops = args.frames * args.rois
+    serial = _time_run(batch, rois, None, None, args.chunksize)
+    print(f"{crops} crops, serial: {serial:.2f}s ({crops / serial:.1f} crops/s)")
+    print(f"{'executor':<10}{'workers':>8}{'seconds':>10}{'crops/s':>10}{'speedup':>9}")
+    for executor in args.executors:
+        for workers in args.workers:
+            elapsed = _time_run(batch, rois, executor, workers, args.chunksize)
+            print(f"{executor:<10}{workers:>8}{elapsed:>10.2f}"
+                  f"{crops / elapsed:>10.1f}{serial / elapsed:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Full-resolution vs. low-resolution scene detection on real footage.
+
+For each video, runs detect_clips at full resolution and with the
+downscaled analysis settings, then reports both run times and whether
+every cut matches within one frame:
+
+    python -m benchmarks.scene_detection footage/*.mp4 --analysis-width 160 --threads 2
+"""
+import argparse
+import time
+from typing import List, Tuple
+
+import cv2
+
+from src.video_handler import Video
+from src.video_processor import Clip, detect_clips
+
+
+def _probe(path: str) -> Tuple[float, float, Tuple[int, int]]:
+    """
+    Return (fps, duration, resolution) of `path`.
+    """
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise SystemExit(f"Cannot open {path}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    frames = capture.get(cv2.CAP_PROP_FRAME_COUNT)
+    resolution = (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                  int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    capture.release()
+    return fps, frames / fps, resolution
+
+
+def _cuts(clips: List[Clip]) -> List[float]:
+    return [clip.start_time for clip in clips[1:]]
+
+
+def match_cuts(
+    reference: List[float],
+    candidate: List[float],
+    tolerance: float
+) -> Tuple[List[float], List[float]]:
+    """
+    Pair cuts greedily in time order. Returns (cuts only in `reference`,
+    cuts only in `candidate`) after removing pairs within `tolerance` seconds.
+    """
+    missed, extra = [], []
+    i = j = 0
+    while i < len(reference) and j < len(candidate):
+        if abs(reference[i] - candidate[j]) <= tolerance:
+            i += 1
+            j += 1
+        elif reference[i] < candidate[j]:
+            missed.append(reference[i])
+            i += 1
+        else:
+            extra.append(candidate[j])
+            j += 1
+    return missed + reference[i:], extra + candidate[j:]
+
+
+def _timed(video: Video, threshold: float, **kwargs) -> Tuple[float, List[float]]:
+    start = time.perf_counter()
+    clips = detect_clips(video, scene_threshold=threshold, **kwargs)
+    return time.perf_counter() - start, _cuts(clips)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--threshold", type=float, default=0.4)
+    parser.add_argument("--analysis-width", type=int, default=160)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--lowres", type=int, default=0)
+    args = parser.parse_args()
+
+    all_match = True
+    for path in args.videos:
+        fps, duration, resolution = _probe(path)
+        video = Video("file", path, None, duration, resolution, "")
+        full_time, full_cuts = _timed(video, args.threshold)
+        low_time, low_cuts = _timed(
+            video, args.threshold, analysis_width=args.analysis_width,
+            threads=args.threads, lowres=args.lowres)
+        missed, extra = match_cuts(full_cuts, low_cuts, tolerance=1.0 / fps)
+        all_match = all_match and not missed and not extra
+
+        print(f"{path}: {resolution[0]}x{resolution[1]} @ {fps:.2f} fps, {duration:.0f}s")
+        print(f"  full res: {full_time:8.2f}s  {len(full_cuts)} cuts")
+        print(f"  {args.analysis_width:>4} px : {low_time:8.2f}s  {len(low_cuts)} cuts"
+              f"  ({full_time / low_time:.1f}x faster)")
+        if missed or extra:
+            print(f"  mismatched cuts: missed {missed}, extra {extra}")
+        else:
+            print("  cut lists match within one frame")
+    raise SystemExit(0 if all_match else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 import json
 import os
-from typing import List
+from typing import List, Optional
 
 
 class ROI:
@@ -8,36 +8,66 @@ class ROI:
     y: int
     width: int
     height: int
-
-    def __init__(self, x: int, y: int, width: int, height: int) -> None:
+    sample_interval: Optional[float]
+    static: bool
+
+    def __init__(
+        self,
+        x: int,
+        y: int,
+        width: int,
+        height: int,
+        sample_interval: Optional[float] = None,
+        static: bool = False
+    ) -> None:
         """
         Create an ROI rectangle.
+
+        Optional OCR schedule: `sample_interval` is the minimum number of
+        seconds between OCR runs of this ROI (None: every sampled frame);
+        `static` marks a field that never changes, OCR'd once per clip.
         """
         if not all(isinstance(v, int) for v in (x, y, width, height)):
             raise ValueError(
                 "ROI coordinates and dimensions must be integers.")
         if width <= 0 or height <= 0:
             raise ValueError("ROI width and height must be positive integers.")
+        if sample_interval is not None and (
+                isinstance(sample_interval, bool)
+                or not isinstance(sample_interval, (int, float))
+                or sample_interval <= 0):
+            raise ValueError("ROI sample_interval must be a positive number.")
+        if not isinstance(static, bool):
+            raise ValueError("ROI static must be a boolean.")
         self.x = x
         self.y = y
         self.width = width
         self.height = height
+        self.sample_interval = sample_interval
+        self.static = static
 
     def to_dict(self) -> dict:
         """
-        Return {"x": x, "y": y, "width": width, "height": height}.
+        Return {"x": x, "y": y, "width": width, "height": height}, plus
+        "sample_interval" and "static" when they are set.
         """
-        return {
+        d = {
             "x": self.x,
             "y": self.y,
             "width": self.width,
             "height": self.height,
         }
+        if self.sample_interval is not None:
+            d["sample_interval"] = self.sample_interval
+        if self.static:
+            d["static"] = True
+        return d
 
     @staticmethod
     def from_dict(d: dict) -> "ROI":
         """
-        Construct ROI from a dictionary with keys "x", "y", "width", "height".
+        Construct ROI from a dictionary with keys "x", "y", "width", "height"
+        and optional "sample_interval" and "static".
         Raises ValueError if any key missing or not int, or width/height <= 0.
         """
         required_keys = ("x", "y", "width", "height")
@@ -56,7 +86,9 @@ class ROI:
         if width <= 0 or height <= 0:
             raise ValueError("ROI width and height must be positive integers.")
 
-        return ROI(x, y, width, height)
+        return ROI(x, y, width, height,
+                   sample_interval=d.get("sample_interval"),
+                   static=d.get("static", False))
 
 
 class AppConfig:
@@ -3,13 +3,14 @@
 import sqlite3
 import csv
 import os
-from typing import List, Dict, Optional, Union
+from array import array
+from typing import List, Dict, Optional, Sequence, Tuple, Union
 
 
 class DBManager:
     """
     Manages connection, schema creation, and CRUD operations for a SQLite database
-    with tables: Videos, Clips, and Watermarks.
+    with tables: Videos, Clips, Watermarks, VideoIndexes, and SceneScores.
     """
 
     def __init__(self, db_path: str = "watermarks.db") -> None:
@@ -36,7 +37,7 @@ class DBManager:
 
     def _create_tables(self) -> None:
         """
-        Run the three CREATE TABLE IF NOT EXISTS statements in a single transaction.
+        Run the CREATE TABLE IF NOT EXISTS statements in a single transaction.
         Raises:
           - sqlite3.Error on SQL syntax or I/O errors.
         """
@@ -78,12 +79,38 @@ class DBManager:
         );
         """
 
+        # Per-video packet index: float64 PTS values and uint8 keyframe flags,
+        # sorted by PTS and packed as native-endian arrays
+        create_video_indexes = """
+        CREATE TABLE IF NOT EXISTS VideoIndexes (
+            video_id       INTEGER PRIMARY KEY REFERENCES Videos(video_id) ON DELETE CASCADE,
+            packet_count   INTEGER NOT NULL CHECK (packet_count >= 0),
+            pts_times      BLOB    NOT NULL,
+            keyframe_flags BLOB    NOT NULL
+        );
+        """
+
+        # Per-video scene-change score of every frame: float64 PTS values and
+        # float32 scores packed as native-endian arrays, plus the analysis
+        # settings they were computed with
+        create_scene_scores = """
+        CREATE TABLE IF NOT EXISTS SceneScores (
+            video_id    INTEGER PRIMARY KEY REFERENCES Videos(video_id) ON DELETE CASCADE,
+            settings    TEXT    NOT NULL,
+            frame_count INTEGER NOT NULL CHECK (frame_count >= 0),
+            pts_times   BLOB    NOT NULL,
+            scores      BLOB    NOT NULL
+        );
+        """
+
         try:
             cursor = self.conn.cursor()
             cursor.execute("BEGIN TRANSACTION;")
             cursor.execute(create_videos)
             cursor.execute(create_clips)
             cursor.execute(create_watermarks)
+            cursor.execute(create_video_indexes)
+            cursor.execute(create_scene_scores)
             cursor.execute("COMMIT;")
         except sqlite3.Error:
             # Roll back if anything fails
@@ -279,6 +306,141 @@ class DBManager:
         except sqlite3.Error:
             raise
 
+    def save_video_index(
+        self,
+        video_id: int,
+        pts_times: Sequence[float],
+        keyframe_flags: Sequence[bool],
+    ) -> None:
+        """
+        Store (or replace) the packet PTS/keyframe index of a video.
+        Preconditions:
+          - video_id must exist in Videos (FK).
+          - pts_times and keyframe_flags have the same length.
+        Raises:
+          - ValueError on invalid argument values.
+          - sqlite3.IntegrityError on FK violation.
+          - sqlite3.Error on other DB errors.
+        """
+        if not isinstance(video_id, int) or video_id < 1:
+            raise ValueError("video_id must be a positive integer")
+        if len(pts_times) != len(keyframe_flags):
+            raise ValueError(
+                "pts_times and keyframe_flags must have the same length")
+
+        pts_blob = array("d", pts_times).tobytes()
+        flags_blob = array("B", (1 if f else 0 for f in keyframe_flags)).tobytes()
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                """
+                INSERT OR REPLACE INTO VideoIndexes (
+                    video_id, packet_count, pts_times, keyframe_flags
+                ) VALUES (?, ?, ?, ?)
+                """,
+                (video_id, len(pts_times), pts_blob, flags_blob),
+            )
+            self.conn.commit()
+        except sqlite3.Error:
+            raise
+
+    def get_video_index(
+        self,
+        video_id: int,
+    ) -> Optional[Tuple[array, array]]:
+        """
+        Return (pts_times, keyframe_flags) for a video as array('d') and
+        array('B'), or None if no index has been stored.
+        Raises:
+          - sqlite3.Error on query failure.
+        """
+        if not isinstance(video_id, int):
+            raise ValueError("video_id must be an integer")
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                "SELECT pts_times, keyframe_flags FROM VideoIndexes WHERE video_id = ?",
+                (video_id,),
+            )
+            row = cursor.fetchone()
+        except sqlite3.Error:
+            raise
+        if row is None:
+            return None
+        pts_times = array("d")
+        pts_times.frombytes(row[0])
+        keyframe_flags = array("B")
+        keyframe_flags.frombytes(row[1])
+        return pts_times, keyframe_flags
+
+    def save_scene_scores(
+        self,
+        video_id: int,
+        settings: str,
+        pts_times: Sequence[float],
+        scores: Sequence[float],
+    ) -> None:
+        """
+        Store (or replace) the per-frame scene scores of a video, computed
+        with analysis `settings` (an opaque string).
+        Preconditions:
+          - video_id must exist in Videos (FK).
+          - pts_times and scores have the same length.
+        Raises:
+          - ValueError on invalid argument values.
+          - sqlite3.IntegrityError on FK violation.
+          - sqlite3.Error on other DB errors.
+        """
+        if not isinstance(video_id, int) or video_id < 1:
+            raise ValueError("video_id must be a positive integer")
+        if len(pts_times) != len(scores):
+            raise ValueError("pts_times and scores must have the same length")
+
+        pts_blob = array("d", pts_times).tobytes()
+        scores_blob = array("f", scores).tobytes()
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                """
+                INSERT OR REPLACE INTO SceneScores (
+                    video_id, settings, frame_count, pts_times, scores
+                ) VALUES (?, ?, ?, ?, ?)
+                """,
+                (video_id, settings, len(pts_times), pts_blob, scores_blob),
+            )
+            self.conn.commit()
+        except sqlite3.Error:
+            raise
+
+    def get_scene_scores(
+        self,
+        video_id: int,
+    ) -> Optional[Tuple[str, array, array]]:
+        """
+        Return (settings, pts_times, scores) for a video, the arrays as
+        array('d') and array('f'), or None if no scores have been stored.
+        Raises:
+          - sqlite3.Error on query failure.
+        """
+        if not isinstance(video_id, int):
+            raise ValueError("video_id must be an integer")
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                "SELECT settings, pts_times, scores FROM SceneScores WHERE video_id = ?",
+                (video_id,),
+            )
+            row = cursor.fetchone()
+        except sqlite3.Error:
+            raise
+        if row is None:
+            return None
+        pts_times = array("d")
+        pts_times.frombytes(row[1])
+        scores = array("f")
+        scores.frombytes(row[2])
+        return row[0], pts_times, scores
+
     def query_watermarks(
         self,
         text_filter: Optional[str] = None,
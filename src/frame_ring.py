@@ -0,0 +1,152 @@
+import multiprocessing
+import queue
+import time
+from concurrent.futures import CancelledError
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+# How often acquire() checks its cancel event while waiting for a slot
+_CANCEL_POLL_SECONDS = 0.1
+
+
+class SharedFrameRing:
+    """
+    A fixed pool of equally shaped frame slots in one
+    multiprocessing.shared_memory block, for passing frames (or ROI crops)
+    between processes without pickling them.
+
+    A producer acquire()s a free slot, write()s a frame into it and sends only
+    the slot index over a queue; the consumer reads it as a zero-copy numpy
+    view() and release()s the slot when done. Free slot indices travel on a
+    multiprocessing queue, so acquire() blocks while all slots are in use.
+
+    The ring is created in the parent process and handed to workers at
+    process creation (Process args or a pool initializer); the worker side
+    attaches to the same block by name.
+    """
+
+    def __init__(
+        self,
+        slot_shape: Tuple[int, ...],
+        slots: int,
+        dtype: np.dtype = np.uint8,
+        ctx: Optional[multiprocessing.context.BaseContext] = None
+    ) -> None:
+        if slots < 1:
+            raise ValueError("slots must be at least 1")
+        if not slot_shape or any(d <= 0 for d in slot_shape):
+            raise ValueError("slot_shape dimensions must be positive")
+        ctx = ctx or multiprocessing.get_context()
+
+        self.slot_shape = tuple(int(d) for d in slot_shape)
+        self.slots = slots
+        self.dtype = np.dtype(dtype)
+        slot_size = int(np.prod(self.slot_shape)) * self.dtype.itemsize
+        self._shm = shared_memory.SharedMemory(create=True, size=slot_size * slots)
+        self._owner = True
+        self._free = ctx.Queue()
+        for slot in range(slots):
+            self._free.put(slot)
+        self._array = self._make_array()
+
+    def __reduce__(self):
+        return (_attach_ring, (self._shm.name, self.slot_shape, self.slots,
+                               self.dtype.str, self._free))
+
+    def __enter__(self) -> "SharedFrameRing":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+        if self._owner:
+            self.unlink()
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def _make_array(self) -> np.ndarray:
+        return np.ndarray((self.slots,) + self.slot_shape,
+                          dtype=self.dtype, buffer=self._shm.buf)
+
+    def acquire(self, timeout: Optional[float] = None, cancel=None) -> int:
+        """
+        Take a free slot index, blocking until one is released.
+        Raises TimeoutError if `timeout` seconds pass first, or
+        CancelledError once `cancel` (a multiprocessing Event) is set, so a
+        producer cannot block forever on a consumer that stopped releasing.
+        """
+        if cancel is None:
+            try:
+                return self._free.get(timeout=timeout)
+            except queue.Empty:
+                raise TimeoutError("No free frame slot available.")
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not cancel.is_set():
+            wait = _CANCEL_POLL_SECONDS
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    raise TimeoutError("No free frame slot available.")
+            try:
+                return self._free.get(timeout=wait)
+            except queue.Empty:
+                continue
+        raise CancelledError("Frame slot acquisition was cancelled.")
+
+    def release(self, slot: int) -> None:
+        """
+        Return `slot` to the free pool.
+        """
+        self._free.put(slot)
+
+    def write(self, slot: int, frame: np.ndarray) -> None:
+        """
+        Copy `frame` into `slot`. Raises ValueError on a shape mismatch.
+        """
+        if frame.shape != self.slot_shape:
+            raise ValueError(
+                f"Frame shape {frame.shape} does not match slot shape {self.slot_shape}")
+        np.copyto(self._array[slot], frame)
+
+    def view(self, slot: int) -> np.ndarray:
+        """
+        Zero-copy view of `slot`; only valid until the slot is released.
+        """
+        return self._array[slot]
+
+    def close(self) -> None:
+        """
+        Detach this process from the shared block.
+        """
+        self._array = None  # type: ignore
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """
+        Free the shared block. Call once, from the creating process.
+        """
+        self._shm.unlink()
+
+
+def _attach_ring(
+    name: str,
+    slot_shape: Tuple[int, ...],
+    slots: int,
+    dtype: str,
+    free: "multiprocessing.Queue[int]"
+) -> SharedFrameRing:
+    ring = SharedFrameRing.__new__(SharedFrameRing)
+    ring.slot_shape = slot_shape
+    ring.slots = slots
+    ring.dtype = np.dtype(dtype)
+    # Workers share the parent's resource tracker, so attaching here does not
+    # transfer ownership; only the creating process unlinks the block
+    ring._shm = shared_memory.SharedMemory(name=name)
+    ring._owner = False
+    ring._free = free
+    ring._array = ring._make_array()
+    return ring
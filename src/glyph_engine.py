@@ -0,0 +1,312 @@
+import hashlib
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Size every segmented glyph is normalized to before matching: (width, height)
+GLYPH_SIZE = (12, 20)
+
+DEFAULT_PROFILE_DIR = "glyph_profiles"
+
+
+def _binarize(gray: np.ndarray) -> np.ndarray:
+    """
+    Otsu-threshold a grayscale crop to a boolean ink mask. Ink is taken to be
+    the minority class, so light-on-dark and dark-on-light overlays both work.
+    """
+    if gray.ndim == 3:
+        gray = cv2.cvtColor(gray, cv2.COLOR_BGR2GRAY)
+    _, binary = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    ink = binary.astype(bool)
+    if ink.mean() > 0.5:
+        ink = ~ink
+    return ink
+
+
+def segment_glyphs(
+    gray: np.ndarray,
+    space_ratio: float = 0.5
+) -> Tuple[List[Tuple[int, int]], List[bool], Tuple[int, int]]:
+    """
+    Split a single-line crop into character cells by column projection.
+
+    Returns (spans, space_before, (top, bottom)): the [start, end) column
+    span of each glyph, whether it starts more than (1 + `space_ratio`)
+    times the median glyph advance after the previous glyph's start (a word
+    break; measuring start to start keeps narrow glyphs such as "." in a
+    fixed-pitch font from looking like spaces), and the row band glyphs are cut
+    from. The band is the crop's full height, not each glyph's own ink, so
+    that e.g. "." and "-" keep their different vertical positions; with a
+    fixed overlay position the ROI frames every glyph the same way.
+    """
+    ink = _binarize(gray)
+    top, bottom = 0, ink.shape[0]
+    columns = ink.any(axis=0).astype(np.int8)
+    if not columns.any():
+        return [], [], (top, bottom)
+    edges = np.diff(np.concatenate(([0], columns, [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    spans = list(zip(starts.tolist(), ends.tolist()))
+
+    advances = np.diff(starts)
+    if advances.size == 0:
+        return spans, [False], (top, bottom)
+    max_advance = (1.0 + space_ratio) * float(np.median(advances))
+    space_before = [False] + (advances > max_advance).tolist()
+    return spans, space_before, (top, bottom)
+
+
+def _glyph_vectors(
+    ink: np.ndarray,
+    spans: List[Tuple[int, int]],
+    band: Tuple[int, int]
+) -> np.ndarray:
+    """
+    Resize each glyph cell to GLYPH_SIZE and return zero-mean, unit-norm
+    row vectors, so a dot product is a normalized cross-correlation.
+    """
+    top, bottom = band
+    cells = [
+        cv2.resize(ink[top:bottom, start:end].astype(np.float32), GLYPH_SIZE,
+                   interpolation=cv2.INTER_AREA).ravel()
+        for start, end in spans
+    ]
+    if not cells:
+        return np.zeros((0, GLYPH_SIZE[0] * GLYPH_SIZE[1]), dtype=np.float32)
+    vectors = np.stack(cells)
+    vectors -= vectors.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-6)
+
+
+class GlyphTemplateEngine:
+    """
+    OCR engine for fixed bitmap-font overlays, such as dashcam watermarks.
+
+    Characters are segmented by column projection and classified by
+    normalized cross-correlation against one learned template per
+    character, all glyphs of a crop in a single matrix product. Templates
+    are learned from crops labelled by another engine (learn) or by hand
+    (learn_labelled), and can be saved per camera profile.
+
+    A crop with any glyph scoring below `min_confidence`, or with no
+    templates learned yet, is handed to `fallback` (e.g. PytesseractEngine)
+    when one is given. image_to_data returns word rows in pytesseract's
+    Output.DICT layout, so the engine can be passed as `engine` to
+    process_frame_for_ocr and friends.
+
+    `glyph_calls` and `fallback_calls` count crops answered by each path.
+    """
+
+    def __init__(
+        self,
+        templates: Optional[Dict[str, np.ndarray]] = None,
+        fallback: Optional[Any] = None,
+        min_confidence: float = 0.8,
+        space_ratio: float = 0.5
+    ) -> None:
+        if not (0.0 <= min_confidence <= 1.0):
+            raise ValueError("min_confidence must be between 0.0 and 1.0")
+        self.fallback = fallback
+        self.min_confidence = min_confidence
+        self.space_ratio = space_ratio
+        self.glyph_calls = 0
+        self.fallback_calls = 0
+        self._lock = threading.Lock()
+        # Running sums of labelled glyph vectors, per character
+        self._sums: Dict[str, np.ndarray] = {}
+        self._counts: Dict[str, int] = {}
+        self._chars: List[str] = []
+        self._matrix = np.zeros((0, GLYPH_SIZE[0] * GLYPH_SIZE[1]), dtype=np.float32)
+        for char, template in (templates or {}).items():
+            self._sums[char] = np.asarray(template, dtype=np.float32).ravel()
+            self._counts[char] = 1
+        self._rebuild()
+
+    @property
+    def characters(self) -> List[str]:
+        return list(self._chars)
+
+    def cache_key(self) -> str:
+        """
+        Settings key for OCRCache: a digest of the learned templates plus
+        the matching settings and the fallback engine's own key.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        with self._lock:
+            for char in sorted(self._sums):
+                digest.update(char.encode())
+                digest.update(self._sums[char].tobytes())
+                digest.update(str(self._counts[char]).encode())
+        fallback = None
+        if self.fallback is not None:
+            fallback_key = getattr(self.fallback, "cache_key", None)
+            fallback = fallback_key() if callable(fallback_key) else type(self.fallback).__qualname__
+        return (f"GlyphTemplateEngine(templates={digest.hexdigest()}, "
+                f"min_confidence={self.min_confidence!r}, "
+                f"space_ratio={self.space_ratio!r}, fallback={fallback!r})")
+
+    def _rebuild(self) -> None:
+        self._chars = sorted(self._sums)
+        if not self._chars:
+            return
+        matrix = np.stack([self._sums[c] / self._counts[c] for c in self._chars])
+        matrix -= matrix.mean(axis=1, keepdims=True)
+        self._matrix = matrix / np.maximum(
+            np.linalg.norm(matrix, axis=1, keepdims=True), 1e-6)
+
+    def learn_labelled(self, crops: Iterable[np.ndarray], texts: Iterable[str]) -> int:
+        """
+        Add the glyphs of each crop to the templates of the characters in
+        its text. A crop is used only if its glyph count matches the number
+        of non-space characters in its text. Returns the number used.
+        """
+        used = 0
+        with self._lock:
+            for gray, text in zip(crops, texts):
+                chars = re.sub(r"\s+", "", text)
+                spans, _, band = segment_glyphs(gray, self.space_ratio)
+                if not chars or len(spans) != len(chars):
+                    continue
+                vectors = _glyph_vectors(_binarize(gray), spans, band)
+                for char, vector in zip(chars, vectors):
+                    if char in self._sums:
+                        self._sums[char] = self._sums[char] + vector
+                        self._counts[char] += 1
+                    else:
+                        self._sums[char] = vector.copy()
+                        self._counts[char] = 1
+                used += 1
+            self._rebuild()
+        return used
+
+    def learn(self, crops: Iterable[np.ndarray], engine: Optional[Any] = None) -> int:
+        """
+        Label `crops` with `engine` (default: the fallback engine) and learn
+        from them as in learn_labelled. A handful of frames covering every
+        character the overlay shows is enough.
+        """
+        labeller = engine if engine is not None else self.fallback
+        if labeller is None:
+            raise ValueError("learn needs an engine or a fallback engine to label crops")
+        crops = list(crops)
+        texts = []
+        for gray in crops:
+            data = labeller.image_to_data(gray)
+            texts.append(" ".join(str(t).strip() for t in data.get("text", [])
+                                  if str(t).strip()))
+        return self.learn_labelled(crops, texts)
+
+    def recognize(self, gray: np.ndarray) -> Tuple[List[str], List[float], List[Tuple[int, int, int, int]]]:
+        """
+        Classify the glyphs of `gray` against the templates. Returns the
+        words, the lowest glyph score (0-1) of each word and each word's box
+        as (left, top, width, height).
+        """
+        spans, space_before, band = segment_glyphs(gray, self.space_ratio)
+        if not spans or not self._chars:
+            return [], [], []
+        vectors = _glyph_vectors(_binarize(gray), spans, band)
+        scores = vectors @ self._matrix.T
+        best = scores.argmax(axis=1)
+        best_scores = np.clip(scores[np.arange(len(spans)), best], 0.0, 1.0)
+
+        words: List[str] = []
+        confs: List[float] = []
+        boxes: List[Tuple[int, int, int, int]] = []
+        top, bottom = band
+        for (start, end), new_word, index, score in zip(
+                spans, space_before, best, best_scores):
+            if new_word or not words:
+                words.append("")
+                confs.append(1.0)
+                boxes.append((start, top, 0, bottom - top))
+            words[-1] += self._chars[index]
+            confs[-1] = min(confs[-1], float(score))
+            left = boxes[-1][0]
+            boxes[-1] = (left, top, end - left, bottom - top)
+        return words, confs, boxes
+
+    def image_to_data(self, image: np.ndarray) -> Dict[str, list]:
+        words, confs, boxes = self.recognize(image)
+        if self.fallback is not None and (
+                not words or min(confs) < self.min_confidence):
+            self.fallback_calls += 1
+            return self.fallback.image_to_data(image)
+        self.glyph_calls += 1
+        return {
+            "text": words,
+            "conf": [100.0 * c for c in confs],
+            "left": [b[0] for b in boxes],
+            "top": [b[1] for b in boxes],
+            "width": [b[2] for b in boxes],
+            "height": [b[3] for b in boxes],
+        }
+
+    def save(self, path: str) -> None:
+        """
+        Write the learned templates to a compressed .npz file.
+        """
+        parent_dir = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent_dir, exist_ok=True)
+        with self._lock:
+            chars = sorted(self._sums)
+            np.savez_compressed(
+                path,
+                chars=np.array(chars, dtype=str),
+                sums=np.stack([self._sums[c] for c in chars]) if chars
+                else np.zeros((0, GLYPH_SIZE[0] * GLYPH_SIZE[1]), dtype=np.float32),
+                counts=np.array([self._counts[c] for c in chars], dtype=np.int64),
+                glyph_size=np.array(GLYPH_SIZE))
+
+    @classmethod
+    def load(cls, path: str, fallback: Optional[Any] = None, **kwargs: Any) -> "GlyphTemplateEngine":
+        """
+        Create an engine from templates written by save().
+        Raises ValueError if they were learned at a different GLYPH_SIZE.
+        """
+        with np.load(path) as data:
+            if tuple(data["glyph_size"]) != GLYPH_SIZE:
+                raise ValueError(f"Glyph templates in {path} have size "
+                                 f"{tuple(data['glyph_size'])}, expected {GLYPH_SIZE}")
+            engine = cls(fallback=fallback, **kwargs)
+            for char, sums, count in zip(data["chars"], data["sums"], data["counts"]):
+                engine._sums[str(char)] = sums.astype(np.float32)
+                engine._counts[str(char)] = int(count)
+        engine._rebuild()
+        return engine
+
+    @staticmethod
+    def profile_path(camera: str, profile_dir: str = DEFAULT_PROFILE_DIR) -> str:
+        """
+        Location of the glyph set of camera profile `camera`.
+        """
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", camera)
+        return os.path.join(profile_dir, f"{safe_name}.npz")
+
+    @classmethod
+    def for_camera(
+        cls,
+        camera: str,
+        fallback: Optional[Any] = None,
+        profile_dir: str = DEFAULT_PROFILE_DIR,
+        **kwargs: Any
+    ) -> "GlyphTemplateEngine":
+        """
+        Load the saved glyph set of `camera`, or return an empty engine (which
+        defers to `fallback` until it has learned) if there is none yet.
+        """
+        path = cls.profile_path(camera, profile_dir)
+        if os.path.isfile(path):
+            return cls.load(path, fallback=fallback, **kwargs)
+        return cls(fallback=fallback, **kwargs)
+
+    def save_for_camera(self, camera: str, profile_dir: str = DEFAULT_PROFILE_DIR) -> str:
+        path = self.profile_path(camera, profile_dir)
+        self.save(path)
+        return path
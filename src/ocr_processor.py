@@ -1,15 +1,33 @@
+import hashlib
 import logging
-from typing import List
+import os
+import re
+import shlex
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 import numpy as np
 import cv2
 import pytesseract
 from pytesseract import Output, TesseractNotFoundError
 
 from .config_manager import ROI
-from .video_processor import FrameBatch
+from .roi_plan import ROIPlan, compile_roi_plan, roi_key as _roi_key
+from .video_processor import FrameBatch, ROIFrameBatch
 
 logger = logging.getLogger(__name__)
 
+# Anything with image_to_data(image) -> Dict[str, list]; see PytesseractEngine
+OCREngine = Any
+
+EXECUTORS = ("thread", "process")
+CHANGE_METRICS = ("mad", "dhash")
+
 
 class OCRResult:
     """
@@ -38,6 +56,27 @@ class OCRResult:
         self.roi = roi
 
 
+class OCRStats:
+    """
+    Counters filled in by process_batch_for_ocr when passed as `stats`.
+    Counts accumulate across calls that share the object.
+
+      - ocr_calls: crops passed to the OCR engine.
+      - skipped_unchanged: crops not recognized because they matched the
+        previous crop of the same ROI (see `change_threshold`).
+      - skipped_schedule: crops not recognized because their ROI was not
+        due (see ROI.sample_interval and ROI.static).
+    """
+
+    def __init__(self) -> None:
+        self.ocr_calls = 0
+        self.skipped_unchanged = 0
+        self.skipped_schedule = 0
+
+    def reset(self) -> None:
+        self.__init__()  # type: ignore
+
+
 class ROIManager:
     """
     Manage a list of ROIs where OCR should be run.
@@ -46,7 +85,8 @@ class ROIManager:
     def __init__(self, initial_rois: List[ROI] = None) -> None:  # type: ignore
         if initial_rois:
             # Deep-copy provided ROIs
-            self.rois = [ROI(r.x, r.y, r.width, r.height)
+            self.rois = [ROI(r.x, r.y, r.width, r.height,
+                             sample_interval=r.sample_interval, static=r.static)
                          for r in initial_rois]
         else:
             self.rois = []
@@ -76,97 +116,951 @@ class ROIManager:
         return self.rois.copy()
 
 
+class PytesseractEngine:
+    """
+    Default OCR engine: one pytesseract.image_to_data call (and one
+    `tesseract` subprocess) per crop.
+
+    An OCR engine is any object with image_to_data(image) returning a dict
+    with at least "text" and "conf" lists, in pytesseract's Output.DICT
+    layout with confidences on a 0-100 scale. Engines used with an OCRCache
+    should also have cache_key(), a string naming every setting that can
+    change the text returned for a crop.
+    """
+
+    def __init__(self, lang: Optional[str] = None, config: str = "") -> None:
+        self.lang = lang
+        self.config = config
+
+    def cache_key(self) -> str:
+        return f"PytesseractEngine(lang={self.lang!r}, config={self.config!r})"
+
+    def image_to_data(self, image: np.ndarray) -> Dict[str, list]:
+        kwargs = {}
+        if self.lang:
+            kwargs["lang"] = self.lang
+        if self.config:
+            kwargs["config"] = self.config
+        return pytesseract.image_to_data(
+            image, output_type=Output.DICT, **kwargs)
+
+
+class TesseractBatchEngine:
+    """
+    OCR engine that recognizes many crops with one `tesseract` process.
+
+    image_to_data_batch writes the crops as PNGs to a temporary directory
+    (on tmpfs at /dev/shm when available), passes Tesseract a list file
+    naming them, and splits the TSV output back into one result per crop by
+    page number. Process startup and model loading are paid once per
+    `max_batch_size` crops instead of once per crop. Rows have the same
+    layout as pytesseract's Output.DICT.
+    """
+
+    def __init__(
+        self,
+        lang: Optional[str] = None,
+        config: str = "",
+        max_batch_size: int = 256,
+        temp_root: Optional[str] = None
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.lang = lang
+        self.config = config
+        self.max_batch_size = max_batch_size
+        if temp_root is None and os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+            temp_root = "/dev/shm"
+        self.temp_root = temp_root
+
+    def cache_key(self) -> str:
+        return f"TesseractBatchEngine(lang={self.lang!r}, config={self.config!r})"
+
+    def image_to_data(self, image: np.ndarray) -> Dict[str, list]:
+        return self.image_to_data_batch([image])[0]
+
+    def image_to_data_batch(self, images: List[np.ndarray]) -> List[Dict[str, list]]:
+        results: List[Dict[str, list]] = []
+        for start in range(0, len(images), self.max_batch_size):
+            results.extend(
+                self._run(images[start: start + self.max_batch_size]))
+        return results
+
+    def _run(self, images: List[np.ndarray]) -> List[Dict[str, list]]:
+        with tempfile.TemporaryDirectory(prefix="wm_ocr_", dir=self.temp_root) as work_dir:
+            paths = []
+            for i, image in enumerate(images):
+                path = os.path.join(work_dir, f"{i:06d}.png")
+                if not cv2.imwrite(path, image):
+                    raise RuntimeError(f"Cannot write OCR input image {path}")
+                paths.append(path)
+            list_path = os.path.join(work_dir, "pages.txt")
+            with open(list_path, "w", encoding="utf-8") as f:
+                f.write("\n".join(paths) + "\n")
+
+            cmd = [pytesseract.pytesseract.tesseract_cmd, list_path, "stdout"]
+            if self.lang:
+                cmd += ["-l", self.lang]
+            cmd += shlex.split(self.config)
+            cmd.append("tsv")
+            try:
+                completed = subprocess.run(
+                    cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+            except FileNotFoundError:
+                raise TesseractNotFoundError()
+            except subprocess.CalledProcessError as e:
+                raise RuntimeError(
+                    f"tesseract exited with {e.returncode}: "
+                    f"{e.stderr.decode(errors='replace')}")
+        return _split_tsv_pages(
+            completed.stdout.decode("utf-8", errors="replace"), len(images))
+
+
+def _split_tsv_pages(tsv: str, page_count: int) -> List[Dict[str, list]]:
+    """
+    Split Tesseract TSV output for a multi-page input into one
+    Output.DICT-style dict per page (page_num is 1-based).
+
+    Raises:
+        RuntimeError if the output is not TSV with a page_num column, e.g.
+        when Tesseract printed an error message instead.
+    """
+    lines = tsv.splitlines()
+    pages: List[Dict[str, list]] = []
+    if not lines:
+        header: List[str] = []
+    else:
+        header = lines[0].split("\t")
+    for _ in range(page_count):
+        pages.append({key: [] for key in header})
+    if not header:
+        return pages
+
+    if "page_num" not in header:
+        raise RuntimeError(
+            f"Unexpected tesseract output instead of TSV: {lines[0][:200]!r}")
+    page_column = header.index("page_num")
+    for line in lines[1:]:
+        fields = line.split("\t")
+        if len(fields) < len(header):
+            fields += [""] * (len(header) - len(fields))
+        try:
+            page = int(fields[page_column]) - 1
+            row = [value if key == "text" else float(value) if key == "conf"
+                   else int(value) for key, value in zip(header, fields)]
+        except ValueError:
+            continue
+        if not (0 <= page < page_count):
+            continue
+        for key, value in zip(header, row):
+            pages[page][key].append(value)
+    return pages
+
+
+class TierStats:
+    """
+    Call count and total wall time of one TieredOCREngine tier, and how many
+    of the returned results came from it (`kept`).
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.seconds = 0.0
+        self.kept = 0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.seconds / self.calls if self.calls else 0.0
+
+
+class TieredOCREngine:
+    """
+    Two-tier OCR engine: `fast` runs on every crop, and only crops whose
+    fast result has a mean word confidence below `confidence_threshold`
+    (0-1), or whose text fails `validator`, are escalated to `slow`. The
+    slow result is kept only if it is at least as good as the fast one:
+    non-empty and valid before invalid, then by word confidence.
+
+    Escalated crops are preprocessed for accuracy first: upscaled by
+    `upscale` (cubic interpolation) and, with `binarize`, Otsu-thresholded.
+    Box coordinates of slow results are scaled back to the crop.
+
+    Both tiers must be given, since the split only pays off when they
+    really differ. A typical setup is a restricted-charset, single-line
+    fast engine on the fast models, e.g.
+    PytesseractEngine(config="--psm 7 --tessdata-dir /usr/share/tessdata_fast
+    -c tessedit_char_whitelist=0123456789:.") or a GlyphTemplateEngine, and
+    a slow engine on the best models, e.g.
+    PytesseractEngine(config="--psm 7 --tessdata-dir /usr/share/tessdata_best").
+
+    `validator` is a callable taking the recognized text, or a regular
+    expression the whole text must match. Both tiers are used through
+    image_to_data_batch when they have it.
+
+    `fast_stats` and `slow_stats` record calls, wall time and kept results
+    per tier; `escalated_low_confidence` and `escalated_invalid` count why
+    crops were escalated.
+    """
+
+    def __init__(
+        self,
+        fast: OCREngine,
+        slow: OCREngine,
+        confidence_threshold: float = 0.8,
+        validator: Optional[Union[str, Callable[[str], bool]]] = None,
+        upscale: float = 2.0,
+        binarize: bool = True
+    ) -> None:
+        if not (0.0 <= confidence_threshold <= 1.0):
+            raise ValueError("confidence_threshold must be between 0.0 and 1.0")
+        if upscale < 1.0:
+            raise ValueError("upscale must be at least 1.0")
+        self.fast = fast
+        self.slow = slow
+        self.confidence_threshold = confidence_threshold
+        self.validator = validator
+        if isinstance(validator, str):
+            pattern = re.compile(validator)
+            self._is_valid: Optional[Callable[[str], bool]] = \
+                lambda text: pattern.fullmatch(text) is not None
+        else:
+            self._is_valid = validator
+        self.upscale = upscale
+        self.binarize = binarize
+        self.fast_stats = TierStats()
+        self.slow_stats = TierStats()
+        self.escalated_low_confidence = 0
+        self.escalated_invalid = 0
+        self._lock = threading.Lock()
+
+    def cache_key(self) -> str:
+        validator = self.validator
+        if validator is not None and not isinstance(validator, str):
+            validator = _callable_key(validator)
+        return (f"TieredOCREngine(fast={_engine_settings_key(self.fast)}, "
+                f"slow={_engine_settings_key(self.slow)}, "
+                f"confidence_threshold={self.confidence_threshold!r}, "
+                f"validator={validator!r}, upscale={self.upscale!r}, "
+                f"binarize={self.binarize!r})")
+
+    def image_to_data(self, image: np.ndarray) -> Dict[str, list]:
+        return self.image_to_data_batch([image])[0]
+
+    def image_to_data_batch(self, images: List[np.ndarray]) -> List[Dict[str, list]]:
+        datas = self._run_tier(self.fast, self.fast_stats, images)
+        ranks = [self._rank(data) for data in datas]
+        escalate = [i for i, rank in enumerate(ranks) if self._needs_escalation(rank)]
+        kept_slow = 0
+        if escalate:
+            slow_datas = self._run_tier(
+                self.slow, self.slow_stats,
+                [self._prepare(images[i]) for i in escalate])
+            for i, data in zip(escalate, slow_datas):
+                if self._rank(data) >= ranks[i]:
+                    datas[i] = self._rescale_boxes(data)
+                    kept_slow += 1
+        with self._lock:
+            self.fast_stats.kept += len(images) - kept_slow
+            self.slow_stats.kept += kept_slow
+        return datas
+
+    def _run_tier(
+        self,
+        engine: OCREngine,
+        tier_stats: TierStats,
+        images: List[np.ndarray]
+    ) -> List[Dict[str, list]]:
+        start = time.perf_counter()
+        if hasattr(engine, "image_to_data_batch"):
+            datas = list(engine.image_to_data_batch(images))
+        else:
+            datas = [engine.image_to_data(image) for image in images]
+        with self._lock:
+            tier_stats.calls += len(images)
+            tier_stats.seconds += time.perf_counter() - start
+        return datas
+
+    def _rank(self, data: Dict[str, list]) -> Tuple[bool, bool, float]:
+        """
+        (has text, passes the validator, word confidence) of a result;
+        tuples compare as result quality.
+        """
+        text, confidence = _word_confidence(data)
+        valid = self._is_valid is None or self._is_valid(text)
+        return bool(text), valid, confidence
+
+    def _needs_escalation(self, rank: Tuple[bool, bool, float]) -> bool:
+        _, valid, confidence = rank
+        if confidence < self.confidence_threshold:
+            with self._lock:
+                self.escalated_low_confidence += 1
+            return True
+        if not valid:
+            with self._lock:
+                self.escalated_invalid += 1
+            return True
+        return False
+
+    def _prepare(self, gray: np.ndarray) -> np.ndarray:
+        if gray.ndim == 3:
+            gray = cv2.cvtColor(gray, cv2.COLOR_BGR2GRAY)
+        if self.upscale > 1.0:
+            gray = cv2.resize(gray, None, fx=self.upscale, fy=self.upscale,
+                              interpolation=cv2.INTER_CUBIC)
+        if self.binarize:
+            _, gray = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return gray
+
+    def _rescale_boxes(self, data: Dict[str, list]) -> Dict[str, list]:
+        if self.upscale == 1.0:
+            return data
+        data = dict(data)
+        for key in ("left", "top", "width", "height"):
+            if key in data:
+                data[key] = [int(round(int(v) / self.upscale)) for v in data[key]]
+        return data
+
+
+def _callable_key(func: Callable) -> str:
+    """
+    Name a callable for a cache key. Lambdas and nested functions have no
+    stable name, so they are keyed by identity and never share entries
+    with another run.
+    """
+    name = f"{getattr(func, '__module__', '')}.{getattr(func, '__qualname__', '')}"
+    if not getattr(func, "__qualname__", None) or "<" in name:
+        return repr(func)
+    return name
+
+
+def _engine_settings_key(engine: OCREngine) -> str:
+    """
+    The cache key of `engine`: its cache_key() if it has one, otherwise its
+    class name, for engines whose output depends on nothing else.
+    """
+    cache_key = getattr(engine, "cache_key", None)
+    if callable(cache_key):
+        return cache_key()
+    return f"{type(engine).__module__}.{type(engine).__qualname__}"
+
+
+class OCRCache:
+    """
+    Content-addressed cache of OCR results, keyed by a BLAKE2b hash of a
+    grayscale crop's shape and bytes plus the engine's settings.
+
+    Holds up to `max_entries` (text, confidence) pairs in memory with LRU
+    eviction. With `db_path`, entries are also written to a SQLite table
+    there, so results survive across runs and memory evictions. Results
+    are stored before confidence filtering, so one cache can serve calls
+    with different thresholds.
+
+    `hits` and `misses` count lookups since creation (or reset_stats()).
+    """
+
+    def __init__(self, max_entries: int = 4096, db_path: Optional[str] = None) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if db_path is not None:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS OCRCache ("
+                "key TEXT PRIMARY KEY, text TEXT NOT NULL, confidence REAL NOT NULL);")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    @staticmethod
+    def key(gray: np.ndarray, engine_key: str) -> str:
+        """
+        Hash of the crop contents and the engine settings string.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(engine_key.encode())
+        digest.update(repr((gray.shape, gray.dtype.str)).encode())
+        digest.update(np.ascontiguousarray(gray).data)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            elif self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT text, confidence FROM OCRCache WHERE key = ?;",
+                    (key,)).fetchone()
+                if row is not None:
+                    value = (row[0], row[1])
+                    self._remember(key, value)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def put(self, key: str, value: Tuple[str, float]) -> None:
+        self.put_many([(key, value)])
+
+    def put_many(self, items: List[Tuple[str, Tuple[str, float]]]) -> None:
+        with self._lock:
+            for key, value in items:
+                self._remember(key, value)
+            if self._conn is not None and items:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO OCRCache (key, text, confidence) "
+                        "VALUES (?, ?, ?);",
+                        [(key, text, conf) for key, (text, conf) in items])
+
+    def _remember(self, key: str, value: Tuple[str, float]) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def reset_stats(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self) -> None:
+        """
+        Drop all entries, in memory and on disk.
+        """
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("DELETE FROM OCRCache;")
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _call_engine(method: Callable[[Any], Any], argument: Any) -> Any:
+    """
+    Call an engine method, mapping engine failures to RuntimeError.
+    """
+    try:
+        return method(argument)
+    except TesseractNotFoundError:
+        raise RuntimeError("Tesseract not installed or not in PATH.")
+    except Exception as e:
+        logger.error(f"OCR engine error: {e}")
+        raise RuntimeError("Error during OCR processing.")
+
+
+def _parse_ocr_data(data: Dict[str, list]) -> Tuple[str, float]:
+    """
+    Join the recognized tokens and average the confidences of an
+    image_to_data result.
+    """
+    texts = data.get("text", [])
+    confs = data.get("conf", [])
+    numeric_confs: List[float] = []
+    tokens: List[str] = []
+
+    # Parse confidences and assemble tokens
+    for text, conf_str in zip(texts, confs):
+        try:
+            conf_val = float(conf_str) / 100.0
+        except (ValueError, TypeError):
+            continue
+        numeric_confs.append(conf_val)
+        if conf_val > 0 and text.strip():
+            tokens.append(text)
+
+    text_str = "".join(tokens).strip()
+    overall_conf = sum(numeric_confs) / \
+        len(numeric_confs) if numeric_confs else 0.0
+    return text_str, overall_conf
+
+
+def _word_confidence(data: Dict[str, list]) -> Tuple[str, float]:
+    """
+    Like _parse_ocr_data, but average the confidences of word rows only
+    (level 5, or conf >= 0 when there is no level column). pytesseract also
+    returns page, block, paragraph and line rows with conf -1, which would
+    drag a confident word's average far down.
+    """
+    levels = data.get("level")
+    rows = {key: [] for key in ("text", "conf")}
+    for i, (text, conf) in enumerate(zip(data.get("text", []), data.get("conf", []))):
+        try:
+            conf_val = float(conf)
+        except (ValueError, TypeError):
+            continue
+        is_word = int(levels[i]) == 5 if levels is not None else conf_val >= 0
+        if is_word:
+            rows["text"].append(text)
+            rows["conf"].append(conf_val)
+    return _parse_ocr_data(rows)
+
+
+def _recognize(gray: np.ndarray, engine: Optional[OCREngine] = None) -> Tuple[str, float]:
+    """
+    Run the OCR engine (pytesseract by default) on a grayscale crop and
+    return (text, mean confidence).
+    """
+    if engine is None:
+        engine = PytesseractEngine()
+    return _parse_ocr_data(_call_engine(engine.image_to_data, gray))
+
+
+def _recognize_many(
+    grays: List[np.ndarray],
+    engine: Optional[OCREngine] = None
+) -> List[Tuple[str, float]]:
+    """
+    Recognize several crops, in one call if the engine supports
+    image_to_data_batch and one call per crop otherwise.
+    """
+    if engine is None:
+        engine = PytesseractEngine()
+    if not grays:
+        return []
+    if hasattr(engine, "image_to_data_batch"):
+        datas = _call_engine(engine.image_to_data_batch, grays)
+        return [_parse_ocr_data(data) for data in datas]
+    return [_recognize(gray, engine) for gray in grays]
+
+
+def _recognize_cached(
+    grays: List[np.ndarray],
+    engine_key: str,
+    cache: Optional[OCRCache],
+    recognize: Callable[[List[np.ndarray]], List[Tuple[str, float]]]
+) -> List[Tuple[str, float]]:
+    """
+    Look `grays` up in `cache` and pass only the missing crops, each
+    distinct crop once, to `recognize`.
+    """
+    if cache is None:
+        return recognize(grays)
+    keys = [OCRCache.key(gray, engine_key) for gray in grays]
+    recognized = [cache.get(key) for key in keys]
+    missing: Dict[str, int] = {}
+    for i, (key, value) in enumerate(zip(keys, recognized)):
+        if value is None and key not in missing:
+            missing[key] = i
+    if missing:
+        fresh = dict(zip(missing, recognize([grays[i] for i in missing.values()])))
+        cache.put_many(list(fresh.items()))
+        recognized = [value if value is not None else fresh[key]
+                      for key, value in zip(keys, recognized)]
+    return recognized  # type: ignore
+
+
+# Per-worker engines of a parallel process_batch_for_ocr run: one per
+# thread for the thread pool, one per process for the process pool
+_worker_engines = threading.local()
+
+
+def _init_ocr_worker(
+    engine: Optional[OCREngine],
+    engine_factory: Optional[Callable[[], OCREngine]],
+    warmup: bool
+) -> None:
+    if engine_factory is not None:
+        engine = engine_factory()
+    elif engine is None:
+        engine = PytesseractEngine()
+    if warmup:
+        # Load the engine's model before the first timed crop
+        _recognize(np.full((32, 32), 255, dtype=np.uint8), engine)
+    _worker_engines.engine = engine
+
+
+def _recognize_chunk(grays: List[np.ndarray]) -> List[Tuple[str, float]]:
+    return _recognize_many(grays, _worker_engines.engine)
+
+
+def _recognize_parallel(
+    grays: List[np.ndarray],
+    engine: Optional[OCREngine],
+    executor: str,
+    workers: Optional[int],
+    chunksize: int,
+    warmup: bool,
+    engine_factory: Optional[Callable[[], OCREngine]]
+) -> List[Tuple[str, float]]:
+    """
+    Recognize `grays` in chunks of `chunksize` crops on a pool of `workers`
+    threads or processes, returning results in input order.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunks = [grays[i:i + chunksize] for i in range(0, len(grays), chunksize)]
+    if not chunks:
+        return []
+    pool_size = min(workers, len(chunks))
+    pool: Executor
+    if executor == "thread":
+        # Threads share `engine` unless a factory gives each its own
+        pool = ThreadPoolExecutor(
+            max_workers=pool_size, initializer=_init_ocr_worker,
+            initargs=(engine or PytesseractEngine(), engine_factory, warmup))
+    else:
+        pool = ProcessPoolExecutor(
+            max_workers=pool_size, initializer=_init_ocr_worker,
+            initargs=(engine, engine_factory, warmup))
+    with pool:
+        recognized: List[Tuple[str, float]] = []
+        for chunk_result in pool.map(_recognize_chunk, chunks):
+            recognized.extend(chunk_result)
+    return recognized
+
+
+def _make_result(
+    text_str: str,
+    overall_conf: float,
+    timestamp: float,
+    video_id: int,
+    clip_id: int,
+    roi: ROI,
+    confidence_threshold: float
+) -> Optional[OCRResult]:
+    if text_str and overall_conf >= confidence_threshold:
+        return OCRResult(
+            video_id=video_id,
+            clip_id=clip_id,
+            timestamp=timestamp,
+            text=text_str,
+            confidence=overall_conf,
+            roi=roi
+        )
+    return None
+
+
 def process_frame_for_ocr(
     frame: np.ndarray,
     timestamp: float,
     video_id: int,
     clip_id: int,
     rois: List[ROI],
-    confidence_threshold: float
+    confidence_threshold: float,
+    engine: Optional[OCREngine] = None,
+    cache: Optional[OCRCache] = None
 ) -> List[OCRResult]:
     """
     Run OCR on each ROI in a frame, filter by confidence, and return OCRResult list.
+    `engine` defaults to PytesseractEngine. With an OCRCache, crops seen
+    before are answered from the cache instead of the engine.
     """
     if not (0.0 <= confidence_threshold <= 1.0):
         raise ValueError("confidence_threshold must be between 0.0 and 1.0")
+    if engine is None:
+        engine = PytesseractEngine()
 
-    results: List[OCRResult] = []
-    for roi in rois:
-        x, y, w, h = roi.x, roi.y, roi.width, roi.height
-        # Validate ROI bounds
-        if y < 0 or x < 0 or y + h > frame.shape[0] or x + w > frame.shape[1]:
-            logger.warning(
-                f"ROI {roi} is out of frame bounds and will be skipped.")
-            continue
-        sub_img = frame[y: y + h, x: x + w]
-        if sub_img.size == 0:
-            logger.warning(
-                f"ROI {roi} resulted in empty crop and will be skipped.")
-            continue
+    crops = [(rois[i], gray)
+             for i, gray in compile_roi_plan(rois, frame.shape).crops(frame)]
+    recognized = _recognize_cached(
+        [gray for _, gray in crops], _engine_settings_key(engine), cache,
+        lambda grays: _recognize_many(grays, engine))
 
-        # Convert to grayscale
-        gray = cv2.cvtColor(sub_img, cv2.COLOR_BGR2GRAY)
-        try:
-            data = pytesseract.image_to_data(gray, output_type=Output.DICT)
-        except TesseractNotFoundError:
-            raise RuntimeError("Tesseract not installed or not in PATH.")
-        except Exception as e:
-            logger.error(f"OCR engine error: {e}")
-            raise RuntimeError("Error during OCR processing.")
-
-        texts = data.get("text", [])
-        confs = data.get("conf", [])
-        numeric_confs: List[float] = []
-        tokens: List[str] = []
-
-        # Parse confidences and assemble tokens
-        for text, conf_str in zip(texts, confs):
-            try:
-                conf_val = float(conf_str) / 100.0
-            except (ValueError, TypeError):
-                continue
-            numeric_confs.append(conf_val)
-            if conf_val > 0 and text.strip():
-                tokens.append(text)
-
-        text_str = "".join(tokens).strip()
-        overall_conf = sum(numeric_confs) / \
-            len(numeric_confs) if numeric_confs else 0.0
-
-        if text_str and overall_conf >= confidence_threshold:
-            result = OCRResult(
-                video_id=video_id,
-                clip_id=clip_id,
-                timestamp=timestamp,
-                text=text_str,
-                confidence=overall_conf,
-                roi=roi
-            )
+    results: List[OCRResult] = []
+    for (roi, _), (text_str, overall_conf) in zip(crops, recognized):
+        result = _make_result(text_str, overall_conf, timestamp, video_id,
+                              clip_id, roi, confidence_threshold)
+        if result is not None:
             results.append(result)
     return results
 
 
 def process_batch_for_ocr(
-    frame_batch: FrameBatch,
+    frame_batch: Union[FrameBatch, ROIFrameBatch],
     rois: List[ROI],
-    confidence_threshold: float
+    confidence_threshold: float,
+    engine: Optional[OCREngine] = None,
+    executor: Optional[str] = None,
+    workers: Optional[int] = None,
+    chunksize: int = 1,
+    warmup: bool = False,
+    engine_factory: Optional[Callable[[], OCREngine]] = None,
+    cache: Optional[OCRCache] = None,
+    change_threshold: Optional[float] = None,
+    change_metric: str = "mad",
+    stats: Optional[OCRStats] = None,
+    cache_key: Optional[str] = None
 ) -> List[OCRResult]:
     """
     Process an entire batch of frames for OCR, returning all OCRResult entries.
+
+    An ROIFrameBatch is read from its stored crops directly; every ROI in
+    `rois` must have been captured by the batch. `engine` defaults to
+    PytesseractEngine.
+
+    executor:
+      - None: recognize every crop in this thread.
+      - "thread": fan frame x ROI crops out to a thread pool. Suits
+        subprocess-based engines (PytesseractEngine, TesseractBatchEngine),
+        which wait on tesseract with the GIL released.
+      - "process": fan crops out to a process pool, for in-process engines.
+        Each worker builds its own engine with `engine_factory`, or unpickles
+        `engine`; the factory must be picklable (e.g. a class or a module-level
+        function) and is required for engines that hold native handles, such
+        as TesseractCAPIEngine.
+
+    `workers` defaults to one per CPU. Crops are sent `chunksize` at a time,
+    so a batch engine still sees batches of that size. With `warmup`, each
+    worker runs its engine once on a blank crop before taking work. Results
+    come back in timestamp order either way.
+
+    With an OCRCache, only crops missing from the cache are recognized, and
+    identical crops within the batch are recognized once. Entries are keyed
+    by the engine's cache_key(); with `engine_factory` the engines are built
+    in the workers, so the caller must pass `cache_key` naming the factory's
+    engine settings.
+
+    Each ROI's schedule is followed: an ROI with `sample_interval` is OCR'd
+    on a frame only if at least that many seconds have passed since its
+    last OCR'd frame, and a `static` ROI on the first frame of the batch,
+    then on each following frame only until a result passes
+    `confidence_threshold`. Unscheduled frames produce no result for that ROI.
+
+    With `change_threshold`, each ROI crop is compared with the crop last
+    OCR'd for the same ROI, and if the change is at most the threshold that
+    result is carried forward with the new timestamp instead of running OCR. change_metric:
+      - "mad": mean absolute pixel difference (0-255).
+      - "dhash": number of differing bits (0-64) of a 64-bit difference hash,
+        which ignores small shifts in brightness and compression noise.
+    Pass an OCRStats as `stats` to count OCR calls and skipped crops.
     """
     if not (0.0 <= confidence_threshold <= 1.0):
         raise ValueError("confidence_threshold must be between 0.0 and 1.0")
+    if executor is not None and executor not in EXECUTORS:
+        raise ValueError(f"executor must be one of {EXECUTORS} or None")
+    if workers is not None and workers < 1:
+        raise ValueError("workers must be at least 1")
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    if change_threshold is not None and change_threshold < 0:
+        raise ValueError("change_threshold must be non-negative")
+    if change_metric not in CHANGE_METRICS:
+        raise ValueError(f"change_metric must be one of {CHANGE_METRICS}")
+    if cache is not None and engine_factory is not None and cache_key is None:
+        raise ValueError("cache_key is required to cache results of engine_factory engines")
 
-    all_results: List[OCRResult] = []
-    # Note: video_id and clip_id are both taken from frame_batch.clip_id per spec
-    for frame, ts in zip(frame_batch.frames, frame_batch.timestamps):
-        partial = process_frame_for_ocr(
-            frame,
-            ts,
-            frame_batch.clip_id,
-            frame_batch.clip_id,
-            rois,
-            confidence_threshold
-        )
-        all_results.extend(partial)
-    return all_results
+    all_items = _batch_work_items(frame_batch, rois)
+    if engine is None and (executor != "process" or engine_factory is None):
+        engine = PytesseractEngine()
+
+    def recognize(grays: List[np.ndarray]) -> List[Tuple[str, float]]:
+        if stats is not None:
+            stats.ocr_calls += len(grays)
+        if executor is None:
+            return _recognize_many(grays, engine)
+        return _recognize_parallel(grays, engine, executor, workers,
+                                   chunksize, warmup, engine_factory)
+
+    if cache is not None and cache_key is None:
+        cache_key = _engine_settings_key(engine)
+
+    def run(indices: List[int]) -> Dict[int, OCRResult]:
+        items = [all_items[i] for i in indices]
+        if change_threshold is None:
+            sources = list(range(len(items)))
+        else:
+            sources = _unchanged_sources(items, change_threshold, change_metric)
+        changed = [i for i, source in enumerate(sources) if source == i]
+        recognized = dict(zip(changed, _recognize_cached(
+            [items[i][2] for i in changed], cache_key or "", cache, recognize)))
+        if stats is not None:
+            stats.skipped_unchanged += len(items) - len(changed)
+        accepted: Dict[int, OCRResult] = {}
+        # Note: video_id and clip_id are both taken from frame_batch.clip_id per spec
+        for index, (ts, roi, _), source in zip(indices, items, sources):
+            text_str, overall_conf = recognized[source]
+            result = _make_result(text_str, overall_conf, ts, frame_batch.clip_id,
+                                  frame_batch.clip_id, roi, confidence_threshold)
+            if result is not None:
+                accepted[index] = result
+        return accepted
+
+    last_run: Dict[Tuple[int, int, int, int], float] = {}
+    scheduled = [i for i, (ts, roi, _) in enumerate(all_items)
+                 if not roi.static and _roi_due(roi, ts, last_run)]
+    results = run(scheduled)
+    run_count = len(scheduled)
+
+    # A static ROI is read on its first frame, and on each following frame
+    # only until a result is accepted
+    static_frames: Dict[Tuple[int, int, int, int], List[int]] = {}
+    for i, (_, roi, _) in enumerate(all_items):
+        if roi.static:
+            static_frames.setdefault(_roi_key(roi), []).append(i)
+    attempt = 0
+    while static_frames:
+        indices = [frames[attempt] for frames in static_frames.values()]
+        accepted = run(indices)
+        results.update(accepted)
+        run_count += len(indices)
+        attempt += 1
+        static_frames = {key: frames for key, frames in static_frames.items()
+                         if frames[attempt - 1] not in accepted and len(frames) > attempt}
+
+    if stats is not None:
+        stats.skipped_schedule += len(all_items) - run_count
+    return [results[i] for i in sorted(results)]
+
+
+def iter_ocr_results(
+    frames: Iterable[Tuple[float, np.ndarray]],
+    video_id: int,
+    clip_id: int,
+    rois: List[ROI],
+    confidence_threshold: float,
+    engine: Optional[OCREngine] = None,
+    cache: Optional[OCRCache] = None
+) -> Iterator[OCRResult]:
+    """
+    Streaming counterpart of process_batch_for_ocr: consume (timestamp, frame)
+    pairs from any iterator (e.g. iter_frames) and yield OCRResult entries as
+    soon as each frame is processed. Memory use is independent of clip length
+    (apart from an optional OCRCache, which is bounded). ROI schedules are
+    followed as in process_batch_for_ocr, over the whole stream.
+    """
+    if not (0.0 <= confidence_threshold <= 1.0):
+        raise ValueError("confidence_threshold must be between 0.0 and 1.0")
+    return _iter_ocr_results(frames, video_id, clip_id, rois,
+                             confidence_threshold, engine, cache)
+
+
+def _iter_ocr_results(
+    frames: Iterable[Tuple[float, np.ndarray]],
+    video_id: int,
+    clip_id: int,
+    rois: List[ROI],
+    confidence_threshold: float,
+    engine: Optional[OCREngine],
+    cache: Optional[OCRCache]
+) -> Iterator[OCRResult]:
+    last_run: Dict[Tuple[int, int, int, int], float] = {}
+    for ts, frame in frames:
+        due = [roi for roi in rois if _roi_due(roi, ts, last_run)]
+        for result in process_frame_for_ocr(
+                frame, ts, video_id, clip_id, due, confidence_threshold, engine, cache):
+            if result.roi.static:
+                last_run[_roi_key(result.roi)] = ts
+            yield result
+
+
+def _roi_due(
+    roi: ROI,
+    timestamp: float,
+    last_run: Dict[Tuple[int, int, int, int], float]
+) -> bool:
+    """
+    Whether `roi` should be OCR'd at `timestamp` under its schedule, given
+    the time of its last OCR run in `last_run` (updated when due). A static
+    ROI is due until the caller records an accepted result for it in
+    `last_run`.
+    """
+    key = _roi_key(roi)
+    previous = last_run.get(key)
+    if roi.static:
+        return previous is None
+    if previous is not None:
+        # Tolerate float error in sample timestamps
+        if roi.sample_interval is not None and \
+                timestamp - previous < roi.sample_interval - 1e-6:
+            return False
+    last_run[key] = timestamp
+    return True
+
+
+def _unchanged_sources(
+    items: List[Tuple[float, ROI, np.ndarray]],
+    change_threshold: float,
+    change_metric: str
+) -> List[int]:
+    """
+    For each work item, the index of the item whose OCR result it should
+    use: itself if its crop changed by more than `change_threshold` from
+    the crop last OCR'd for the same ROI, else that OCR'd item. Comparing
+    with the OCR'd crop rather than the previous frame's means a slow drift
+    is re-read once it adds up to more than the threshold.
+    """
+    groups: Dict[Tuple[int, int, int, int], List[int]] = {}
+    for i, (_, roi, _) in enumerate(items):
+        groups.setdefault(_roi_key(roi), []).append(i)
+
+    sources = list(range(len(items)))
+    for indices in groups.values():
+        if change_metric == "mad":
+            signatures = [items[i][2].astype(np.int16) for i in indices]
+        else:
+            signatures = [_dhash(items[i][2]) for i in indices]
+        reference = 0
+        for k in range(1, len(indices)):
+            a, b = signatures[reference], signatures[k]
+            if a.shape != b.shape:
+                reference = k
+                continue
+            if change_metric == "mad":
+                change = float(np.abs(b - a).mean())
+            else:
+                change = int(np.count_nonzero(a != b))
+            if change <= change_threshold:
+                sources[indices[k]] = indices[reference]
+            else:
+                reference = k
+    return sources
+
+
+def _dhash(gray: np.ndarray) -> np.ndarray:
+    """
+    64-bit difference hash: signs of horizontal gradients of a 9x8 thumbnail.
+    """
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    return (small[:, 1:] > small[:, :-1]).ravel()
+
+
+def _batch_work_items(
+    frame_batch: Union[FrameBatch, ROIFrameBatch],
+    rois: List[ROI]
+) -> List[Tuple[float, ROI, np.ndarray]]:
+    """
+    Return (timestamp, roi, grayscale crop) for every frame x ROI of the
+    batch, in timestamp order then ROI order. Out-of-bounds ROIs are skipped.
+    """
+    items: List[Tuple[float, ROI, np.ndarray]] = []
+    if not isinstance(frame_batch, ROIFrameBatch):
+        plan: Optional[ROIPlan] = None
+        for frame, ts in zip(frame_batch.frames, frame_batch.timestamps):
+            if plan is None or plan.frame_shape != frame.shape:
+                plan = compile_roi_plan(rois, frame.shape)
+            items.extend((ts, rois[i], gray) for i, gray in plan.crops(frame))
+        return items
+
+    captured = {_roi_key(r): i for i, r in enumerate(frame_batch.rois)}
+    selected = []
+    for roi in rois:
+        index = captured.get(_roi_key(roi))
+        if index is None:
+            raise ValueError(f"ROI {roi.to_dict()} was not captured in the batch")
+        patches = frame_batch.get_patches(index)
+        if patches is not None:
+            selected.append((roi, patches))
+
+    for n, ts in enumerate(frame_batch.timestamps):
+        for roi, patches in selected:
+            gray = patches[n]
+            if gray.ndim == 3:
+                gray = cv2.cvtColor(gray, cv2.COLOR_BGR2GRAY)
+            items.append((float(ts), roi, gray))
+    return items
@@ -0,0 +1,82 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .config_manager import ROI
+
+logger = logging.getLogger(__name__)
+
+
+def roi_key(roi: ROI) -> Tuple[int, int, int, int]:
+    return (roi.x, roi.y, roi.width, roi.height)
+
+
+class ROIPlan:
+    """
+    ROIs compiled against one frame shape: the crop slices of the ROIs that
+    fit inside the frame and the color conversion to grayscale, so that
+    cropping a frame is just slicing. Build with compile_roi_plan.
+    """
+
+    def __init__(self, rois: List[ROI], frame_shape: Tuple[int, ...]) -> None:
+        height, width = frame_shape[:2]
+        self.frame_shape = tuple(frame_shape)
+        # (index into rois, row slice, column slice) of every usable ROI
+        self.slices: List[Tuple[int, slice, slice]] = []
+        self.skipped: List[ROI] = []
+        for i, roi in enumerate(rois):
+            if roi.x < 0 or roi.y < 0 or roi.x + roi.width > width or \
+                    roi.y + roi.height > height:
+                self.skipped.append(roi)
+                continue
+            self.slices.append((i, slice(roi.y, roi.y + roi.height),
+                                slice(roi.x, roi.x + roi.width)))
+        channels = frame_shape[2] if len(frame_shape) == 3 else 1
+        if channels not in (1, 3, 4):
+            raise ValueError(f"Unsupported frame shape {frame_shape}")
+        self.color_conversion: Optional[int] = {
+            1: None, 3: cv2.COLOR_BGR2GRAY, 4: cv2.COLOR_BGRA2GRAY}[channels]
+        if self.skipped:
+            logger.warning(
+                f"{len(self.skipped)} of {len(rois)} ROIs are out of bounds for "
+                f"{width}x{height} frames and will be skipped: "
+                f"{[r.to_dict() for r in self.skipped]}")
+
+    def crops(self, frame: np.ndarray) -> List[Tuple[int, np.ndarray]]:
+        """
+        Return (ROI index, grayscale crop) for every usable ROI of `frame`.
+        """
+        if self.color_conversion is None:
+            return [(i, frame[rows, cols]) for i, rows, cols in self.slices]
+        return [(i, cv2.cvtColor(frame[rows, cols], self.color_conversion))
+                for i, rows, cols in self.slices]
+
+
+_roi_plan_cache: "OrderedDict[Tuple, ROIPlan]" = OrderedDict()
+_roi_plan_lock = threading.Lock()
+_ROI_PLAN_CACHE_SIZE = 64
+
+
+def compile_roi_plan(rois: List[ROI], frame_shape: Tuple[int, ...]) -> ROIPlan:
+    """
+    Return the ROIPlan of `rois` (e.g. ROIManager.list_rois()) for frames
+    of `frame_shape`. Plans are cached by ROI geometry and frame shape, so
+    the out-of-bounds warning is logged once per video resolution rather
+    than once per frame.
+    """
+    key = (tuple(roi_key(r) for r in rois), tuple(frame_shape))
+    # OCR thread workers and frame batches share the cache
+    with _roi_plan_lock:
+        plan = _roi_plan_cache.get(key)
+        if plan is None:
+            plan = ROIPlan(rois, frame_shape)
+            _roi_plan_cache[key] = plan
+            if len(_roi_plan_cache) > _ROI_PLAN_CACHE_SIZE:
+                _roi_plan_cache.popitem(last=False)
+        else:
+            _roi_plan_cache.move_to_end(key)
+    return plan
@@ -0,0 +1,192 @@
+import ctypes
+import ctypes.util
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# tesseract::PageIteratorLevel
+RIL_WORD = 3
+# tesseract::PageSegMode
+PSM_SINGLE_LINE = 7
+
+_LIBRARY_NAMES = ("tesseract", "libtesseract-5", "libtesseract")
+
+
+def _load_library(library_path: Optional[str]) -> ctypes.CDLL:
+    """
+    Load libtesseract and declare the C API signatures used below.
+    Raises RuntimeError if the library cannot be found.
+    """
+    path = library_path
+    if path is None:
+        for name in _LIBRARY_NAMES:
+            path = ctypes.util.find_library(name)
+            if path:
+                break
+    if not path:
+        raise RuntimeError("Tesseract library (libtesseract) not found.")
+    try:
+        lib = ctypes.CDLL(path)
+    except OSError as e:
+        raise RuntimeError(f"Cannot load Tesseract library: {e}")
+
+    c_int_p = ctypes.POINTER(ctypes.c_int)
+    signatures = {
+        "TessVersion": ([], ctypes.c_char_p),
+        "TessBaseAPICreate": ([], ctypes.c_void_p),
+        "TessBaseAPIInit3": ([ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p], ctypes.c_int),
+        "TessBaseAPISetPageSegMode": ([ctypes.c_void_p, ctypes.c_int], None),
+        "TessBaseAPISetVariable": ([ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p], ctypes.c_int),
+        "TessBaseAPISetImage": ([ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int,
+                                 ctypes.c_int, ctypes.c_int, ctypes.c_int], None),
+        "TessBaseAPIRecognize": ([ctypes.c_void_p, ctypes.c_void_p], ctypes.c_int),
+        "TessBaseAPIGetIterator": ([ctypes.c_void_p], ctypes.c_void_p),
+        "TessBaseAPIClear": ([ctypes.c_void_p], None),
+        "TessBaseAPIEnd": ([ctypes.c_void_p], None),
+        "TessBaseAPIDelete": ([ctypes.c_void_p], None),
+        "TessResultIteratorGetPageIterator": ([ctypes.c_void_p], ctypes.c_void_p),
+        "TessResultIteratorGetUTF8Text": ([ctypes.c_void_p, ctypes.c_int], ctypes.c_void_p),
+        "TessResultIteratorConfidence": ([ctypes.c_void_p, ctypes.c_int], ctypes.c_float),
+        "TessResultIteratorNext": ([ctypes.c_void_p, ctypes.c_int], ctypes.c_int),
+        "TessResultIteratorDelete": ([ctypes.c_void_p], None),
+        "TessPageIteratorBoundingBox": ([ctypes.c_void_p, ctypes.c_int,
+                                         c_int_p, c_int_p, c_int_p, c_int_p], ctypes.c_int),
+        "TessDeleteText": ([ctypes.c_void_p], None),
+    }
+    for name, (argtypes, restype) in signatures.items():
+        func = getattr(lib, name)
+        func.argtypes = argtypes
+        func.restype = restype
+    return lib
+
+
+class TesseractCAPIEngine:
+    """
+    OCR engine that calls libtesseract in-process through its C API.
+
+    The library and the traineddata model are loaded once per engine; each
+    image_to_data call hands the numpy buffer straight to Tesseract, with no
+    temp file, subprocess or TSV parsing. Create one engine per worker
+    thread or process (calls on one engine are serialized).
+
+    image_to_data returns word-level rows only, in pytesseract's
+    Output.DICT layout ("text", "conf" on a 0-100 scale, "left", "top",
+    "width", "height"), so it can be passed as `engine` to
+    process_frame_for_ocr and friends.
+    """
+
+    def __init__(
+        self,
+        lang: str = "eng",
+        datapath: Optional[str] = None,
+        page_seg_mode: Optional[int] = None,
+        variables: Optional[Dict[str, str]] = None,
+        library_path: Optional[str] = None
+    ) -> None:
+        self._lib = _load_library(library_path)
+        self._lock = threading.Lock()
+        self._handle = self._lib.TessBaseAPICreate()
+        if not self._handle:
+            raise RuntimeError("Cannot create Tesseract API instance.")
+        datapath_arg = datapath.encode() if datapath else None
+        if self._lib.TessBaseAPIInit3(self._handle, datapath_arg, lang.encode()) != 0:
+            self._lib.TessBaseAPIDelete(self._handle)
+            self._handle = None
+            raise RuntimeError(
+                f"Cannot initialize Tesseract with language '{lang}'.")
+        if page_seg_mode is not None:
+            self._lib.TessBaseAPISetPageSegMode(self._handle, page_seg_mode)
+        for name, value in (variables or {}).items():
+            if not self._lib.TessBaseAPISetVariable(
+                    self._handle, name.encode(), str(value).encode()):
+                raise ValueError(f"Unknown Tesseract variable '{name}'.")
+        self.lang = lang
+        self.datapath = datapath
+        self.page_seg_mode = page_seg_mode
+        self.variables = dict(variables or {})
+
+    def cache_key(self) -> str:
+        # datapath selects the model (e.g. tessdata_fast vs tessdata_best)
+        return (f"TesseractCAPIEngine(lang={self.lang!r}, datapath={self.datapath!r}, "
+                f"page_seg_mode={self.page_seg_mode!r}, "
+                f"variables={sorted(self.variables.items())!r})")
+
+    @property
+    def version(self) -> str:
+        return self._lib.TessVersion().decode()
+
+    def image_to_data(self, image: np.ndarray) -> Dict[str, list]:
+        if image.dtype != np.uint8 or image.ndim not in (2, 3):
+            raise ValueError("image must be a 2D or 3D uint8 array")
+        image = np.ascontiguousarray(image)
+        height, width = image.shape[:2]
+        bytes_per_pixel = 1 if image.ndim == 2 else image.shape[2]
+
+        data: Dict[str, List] = {
+            "text": [], "conf": [], "left": [], "top": [], "width": [], "height": []}
+        lib = self._lib
+        with self._lock:
+            if self._handle is None:
+                raise RuntimeError("Tesseract engine has been closed.")
+            lib.TessBaseAPISetImage(
+                self._handle, image.ctypes.data, width, height,
+                bytes_per_pixel, image.strides[0])
+            if lib.TessBaseAPIRecognize(self._handle, None) != 0:
+                lib.TessBaseAPIClear(self._handle)
+                raise RuntimeError("Tesseract recognition failed.")
+            iterator = lib.TessBaseAPIGetIterator(self._handle)
+            try:
+                if iterator:
+                    self._collect_words(iterator, data)
+            finally:
+                if iterator:
+                    lib.TessResultIteratorDelete(iterator)
+                lib.TessBaseAPIClear(self._handle)
+        return data
+
+    def _collect_words(self, iterator: int, data: Dict[str, List]) -> None:
+        lib = self._lib
+        page_iterator = lib.TessResultIteratorGetPageIterator(iterator)
+        left, top, right, bottom = (ctypes.c_int() for _ in range(4))
+        while True:
+            text_ptr = lib.TessResultIteratorGetUTF8Text(iterator, RIL_WORD)
+            if text_ptr:
+                try:
+                    text = ctypes.string_at(text_ptr).decode("utf-8", errors="replace")
+                finally:
+                    lib.TessDeleteText(text_ptr)
+                lib.TessPageIteratorBoundingBox(
+                    page_iterator, RIL_WORD, ctypes.byref(left), ctypes.byref(top),
+                    ctypes.byref(right), ctypes.byref(bottom))
+                data["text"].append(text)
+                data["conf"].append(
+                    float(lib.TessResultIteratorConfidence(iterator, RIL_WORD)))
+                data["left"].append(left.value)
+                data["top"].append(top.value)
+                data["width"].append(right.value - left.value)
+                data["height"].append(bottom.value - top.value)
+            if not lib.TessResultIteratorNext(iterator, RIL_WORD):
+                break
+
+    def close(self) -> None:
+        """
+        Release the Tesseract instance. The engine cannot be used afterwards.
+        """
+        with self._lock:
+            if self._handle is not None:
+                self._lib.TessBaseAPIEnd(self._handle)
+                self._lib.TessBaseAPIDelete(self._handle)
+                self._handle = None
+
+    def __enter__(self) -> "TesseractCAPIEngine":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __del__(self) -> None:
+        try:
+            self.close()
+        except Exception:
+            pass
@@ -1,14 +1,35 @@
+import logging
+import multiprocessing
 import os
 import re
 import cv2
 import numpy as np
-import tempfile
+import queue
 import subprocess
-from typing import List, Tuple, Optional
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import closing
+from typing import IO, Callable, Deque, Dict, Iterator, List, Tuple, Optional, Union
 
+from .config_manager import ROI
+from .db_manager import DBManager
+from .frame_ring import SharedFrameRing
 from .logger import AppError
+from .roi_plan import compile_roi_plan
 from .video_handler import Video
 
+logger = logging.getLogger(__name__)
+
+SAMPLING_MODES = ("seek", "sequential", "ffmpeg", "keyframes")
+
+# Typical dashcam encoders emit a keyframe every one to two seconds. A seek
+# decodes forward from the preceding keyframe, so it only pays off once the
+# gap to the next sample is longer than roughly one GOP.
+DEFAULT_GOP_SECONDS = 2.0
+
+_SHOWINFO_PTS_RE = re.compile(r"pts_time:\s*(-?\d+(?:\.\d+)?)")
+
 
 class Clip:
     def __init__(
@@ -36,16 +57,442 @@ class FrameBatch:
         self.timestamps.append(timestamp)
 
 
-def detect_clips(video: Video, scene_threshold: float = 0.4) -> List[Clip]:
-    if not (0.0 < scene_threshold < 1.0):
-        raise ValueError("scene_threshold must be between 0.0 and 1.0")
+class ROIFrameBatch:
+    """
+    FrameBatch variant that keeps only the ROI crops of each sampled frame.
+
+    Crops for each ROI are stored in one preallocated contiguous array of
+    shape (capacity, height, width[, 3]), allocated on the first frame and
+    grown by doubling if more than `capacity` frames are added. ROIs that do
+    not fit inside the frames are not stored; they are logged by
+    compile_roi_plan, once per frame resolution.
+    """
+
+    def __init__(
+        self,
+        clip_id: int,
+        rois: List[ROI],
+        grayscale: bool = True,
+        capacity: int = 16
+    ) -> None:
+        self.clip_id = clip_id
+        self.rois = list(rois)
+        self.grayscale = grayscale
+        self._capacity = max(1, capacity)
+        self._count = 0
+        self._timestamps = np.empty(self._capacity, dtype=np.float64)
+        self._patches: Optional[List[Optional[np.ndarray]]] = None
+        self._slices: List[Tuple[int, slice, slice]] = []
+        self._color_conversion: Optional[int] = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._timestamps[:self._count]
+
+    def get_patches(self, roi_index: int) -> Optional[np.ndarray]:
+        """
+        Return the (n_frames, height, width[, 3]) crop array for the ROI at
+        `roi_index`, or None if that ROI was out of frame bounds.
+        """
+        if self._patches is None:
+            return None
+        patches = self._patches[roi_index]
+        return None if patches is None else patches[:self._count]
+
+    def add_frame(self, frame: np.ndarray, timestamp: float) -> None:
+        if self._patches is None:
+            self._allocate(frame)
+        if self._count == self._capacity:
+            self._grow()
+
+        n = self._count
+        for i, rows, cols in self._slices:
+            patches = self._patches[i]  # type: ignore
+            if self._color_conversion is not None:
+                cv2.cvtColor(frame[rows, cols], self._color_conversion, dst=patches[n])
+            else:
+                patches[n] = frame[rows, cols]
+        self._timestamps[n] = timestamp
+        self._count += 1
+
+    def _allocate(self, frame: np.ndarray) -> None:
+        plan = compile_roi_plan(self.rois, frame.shape)
+        self._slices = plan.slices
+        channels: Tuple[int, ...] = ()
+        if frame.ndim == 3 and not self.grayscale:
+            channels = (frame.shape[2],)
+        if self.grayscale:
+            self._color_conversion = plan.color_conversion
 
+        self._patches = [None] * len(self.rois)
+        for i, rows, cols in self._slices:
+            self._patches[i] = np.empty(
+                (self._capacity, rows.stop - rows.start, cols.stop - cols.start) + channels,
+                dtype=frame.dtype)
+
+    def _grow(self) -> None:
+        self._capacity *= 2
+        self._timestamps = np.resize(self._timestamps, self._capacity)
+        self._patches = [
+            None if p is None else np.resize(p, (self._capacity,) + p.shape[1:])
+            for p in self._patches  # type: ignore
+        ]
+
+
+class KeyframeIndex:
+    """
+    Presentation timestamps and keyframe flags of every packet in a video's
+    first video stream, sorted by PTS. Frame index i is the i-th frame in
+    presentation order.
+    """
+
+    def __init__(self, pts_times: np.ndarray, keyframe_flags: np.ndarray) -> None:
+        pts_times = np.asarray(pts_times, dtype=np.float64)
+        keyframe_flags = np.asarray(keyframe_flags, dtype=bool)
+        if pts_times.shape != keyframe_flags.shape:
+            raise ValueError(
+                "pts_times and keyframe_flags must have the same length")
+        order = np.argsort(pts_times, kind="stable")
+        self.pts_times = pts_times[order]
+        self.keyframe_flags = keyframe_flags[order]
+        self._keyframe_positions = np.flatnonzero(self.keyframe_flags)
+
+    def __len__(self) -> int:
+        return len(self.pts_times)
+
+    @property
+    def keyframe_times(self) -> np.ndarray:
+        return self.pts_times[self._keyframe_positions]
+
+    def frame_at(self, t: float) -> int:
+        """
+        Index of the first frame with PTS >= t (len(self) if past the end).
+        """
+        return int(np.searchsorted(self.pts_times, t - 1e-6, side="left"))
+
+    def keyframe_before(self, frame_index: int) -> int:
+        """
+        Index of the last keyframe at or before `frame_index` (0 if none).
+        """
+        i = int(np.searchsorted(
+            self._keyframe_positions, frame_index, side="right")) - 1
+        return int(self._keyframe_positions[i]) if i >= 0 else 0
+
+    def keyframe_time_before(self, t: float) -> float:
+        """
+        PTS of the last keyframe at or before time `t`.
+        """
+        if len(self) == 0:
+            return t
+        frame_index = min(self.frame_at(t), len(self) - 1)
+        if self.pts_times[frame_index] > t + 1e-6:
+            frame_index = max(frame_index - 1, 0)
+        return float(self.pts_times[self.keyframe_before(frame_index)])
+
+
+# Indexes already loaded in this process, keyed by source path
+_keyframe_index_cache: Dict[str, KeyframeIndex] = {}
+
+
+def build_keyframe_index(video: Video) -> KeyframeIndex:
+    """
+    Scan the packets of the first video stream with ffprobe (no decoding)
+    and return their PTS values and keyframe flags.
+
+    ffprobe reports absolute stream timestamps, which start above zero for
+    e.g. MPEG-TS files, MP4 edit lists and B-frame delay. The index is
+    shifted by the stream's start_time (the first PTS when the stream has
+    none) so that its times count from the start of the file, as clip
+    times, OpenCV positions and ffmpeg -ss do.
+
+    Raises:
+        AppError if ffprobe fails.
+    """
     cmd = [
-        "ffmpeg",
-        "-i", video.source_path,
-        "-filter_complex", f"select='gt(scene,{scene_threshold})',showinfo",
-        "-f", "null", "-"
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "stream=start_time:packet=pts_time,flags",
+        "-of", "csv",
+        video.source_path
     ]
+    try:
+        result = subprocess.run(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise AppError("Cannot index video packets.", internal_message=e.stderr)
+
+    pts_times: List[float] = []
+    keyframe_flags: List[bool] = []
+    start_time: Optional[float] = None
+    for line in result.stdout.splitlines():
+        fields = line.strip().split(",")
+        try:
+            if fields[0] == "stream" and len(fields) >= 2:
+                start_time = float(fields[1])
+            elif fields[0] == "packet" and len(fields) >= 3:
+                pts_times.append(float(fields[1]))
+                keyframe_flags.append("K" in fields[2])
+        except ValueError:
+            # Timestamps are "N/A" when the container has none
+            continue
+    pts = np.array(pts_times)
+    if start_time is None:
+        start_time = float(pts.min()) if pts.size else 0.0
+    return KeyframeIndex(pts - start_time, np.array(keyframe_flags))
+
+
+def load_keyframe_index(
+    video: Video,
+    db_manager: Optional[DBManager] = None
+) -> KeyframeIndex:
+    """
+    Return the keyframe index of `video`, building it only when needed.
+
+    Lookup order: indexes already loaded in this process, the VideoIndexes
+    table of `db_manager` (if the video has a video_id), then a fresh
+    ffprobe scan, which is stored back to the database for later runs.
+    """
+    cached = _keyframe_index_cache.get(video.source_path)
+    if cached is not None:
+        return cached
+
+    index = None
+    if db_manager is not None and video.video_id is not None:
+        stored = db_manager.get_video_index(video.video_id)
+        if stored is not None:
+            index = KeyframeIndex(np.frombuffer(stored[0], dtype=np.float64),
+                                  np.frombuffer(stored[1], dtype=np.uint8))
+    if index is None:
+        index = build_keyframe_index(video)
+        if db_manager is not None and video.video_id is not None:
+            db_manager.save_video_index(
+                video.video_id, index.pts_times, index.keyframe_flags)
+
+    _keyframe_index_cache[video.source_path] = index
+    return index
+
+
+class SceneScores:
+    """
+    Scene-change score (0-1, as computed by ffmpeg's `scene` expression) of
+    every frame of a video, sorted by PTS. Thresholding them gives the same
+    cuts as running the scene filter with that threshold. `method` names
+    the backend that computed them ("ffmpeg" or "numpy").
+    """
+
+    def __init__(
+        self,
+        pts_times: np.ndarray,
+        scores: np.ndarray,
+        method: str = "ffmpeg"
+    ) -> None:
+        pts_times = np.asarray(pts_times, dtype=np.float64)
+        scores = np.asarray(scores, dtype=np.float32)
+        if pts_times.shape != scores.shape:
+            raise ValueError("pts_times and scores must have the same length")
+        order = np.argsort(pts_times, kind="stable")
+        self.pts_times = pts_times[order]
+        self.scores = scores[order]
+        self.method = method
+
+    def __len__(self) -> int:
+        return len(self.pts_times)
+
+    def cut_times(self, scene_threshold: float) -> np.ndarray:
+        """
+        PTS of every frame whose score exceeds `scene_threshold`.
+        """
+        return self.pts_times[self.scores > scene_threshold]
+
+
+# Scene scores already loaded in this process, keyed by source path and
+# analysis settings
+_scene_scores_cache: Dict[Tuple[str, str], SceneScores] = {}
+
+_METADATA_SCORE_PREFIX = "lavfi.scene_score="
+
+
+def compute_scene_scores(
+    video: Video,
+    analysis_width: Optional[int] = None,
+    threads: Optional[int] = None,
+    lowres: int = 0,
+    method: str = "auto"
+) -> SceneScores:
+    """
+    Decode `video` once and return the scene score of every frame.
+
+    method:
+      - "ffmpeg": select every frame through ffmpeg's scene expression and
+        read the scores printed by the metadata filter.
+      - "numpy": decode with OpenCV and apply ffmpeg's scene formula to luma
+        frame differences. This approximates the ffmpeg scores rather than
+        reproducing them: ffmpeg averages all planes, and frame times come
+        from OpenCV.
+      - "auto": "ffmpeg", falling back to "numpy" if ffmpeg cannot be started.
+
+    `analysis_width`, `threads` and `lowres` are as for detect_clips (only
+    `analysis_width` applies to "numpy").
+
+    Raises:
+        AppError if ffmpeg fails or the video cannot be opened.
+    """
+    if method not in ("auto", "ffmpeg", "numpy"):
+        raise ValueError("method must be 'auto', 'ffmpeg' or 'numpy'")
+    _validate_scene_analysis_args(analysis_width, threads, lowres)
+    if method != "numpy":
+        try:
+            return _scene_scores_ffmpeg(video, analysis_width, threads, lowres)
+        except FileNotFoundError:
+            if method == "ffmpeg":
+                raise AppError("Cannot start ffmpeg for scene scoring.")
+            logger.info("ffmpeg not found; computing scene scores with numpy.")
+    return _scene_scores_numpy(video, analysis_width)
+
+
+def _scene_scores_ffmpeg(
+    video: Video,
+    analysis_width: Optional[int],
+    threads: Optional[int],
+    lowres: int
+) -> SceneScores:
+    cmd = _scene_filter_command(
+        video, ["select='gte(scene,0)'", "metadata=print:file=-"],
+        analysis_width, threads, lowres)
+    try:
+        result = subprocess.run(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise AppError("Scene scoring failed.", internal_message=e.stderr)
+
+    pts_times: List[float] = []
+    scores: List[float] = []
+    current: Optional[float] = None
+    for line in result.stdout.splitlines():
+        line = line.strip()
+        if line.startswith("frame:"):
+            match = _SHOWINFO_PTS_RE.search(line)
+            current = float(match.group(1)) if match else None
+        elif line.startswith(_METADATA_SCORE_PREFIX) and current is not None:
+            pts_times.append(current)
+            scores.append(float(line[len(_METADATA_SCORE_PREFIX):]))
+            current = None
+    return SceneScores(np.array(pts_times), np.array(scores), method="ffmpeg")
+
+
+def _scene_scores_numpy(video: Video, analysis_width: Optional[int]) -> SceneScores:
+    """
+    ffmpeg's scene formula applied to OpenCV-decoded luma only: with mafd
+    the mean absolute frame difference in percent of 2^8, as ffmpeg
+    normalizes 8-bit planes, score = min(mafd, |mafd - previous mafd|) / 100.
+    The first frame scores 0.
+    """
+    capture = cv2.VideoCapture(video.source_path)
+    if not capture.isOpened():
+        raise AppError("Cannot open video file for scene scoring.",
+                       internal_message=video.source_path)
+    pts_times: List[float] = []
+    scores: List[float] = []
+    previous: Optional[np.ndarray] = None
+    previous_mafd = 0.0
+    try:
+        while True:
+            ret, frame = capture.read()
+            if not ret:
+                break
+            pts_times.append(capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+            luma = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            if analysis_width is not None and analysis_width < luma.shape[1]:
+                height = max(1, round(luma.shape[0] * analysis_width / luma.shape[1]))
+                luma = cv2.resize(luma, (analysis_width, height),
+                                  interpolation=cv2.INTER_AREA)
+            if previous is None:
+                scores.append(0.0)
+            else:
+                mafd = float(cv2.absdiff(luma, previous).mean()) * 100.0 / 256.0
+                scores.append(min(mafd, abs(mafd - previous_mafd)) / 100.0)
+                previous_mafd = mafd
+            previous = luma
+    finally:
+        capture.release()
+    return SceneScores(np.array(pts_times), np.array(scores), method="numpy")
+
+
+def load_scene_scores(
+    video: Video,
+    db_manager: Optional[DBManager] = None,
+    analysis_width: Optional[int] = None,
+    threads: Optional[int] = None,
+    lowres: int = 0,
+    method: str = "auto"
+) -> SceneScores:
+    """
+    Return the per-frame scene scores of `video`, computing them only when
+    needed: from scores already loaded in this process, then the
+    SceneScores table of `db_manager` (if the video has a video_id), then a
+    fresh compute_scene_scores pass, which is stored back to the database.
+    Scores are matched on the backend that computed them, `analysis_width`
+    and `lowres`, which all change them. With method "auto", scores from
+    either backend are accepted, preferring ffmpeg's.
+    """
+    options = f"width={analysis_width},lowres={lowres}"
+    methods = ("ffmpeg", "numpy") if method == "auto" else (method,)
+    accepted = [f"{m}:{options}" for m in methods]
+    for settings in accepted:
+        cached = _scene_scores_cache.get((video.source_path, settings))
+        if cached is not None:
+            return cached
+
+    scores = None
+    if db_manager is not None and video.video_id is not None:
+        stored = db_manager.get_scene_scores(video.video_id)
+        if stored is not None and stored[0] in accepted:
+            scores = SceneScores(np.frombuffer(stored[1], dtype=np.float64),
+                                 np.frombuffer(stored[2], dtype=np.float32),
+                                 method=stored[0].split(":", 1)[0])
+    if scores is None:
+        scores = compute_scene_scores(video, analysis_width, threads, lowres, method)
+        if db_manager is not None and video.video_id is not None:
+            db_manager.save_scene_scores(
+                video.video_id, f"{scores.method}:{options}",
+                scores.pts_times, scores.scores)
+
+    _scene_scores_cache[(video.source_path, f"{scores.method}:{options}")] = scores
+    return scores
+
+
+def detect_clips(
+    video: Video,
+    scene_threshold: float = 0.4,
+    analysis_width: Optional[int] = None,
+    threads: Optional[int] = None,
+    lowres: int = 0,
+    scene_scores: Optional["SceneScores"] = None
+) -> List[Clip]:
+    """
+    Split `video` into clips at the scene cuts found by ffmpeg's scene filter.
+
+    Cut detection does not need full resolution: with `analysis_width`
+    (e.g. 160), frames are scaled down to that width before the scene score
+    is computed. `threads` limits ffmpeg's decoder threads, and `lowres`
+    (1-3) asks decoders that support it (e.g. MJPEG) to decode at 1/2^lowres
+    size directly.
+
+    With `scene_scores` (see load_scene_scores), cuts are taken from the
+    stored per-frame scores instead, without decoding the video again; the
+    decoding options are then ignored.
+    """
+    if scene_scores is not None:
+        if not (0.0 < scene_threshold < 1.0):
+            raise ValueError("scene_threshold must be between 0.0 and 1.0")
+        return _clips_from_cuts(
+            video, scene_scores.cut_times(scene_threshold).tolist())
+
+    cmd = _scene_detect_command(video, scene_threshold, analysis_width,
+                                threads, lowres)
 
     try:
         result = subprocess.run(
@@ -57,7 +504,13 @@ def detect_clips(video: Video, scene_threshold: float = 0.4) -> List[Clip]:
         float(m.group(1))
         for m in re.finditer(r"pts_time:(\d+\.\d+)", result.stderr)
     )
+    return _clips_from_cuts(video, pts_times)
+
 
+def _clips_from_cuts(video: Video, pts_times: List[float]) -> List[Clip]:
+    """
+    Clips between consecutive cut times, from 0 to the end of the video.
+    """
     clips = []
     prev = 0.0
     for t in pts_times:
@@ -69,6 +522,229 @@ def detect_clips(video: Video, scene_threshold: float = 0.4) -> List[Clip]:
     return clips
 
 
+def iter_detect_clips(
+    video: Video,
+    scene_threshold: float = 0.4,
+    analysis_width: Optional[int] = None,
+    threads: Optional[int] = None,
+    lowres: int = 0
+) -> Iterator[Clip]:
+    """
+    Streaming counterpart of detect_clips: run the same ffmpeg scene filter
+    but read its stderr line by line, yielding each Clip as soon as the cut
+    that ends it is seen (the last clip once ffmpeg finishes). Frame
+    extraction and OCR can start on the first clip while detection is still
+    running over the rest of the file.
+
+    Arguments are validated immediately; ffmpeg starts on first iteration.
+    Closing the generator early stops ffmpeg.
+
+    Raises:
+        AppError if ffmpeg cannot be started or exits with an error.
+    """
+    cmd = _scene_detect_command(video, scene_threshold, analysis_width,
+                                threads, lowres)
+    return _iter_detect_clips(video, cmd)
+
+
+def detect_clips_parallel(
+    video: Video,
+    scene_threshold: float = 0.4,
+    workers: Optional[int] = None,
+    keyframe_index: Optional[KeyframeIndex] = None,
+    analysis_width: Optional[int] = None,
+    threads: Optional[int] = None,
+    lowres: int = 0
+) -> List[Clip]:
+    """
+    Like detect_clips, but split the video at keyframes into `workers`
+    segments (default: one per CPU) and run the scene filter on each in its
+    own ffmpeg process.
+
+    The scene score of a frame depends on the frames before it, so each
+    segment's ffmpeg starts one keyframe before the segment and cuts seen in
+    that warm-up stretch are discarded; every frame is therefore scored with
+    the same history as in a single pass, including frames right at segment
+    boundaries. ffmpeg reports each segment's times from its -ss point, so
+    that offset is added back; times then count from the start of the file
+    as in detect_clips, also when the stream's first PTS is above zero. The
+    per-segment cut lists are concatenated in order.
+
+    The keyframe index is loaded with load_keyframe_index if not given.
+    """
+    if not (0.0 < scene_threshold < 1.0):
+        raise ValueError("scene_threshold must be between 0.0 and 1.0")
+    _validate_scene_analysis_args(analysis_width, threads, lowres)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    if keyframe_index is None:
+        keyframe_index = load_keyframe_index(video)
+
+    boundaries = _keyframe_segment_boundaries(
+        video.duration, workers, keyframe_index)
+    segments = list(zip(boundaries, boundaries[1:] + [None]))
+    commands = []
+    offsets = []
+    for start, end in segments:
+        options = []
+        offset = 0.0
+        if start > 0:
+            offset = keyframe_index.keyframe_time_before(start - 1e-3)
+            options += ["-ss", f"{offset:.6f}"]
+        if end is not None:
+            options += ["-to", f"{end:.6f}"]
+        commands.append(_scene_filter_command(
+            video, [f"select='gt(scene,{scene_threshold})'", "showinfo"],
+            analysis_width, threads, lowres, input_options=options))
+        offsets.append(round(offset, 6))
+
+    with ThreadPoolExecutor(max_workers=len(segments)) as executor:
+        segment_cuts = list(executor.map(_run_scene_segment, commands))
+
+    cuts: List[float] = []
+    for (start, end), offset, times in zip(segments, offsets, segment_cuts):
+        cuts.extend(t + offset for t in times
+                    if start - 1e-6 <= t + offset and (end is None or t + offset < end - 1e-6))
+    return _clips_from_cuts(video, cuts)
+
+
+def _keyframe_segment_boundaries(
+    duration: float,
+    segment_count: int,
+    keyframe_index: KeyframeIndex
+) -> List[float]:
+    """
+    Start times of up to `segment_count` segments of roughly equal length,
+    each starting on a keyframe; the first starts at 0.
+    """
+    boundaries = [0.0]
+    for i in range(1, segment_count):
+        t = keyframe_index.keyframe_time_before(duration * i / segment_count)
+        if t > boundaries[-1] + 1e-6:
+            boundaries.append(t)
+    return boundaries
+
+
+def _run_scene_segment(cmd: List[str]) -> List[float]:
+    """
+    Run one segment's scene filter and return its cut times, sorted.
+    """
+    try:
+        result = subprocess.run(
+            cmd, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise AppError("Scene detection failed.", internal_message=e.stderr)
+    except OSError as e:
+        raise AppError("Cannot start ffmpeg for scene detection.",
+                       internal_message=str(e))
+    times = []
+    for line in result.stderr.splitlines():
+        if "showinfo" in line:
+            match = _SHOWINFO_PTS_RE.search(line)
+            if match:
+                times.append(float(match.group(1)))
+    return sorted(times)
+
+
+def _scene_detect_command(
+    video: Video,
+    scene_threshold: float,
+    analysis_width: Optional[int],
+    threads: Optional[int],
+    lowres: int
+) -> List[str]:
+    if not (0.0 < scene_threshold < 1.0):
+        raise ValueError("scene_threshold must be between 0.0 and 1.0")
+    return _scene_filter_command(
+        video, [f"select='gt(scene,{scene_threshold})'", "showinfo"],
+        analysis_width, threads, lowres)
+
+
+def _validate_scene_analysis_args(
+    analysis_width: Optional[int],
+    threads: Optional[int],
+    lowres: int
+) -> None:
+    if analysis_width is not None and analysis_width <= 0:
+        raise ValueError("analysis_width must be greater than 0")
+    if threads is not None and threads < 1:
+        raise ValueError("threads must be at least 1")
+    if lowres not in (0, 1, 2, 3):
+        raise ValueError("lowres must be 0, 1, 2 or 3")
+
+
+def _scene_filter_command(
+    video: Video,
+    filters: List[str],
+    analysis_width: Optional[int],
+    threads: Optional[int],
+    lowres: int,
+    input_options: Optional[List[str]] = None
+) -> List[str]:
+    """
+    ffmpeg command running `filters` over the (optionally downscaled)
+    decoded video and discarding the output. `input_options` (e.g. -ss/-to)
+    are passed before the input.
+    """
+    _validate_scene_analysis_args(analysis_width, threads, lowres)
+    cmd = ["ffmpeg", "-hide_banner", "-nostats"]
+    # Decoder options go before the input they apply to
+    if threads is not None:
+        cmd += ["-threads", str(threads)]
+    if lowres:
+        cmd += ["-lowres", str(lowres)]
+    cmd += (input_options or []) + ["-i", video.source_path]
+
+    if analysis_width is not None:
+        filters = [f"scale={analysis_width}:-2:flags=fast_bilinear"] + filters
+    if threads is not None:
+        cmd += ["-filter_complex_threads", str(threads)]
+    return cmd + ["-filter_complex", ",".join(filters), "-f", "null", "-"]
+
+
+def _iter_detect_clips(video: Video, cmd: List[str]) -> Iterator[Clip]:
+    try:
+        process = subprocess.Popen(
+            cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    except OSError as e:
+        raise AppError("Cannot start ffmpeg for scene detection.",
+                       internal_message=str(e))
+
+    stderr_tail: Deque[str] = deque(maxlen=50)
+    finished = False
+    prev = 0.0
+    try:
+        for raw in process.stderr:  # type: ignore
+            line = raw.decode(errors="replace").rstrip()
+            stderr_tail.append(line)
+            if "showinfo" not in line:
+                continue
+            match = _SHOWINFO_PTS_RE.search(line)
+            if match is None:
+                continue
+            t = float(match.group(1))
+            if t <= prev:
+                continue
+            yield Clip(video_id=video.video_id,  # type: ignore
+                       start_time=prev, end_time=t)
+            prev = t
+        finished = True
+    finally:
+        if not finished:
+            # Consumer stopped early; don't wait for the rest of the file
+            process.kill()
+        process.stderr.close()  # type: ignore
+        returncode = process.wait()
+
+    if returncode != 0:
+        raise AppError("Scene detection failed.",
+                       internal_message="\n".join(stderr_tail))
+    yield Clip(video_id=video.video_id, start_time=prev,  # type: ignore
+               end_time=video.duration)
+
+
 def merge_clips(clips: List[Clip], clip_ids_to_merge: List[int]) -> Clip:
     if not clip_ids_to_merge or sorted(clip_ids_to_merge) != clip_ids_to_merge:
         raise ValueError("clip_ids_to_merge must be a sorted, non-empty list")
@@ -112,54 +788,1054 @@ def split_clip(clips: List[Clip], clip_id_to_split: int, split_time: float) -> T
     return new1, new2
 
 
+def export_clip(
+    clip: Clip,
+    video: Video,
+    output_path: str,
+    keyframe_index: Optional[KeyframeIndex] = None
+) -> str:
+    """
+    Trim `clip` out of the source video into `output_path` (stream copy, so
+    the cut snaps to keyframes) and record it as `clip.file_path`.
+
+    With a keyframe index the copy starts exactly at the keyframe at or
+    before `clip.start_time` instead of relying on ffmpeg's seek.
+
+    Raises:
+        AppError if ffmpeg fails.
+    """
+    parent_dir = os.path.dirname(os.path.abspath(output_path))
+    if parent_dir and not os.path.isdir(parent_dir):
+        os.makedirs(parent_dir, exist_ok=True)
+
+    start_time = clip.start_time
+    if keyframe_index is not None:
+        start_time = keyframe_index.keyframe_time_before(start_time)
+
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-ss", str(start_time),
+        "-to", str(clip.end_time),
+        "-i", video.source_path,
+        "-c", "copy",
+        output_path
+    ]
+
+    try:
+        subprocess.run(cmd, stderr=subprocess.PIPE,
+                       stdout=subprocess.DEVNULL, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise AppError("Failed to trim clip.", internal_message=e.stderr)
+    clip.file_path = output_path
+    return output_path
+
+
 def extract_frames_for_clip(
     clip: Clip,
     video: Video,
     sampling_rate_fps: float,
-    temp_dir: Optional[str] = None
-) -> FrameBatch:
-    if sampling_rate_fps <= 0:
-        raise ValueError("sampling_rate_fps must be greater than 0")
+    mode: str = "seek",
+    seek_threshold_frames: Optional[int] = None,
+    crop: Optional[ROI] = None,
+    grayscale: bool = False,
+    rois: Optional[List[ROI]] = None,
+    keyframe_index: Optional[KeyframeIndex] = None
+) -> Union[FrameBatch, ROIFrameBatch]:
+    """
+    Sample frames from `clip` at `sampling_rate_fps` into a batch.
+    See iter_frames for the sampling options.
 
-    if clip.file_path is None:
-        if temp_dir is None:
-            temp_dir = tempfile.mkdtemp()
-        temp_clip_path = os.path.join(
-            temp_dir, f"clip_{clip.clip_id or 'temp'}.mp4")
-
-        cmd = [
-            "ffmpeg",
-            "-ss", str(clip.start_time),
-            "-to", str(clip.end_time),
-            "-i", video.source_path,
-            "-c", "copy",
-            temp_clip_path
+    If `rois` is given, an ROIFrameBatch holding only those crops is
+    returned instead of a FrameBatch of full frames.
+    """
+    # An ROIFrameBatch converts its crops rather than the full frame, unless
+    # ffmpeg already does the conversion in its filter graph
+    frame_grayscale = grayscale and (
+        rois is None or mode in ("ffmpeg", "keyframes"))
+    frames = iter_frames(clip, video, sampling_rate_fps, mode=mode,
+                         seek_threshold_frames=seek_threshold_frames,
+                         crop=crop, grayscale=frame_grayscale,
+                         keyframe_index=keyframe_index)
+
+    capacity = len(_sample_times(
+        clip.end_time - clip.start_time, sampling_rate_fps))
+    frame_batch = _new_batch(clip, rois, grayscale, capacity)
+    with closing(frames):
+        for timestamp, frame in frames:
+            frame_batch.add_frame(frame, timestamp)
+    return frame_batch
+
+
+def extract_frames_for_video(
+    video: Video,
+    clips: List[Clip],
+    sampling_rate_fps: float,
+    mode: str = "sequential",
+    seek_threshold_frames: Optional[int] = None,
+    crop: Optional[ROI] = None,
+    grayscale: bool = False,
+    rois: Optional[List[ROI]] = None,
+    keyframe_index: Optional[KeyframeIndex] = None
+) -> List[Union[FrameBatch, ROIFrameBatch]]:
+    """
+    Sample frames for every clip of `video` in one pass over the source.
+
+    Each clip keeps its own sampling grid (as in extract_frames_for_clip);
+    the grids are merged into one time-ordered schedule, decoded with a
+    single VideoCapture and each frame is routed to its clip's batch.
+    Returns one batch per clip, in the order of `clips`.
+
+    Only the OpenCV modes ("seek", "sequential") are supported.
+    """
+    _validate_sampling_args(video, sampling_rate_fps, mode, crop)
+    if mode not in ("seek", "sequential"):
+        raise ValueError(
+            "extract_frames_for_video supports 'seek' and 'sequential' modes")
+
+    schedule: List[Tuple[float, int]] = []
+    batches: List[Union[FrameBatch, ROIFrameBatch]] = []
+    for index, clip in enumerate(clips):
+        offsets = _sample_times(
+            clip.end_time - clip.start_time, sampling_rate_fps)
+        schedule.extend((clip.start_time + o, index) for o in offsets)
+        batches.append(_new_batch(clip, rois, grayscale, len(offsets)))
+    schedule.sort(key=lambda entry: entry[0])
+    if not schedule:
+        return batches
+
+    capture = cv2.VideoCapture(video.source_path)
+    if not capture.isOpened():
+        raise AppError("Cannot open video file for frame extraction.",
+                       internal_message=video.source_path)
+
+    times = [t for t, _ in schedule]
+    frames = _read_frames(capture, times, mode,
+                          seek_threshold_frames, keyframe_index)
+
+    try:
+        # Readers yield in schedule order and stop at the first failed read
+        for (timestamp, frame), (_, index) in zip(frames, schedule):
+            batches[index].add_frame(
+                _crop_and_convert(frame, crop, grayscale and rois is None),
+                timestamp)
+    finally:
+        capture.release()
+    return batches
+
+
+def extract_frames_and_detect_clips(
+    video: Video,
+    sampling_rate_fps: float,
+    scene_threshold: float = 0.4,
+    analysis_width: int = 64,
+    histogram_bins: int = 32,
+    crop: Optional[ROI] = None,
+    grayscale: bool = False,
+    rois: Optional[List[ROI]] = None
+) -> List[Tuple[Clip, Union[FrameBatch, ROIFrameBatch]]]:
+    """
+    Detect clips and sample their frames in a single decode of `video`,
+    instead of one ffmpeg scene pass followed by one OpenCV pass per clip.
+
+    Every frame is decoded once. Its luma is downsampled to
+    `analysis_width` pixels wide and reduced to a `histogram_bins`-bin
+    histogram; a frame whose histogram differs from the previous frame's by
+    more than `scene_threshold` (half the L1 distance of the normalized
+    histograms, 0-1) starts a new clip. Luma histograms ignore small
+    overlays such as the watermark text, so only real scene changes count.
+
+    Within each clip, frames are sampled at `sampling_rate_fps` from the
+    clip's first frame, as extract_frames_for_clip would, with `crop`,
+    `grayscale` and `rois` applied as there. Returns (clip, batch) pairs in
+    time order; clips have no clip_id yet.
+
+    Raises:
+        AppError if the video cannot be opened.
+    """
+    _validate_sampling_args(video, sampling_rate_fps, "sequential", crop)
+    if not (0.0 < scene_threshold < 1.0):
+        raise ValueError("scene_threshold must be between 0.0 and 1.0")
+    if analysis_width <= 0:
+        raise ValueError("analysis_width must be greater than 0")
+    if not (2 <= histogram_bins <= 256):
+        raise ValueError("histogram_bins must be between 2 and 256")
+
+    capture = cv2.VideoCapture(video.source_path)
+    if not capture.isOpened():
+        raise AppError("Cannot open video file for frame extraction.",
+                       internal_message=video.source_path)
+
+    frame_grayscale = grayscale and rois is None
+    interval = 1.0 / sampling_rate_fps
+    results: List[Tuple[Clip, Union[FrameBatch, ROIFrameBatch]]] = []
+    clip: Optional[Clip] = None
+    batch: Optional[Union[FrameBatch, ROIFrameBatch]] = None
+    previous_histogram: Optional[np.ndarray] = None
+    next_sample = 0.0
+    try:
+        while True:
+            ret, frame = capture.read()
+            if not ret:
+                break
+            t = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            histogram = _luma_histogram(frame, analysis_width, histogram_bins)
+            is_cut = previous_histogram is not None and \
+                0.5 * float(np.abs(histogram - previous_histogram).sum()) > scene_threshold
+            previous_histogram = histogram
+
+            if clip is None or is_cut:
+                if clip is not None:
+                    clip.end_time = t
+                clip = Clip(video_id=video.video_id,  # type: ignore
+                            start_time=0.0 if clip is None else t,
+                            end_time=video.duration)
+                batch = _new_batch(clip, rois, grayscale, 16)
+                results.append((clip, batch))
+                next_sample = clip.start_time
+
+            # Same sample choice as sequential mode: the first frame at or
+            # after each grid time
+            if t >= next_sample - 1e-6:
+                batch.add_frame(_crop_and_convert(frame, crop, frame_grayscale), t)  # type: ignore
+                while next_sample <= t + 1e-6:
+                    next_sample += interval
+    finally:
+        capture.release()
+    return results
+
+
+def _luma_histogram(frame: np.ndarray, analysis_width: int, bins: int) -> np.ndarray:
+    """
+    Normalized `bins`-bin histogram of the frame's luma, downsampled to
+    `analysis_width` pixels wide.
+    """
+    luma = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    if analysis_width < luma.shape[1]:
+        height = max(1, round(luma.shape[0] * analysis_width / luma.shape[1]))
+        luma = cv2.resize(luma, (analysis_width, height), interpolation=cv2.INTER_AREA)
+    counts = np.bincount((luma.ravel().astype(np.uint16) * bins) >> 8, minlength=bins)
+    return counts / float(luma.size)
+
+
+def extract_frames_adaptive(
+    clip: Clip,
+    video: Video,
+    coarse_fps: float = 1.0,
+    resolution: float = 0.04,
+    change_threshold: float = 2.0,
+    change_fn: Optional[Callable[[np.ndarray, np.ndarray], bool]] = None,
+    mode: str = "sequential",
+    crop: Optional[ROI] = None,
+    grayscale: bool = False,
+    rois: Optional[List[ROI]] = None,
+    keyframe_index: Optional[KeyframeIndex] = None
+) -> Union[FrameBatch, ROIFrameBatch]:
+    """
+    Sample `clip` coarsely at `coarse_fps` and, wherever two consecutive
+    samples differ, bisect the interval between them with seeks until the
+    transition is pinned down to `resolution` seconds.
+
+    Returns a batch holding the clip's first frame and the first frame after
+    each transition, stamped with its time: a change-point timeline of the
+    overlay, decoded from a small fraction of the frames a uniform sampling
+    at 1 / `resolution` would need. Changes that revert within one coarse
+    interval are not seen.
+
+    By default two frames differ if the mean absolute pixel difference of
+    any ROI in `rois` (or of the whole frame) exceeds `change_threshold`.
+    `change_fn(previous, current) -> bool` replaces that test, e.g. with a
+    comparison of OCR text. Frames passed to it have `crop` and, without
+    `rois`, `grayscale` applied.
+
+    The coarse pass uses `mode` as in iter_frames; bisection seeks go
+    through a second decoder, by exact frame index if a `keyframe_index` is
+    given.
+    """
+    _validate_sampling_args(video, coarse_fps, mode, crop)
+    if resolution <= 0:
+        raise ValueError("resolution must be greater than 0")
+    frame_grayscale = grayscale and (
+        rois is None or mode in ("ffmpeg", "keyframes"))
+    if change_fn is None:
+        def change_fn(previous: np.ndarray, current: np.ndarray) -> bool:
+            return _max_region_change(previous, current, rois) > change_threshold
+
+    frame_batch = _new_batch(clip, rois, grayscale, 16)
+    coarse = iter_frames(clip, video, coarse_fps, mode=mode, crop=crop,
+                         grayscale=frame_grayscale, keyframe_index=keyframe_index)
+    capture = cv2.VideoCapture(video.source_path)
+    if not capture.isOpened():
+        raise AppError("Cannot open video file for frame extraction.",
+                       internal_message=video.source_path)
+
+    def read_at(t: float) -> Optional[Tuple[float, np.ndarray]]:
+        for timestamp, frame in _read_frames_seek(capture, [t], keyframe_index):
+            return timestamp, _crop_and_convert(frame, crop, frame_grayscale)
+        return None
+
+    try:
+        with closing(coarse):
+            previous: Optional[Tuple[float, np.ndarray]] = None
+            for timestamp, frame in coarse:
+                if previous is None:
+                    frame_batch.add_frame(frame, timestamp)
+                elif change_fn(previous[1], frame):
+                    t, change_frame = _bisect_change(
+                        previous, (timestamp, frame), resolution, change_fn, read_at)
+                    frame_batch.add_frame(change_frame, t)
+                previous = (timestamp, frame)
+    finally:
+        capture.release()
+    return frame_batch
+
+
+def _bisect_change(
+    before: Tuple[float, np.ndarray],
+    after: Tuple[float, np.ndarray],
+    resolution: float,
+    change_fn: Callable[[np.ndarray, np.ndarray], bool],
+    read_at: Callable[[float], Optional[Tuple[float, np.ndarray]]]
+) -> Tuple[float, np.ndarray]:
+    """
+    Narrow a changed interval (before, after] down to `resolution` seconds
+    and return the first sample known to show the change.
+    """
+    lo_time, lo_frame = before
+    hi_time, hi_frame = after
+    while hi_time - lo_time > resolution:
+        sample = read_at((lo_time + hi_time) / 2.0)
+        # Stop if the seek failed or landed outside the interval (no frame
+        # strictly between the two ends)
+        if sample is None or not (lo_time < sample[0] < hi_time):
+            break
+        if change_fn(lo_frame, sample[1]):
+            hi_time, hi_frame = sample
+        else:
+            lo_time, lo_frame = sample
+    return hi_time, hi_frame
+
+
+def _max_region_change(
+    previous: np.ndarray,
+    current: np.ndarray,
+    rois: Optional[List[ROI]]
+) -> float:
+    """
+    Largest mean absolute pixel difference over `rois` (or the whole frame).
+    """
+    if previous.shape != current.shape:
+        return float("inf")
+    if not rois:
+        regions = [(previous, current)]
+    else:
+        regions = [
+            (previous[r.y: r.y + r.height, r.x: r.x + r.width],
+             current[r.y: r.y + r.height, r.x: r.x + r.width])
+            for r in rois
         ]
+    changes = [
+        float(np.abs(a.astype(np.int16) - b.astype(np.int16)).mean())
+        for a, b in regions if a.size
+    ]
+    return max(changes, default=0.0)
+
+
+def extract_frames_parallel(
+    clip: Clip,
+    video: Video,
+    sampling_rate_fps: float,
+    workers: Optional[int] = None,
+    mode: str = "sequential",
+    seek_threshold_frames: Optional[int] = None,
+    crop: Optional[ROI] = None,
+    grayscale: bool = False,
+    rois: Optional[List[ROI]] = None,
+    keyframe_index: Optional[KeyframeIndex] = None,
+    transport: str = "pickle",
+    ring_slots: Optional[int] = None
+) -> Union[FrameBatch, ROIFrameBatch]:
+    """
+    Like extract_frames_for_clip, but split the sampling grid into
+    `workers` segments (default: one per CPU) and decode them in a process
+    pool, each worker with its own VideoCapture. Segment boundaries are
+    placed on keyframes when a `keyframe_index` is given, so no worker
+    decodes a GOP that another worker also needs. Results are merged back
+    in timestamp order.
+
+    The keyframe index is loaded with load_keyframe_index if not given. If
+    the video cannot be indexed (e.g. ffprobe is not installed), segments
+    are split on the sampling grid alone, since decoding needs only OpenCV.
 
+    transport:
+      - "pickle": each worker returns its segment's frames as a pickled list.
+      - "shared_memory": workers write frames into a SharedFrameRing of
+        `ring_slots` slots (default: four per worker) and send only slot
+        indices back; the parent copies each frame out once and frees the
+        slot.
+
+    Only the OpenCV modes ("seek", "sequential") are supported.
+    """
+    _validate_sampling_args(video, sampling_rate_fps, mode, crop)
+    if mode not in ("seek", "sequential"):
+        raise ValueError(
+            "extract_frames_parallel supports 'seek' and 'sequential' modes")
+    if transport not in ("pickle", "shared_memory"):
+        raise ValueError("transport must be 'pickle' or 'shared_memory'")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+
+    if keyframe_index is None:
         try:
-            subprocess.run(cmd, stderr=subprocess.PIPE,
-                           stdout=subprocess.DEVNULL, text=True, check=True)
-            clip.file_path = temp_clip_path
-        except subprocess.CalledProcessError as e:
-            raise AppError("Failed to trim clip.", internal_message=e.stderr)
+            keyframe_index = load_keyframe_index(video)
+        except (AppError, FileNotFoundError):
+            logger.info("Cannot index keyframes of %s; segments are not "
+                        "keyframe-aligned.", video.source_path)
+
+    times = [clip.start_time + o for o in _sample_times(
+        clip.end_time - clip.start_time, sampling_rate_fps)]
+    frame_batch = _new_batch(clip, rois, grayscale, len(times))
+    segments = _split_segments(times, workers, keyframe_index)
+    frame_grayscale = grayscale and rois is None
+    pool_size = min(workers, max(1, len(segments)))
+
+    if transport == "shared_memory":
+        shape = _frame_shape(video.resolution, crop, frame_grayscale)
+        segment_frames = _decode_segments_shared(
+            video.source_path, segments, pool_size, ring_slots or 4 * pool_size,
+            shape, mode, seek_threshold_frames, crop, frame_grayscale,
+            keyframe_index)
+    else:
+        with ProcessPoolExecutor(max_workers=pool_size) as executor:
+            futures = [
+                executor.submit(_decode_segment, video.source_path, segment,
+                                mode, seek_threshold_frames, crop,
+                                frame_grayscale, keyframe_index)
+                for segment in segments
+            ]
+            segment_frames = [future.result() for future in futures]
+
+    # Segments are contiguous and in order, so so are their results
+    for frames in segment_frames:
+        for timestamp, frame in frames:
+            frame_batch.add_frame(frame, timestamp)
+    return frame_batch
+
+
+def _split_segments(
+    times: List[float],
+    segment_count: int,
+    keyframe_index: Optional[KeyframeIndex]
+) -> List[List[float]]:
+    """
+    Split sorted sample times into at most `segment_count` contiguous,
+    non-empty segments of roughly equal duration, with boundaries moved to
+    the nearest keyframe when an index is available.
+    """
+    if not times:
+        return []
+    start, end = times[0], times[-1]
+    boundaries = [start + (end - start) * k / segment_count
+                  for k in range(1, segment_count)]
+    if keyframe_index is not None and len(keyframe_index.keyframe_times):
+        keyframe_times = keyframe_index.keyframe_times
+        boundaries = [
+            float(keyframe_times[np.abs(keyframe_times - b).argmin()])
+            for b in boundaries
+        ]
+
+    segments: List[List[float]] = []
+    current: List[float] = []
+    bounds = iter(sorted(set(boundaries)))
+    next_bound = next(bounds, None)
+    for t in times:
+        while next_bound is not None and t >= next_bound:
+            if current:
+                segments.append(current)
+                current = []
+            next_bound = next(bounds, None)
+        current.append(t)
+    if current:
+        segments.append(current)
+    return segments
+
+
+def _decode_segment(
+    source_path: str,
+    times: List[float],
+    mode: str,
+    seek_threshold_frames: Optional[int],
+    crop: Optional[ROI],
+    grayscale: bool,
+    keyframe_index: Optional[KeyframeIndex]
+) -> List[Tuple[float, np.ndarray]]:
+    """
+    Process-pool worker: decode the frames at `times` with a private
+    VideoCapture.
+    """
+    capture = cv2.VideoCapture(source_path)
+    if not capture.isOpened():
+        raise AppError("Cannot open video file for frame extraction.",
+                       internal_message=source_path)
+    try:
+        return [
+            (timestamp, _crop_and_convert(frame, crop, grayscale))
+            for timestamp, frame in _read_frames(
+                capture, times, mode, seek_threshold_frames, keyframe_index)
+        ]
+    finally:
+        capture.release()
+
+
+# Per-process state of shared-memory decode workers
+_worker_ring: Optional[SharedFrameRing] = None
+_worker_results: "Optional[multiprocessing.Queue]" = None
+_worker_cancel: "Optional[multiprocessing.synchronize.Event]" = None
+
 
-    capture = cv2.VideoCapture(clip.file_path)
+def _init_shared_worker(
+    ring: SharedFrameRing,
+    results: "multiprocessing.Queue",
+    cancel: "multiprocessing.synchronize.Event"
+) -> None:
+    global _worker_ring, _worker_results, _worker_cancel
+    _worker_ring = ring
+    _worker_results = results
+    _worker_cancel = cancel
+
+
+def _decode_segment_to_ring(
+    segment_index: int,
+    source_path: str,
+    times: List[float],
+    mode: str,
+    seek_threshold_frames: Optional[int],
+    crop: Optional[ROI],
+    grayscale: bool,
+    keyframe_index: Optional[KeyframeIndex]
+) -> int:
+    """
+    Shared-memory worker: decode like _decode_segment, but write each frame
+    into a ring slot and send (segment_index, timestamp, slot) to the
+    parent. (segment_index, None, None) is always sent last, also when the
+    segment fails or is cancelled, so the parent knows when to stop waiting.
+    """
+    ring, results, cancel = _worker_ring, _worker_results, _worker_cancel
+    capture = None
+    count = 0
+    try:
+        capture = cv2.VideoCapture(source_path)
+        if not capture.isOpened():
+            raise AppError("Cannot open video file for frame extraction.",
+                           internal_message=source_path)
+        for timestamp, frame in _read_frames(
+                capture, times, mode, seek_threshold_frames, keyframe_index):
+            slot = ring.acquire(cancel=cancel)  # type: ignore
+            try:
+                ring.write(slot, _crop_and_convert(frame, crop, grayscale))  # type: ignore
+                results.put((segment_index, timestamp, slot))  # type: ignore
+            except BaseException:
+                ring.release(slot)  # type: ignore
+                raise
+            count += 1
+    finally:
+        if capture is not None:
+            capture.release()
+        results.put((segment_index, None, None))  # type: ignore
+    return count
+
+
+def _decode_segments_shared(
+    source_path: str,
+    segments: List[List[float]],
+    pool_size: int,
+    ring_slots: int,
+    shape: Tuple[int, ...],
+    mode: str,
+    seek_threshold_frames: Optional[int],
+    crop: Optional[ROI],
+    grayscale: bool,
+    keyframe_index: Optional[KeyframeIndex]
+) -> List[List[Tuple[float, np.ndarray]]]:
+    """
+    Run _decode_segment_to_ring over `segments` and collect their frames.
+
+    When a segment fails, the remaining workers are cancelled, and slots
+    keep being released until every worker has stopped, so none is left
+    blocked in acquire() and the pool can shut down. The first failure is
+    then re-raised.
+    """
+    ctx = multiprocessing.get_context()
+    results = ctx.Queue()
+    cancel = ctx.Event()
+    segment_frames: List[List[Tuple[float, np.ndarray]]] = [
+        [] for _ in segments]
+    error: Optional[BaseException] = None
+    with SharedFrameRing(shape, ring_slots, ctx=ctx) as ring:
+        with ProcessPoolExecutor(max_workers=pool_size, mp_context=ctx,
+                                 initializer=_init_shared_worker,
+                                 initargs=(ring, results, cancel)) as executor:
+            futures = [
+                executor.submit(_decode_segment_to_ring, i, source_path,
+                                segment, mode, seek_threshold_frames, crop,
+                                grayscale, keyframe_index)
+                for i, segment in enumerate(segments)
+            ]
+            pending = len(segments)
+            while pending:
+                if error is None:
+                    error = next((f.exception() for f in futures
+                                  if f.done() and f.exception() is not None), None)
+                    if error is not None:
+                        cancel.set()
+                try:
+                    index, timestamp, slot = results.get(timeout=0.1)
+                except queue.Empty:
+                    # A crashed worker sends no sentinel; once every task has
+                    # finished after a failure there is nothing left to wait for
+                    if error is not None and all(f.done() for f in futures):
+                        break
+                    continue
+                if slot is None:
+                    pending -= 1
+                    continue
+                if error is None:
+                    # Copy out so the slot can be reused straight away
+                    segment_frames[index].append(
+                        (timestamp, np.array(ring.view(slot))))
+                ring.release(slot)
+            if error is not None:
+                raise error
+            for future in futures:
+                future.result()
+    return segment_frames
+
+
+def iter_frames(
+    clip: Clip,
+    video: Video,
+    sampling_rate_fps: float,
+    mode: str = "seek",
+    seek_threshold_frames: Optional[int] = None,
+    crop: Optional[ROI] = None,
+    grayscale: bool = False,
+    keyframe_index: Optional[KeyframeIndex] = None
+) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    Yield (timestamp, frame) for `clip` sampled at `sampling_rate_fps`, as
+    frames are decoded. Only the current frame is held in memory.
+
+    Frames are decoded directly from `video.source_path` over the
+    [start_time, end_time) window; no clip file is written (see export_clip).
+
+    mode:
+      - "seek": seek to every sample time (one keyframe seek per sample).
+      - "sequential": decode the stream forward once, skipping unsampled
+        frames with grab(); gaps longer than `seek_threshold_frames` are
+        seeked over instead.
+      - "ffmpeg": decode the source through a single ffmpeg process whose
+        filter graph does the sampling, cropping and color conversion, and
+        read raw frames from its stdout.
+      - "keyframes": like "ffmpeg", but decode only I-frames. Each sample
+        time snaps to the nearest keyframe and the keyframe's actual PTS is
+        yielded as the timestamp; samples that snap to the same keyframe
+        yield it once. Intended for sampling rates at or below the keyframe
+        rate.
+
+    If `crop` is given, frames are cropped to that region (ROI coordinates
+    used for OCR must then be relative to the crop). If `grayscale` is True,
+    frames are single-channel instead of BGR.
+
+    A `keyframe_index` (see load_keyframe_index) makes the "seek" and
+    "sequential" modes seek by exact frame index, choose seek vs. forward
+    decode from the real keyframe positions, and yield each frame's real PTS.
+
+    Arguments are validated immediately; decoding starts on first iteration.
+    Close the generator to release the decoder early.
+    """
+    _validate_sampling_args(video, sampling_rate_fps, mode, crop)
+    return _iter_frames(clip, video, sampling_rate_fps, mode,
+                        seek_threshold_frames, crop, grayscale, keyframe_index)
+
+
+def _iter_frames(
+    clip: Clip,
+    video: Video,
+    sampling_rate_fps: float,
+    mode: str,
+    seek_threshold_frames: Optional[int],
+    crop: Optional[ROI],
+    grayscale: bool,
+    keyframe_index: Optional[KeyframeIndex]
+) -> Iterator[Tuple[float, np.ndarray]]:
+    times = _sample_times(clip.end_time - clip.start_time, sampling_rate_fps)
+
+    if mode == "ffmpeg":
+        cmd = _ffmpeg_frame_command(
+            video.source_path, clip.start_time, clip.end_time,
+            sampling_rate_fps, crop, grayscale)
+        shape = _frame_shape(video.resolution, crop, grayscale)
+        with closing(_read_frames_ffmpeg(cmd, shape)) as frames:
+            for offset, frame in zip(times, frames):
+                yield clip.start_time + offset, frame
+        return
+
+    if mode == "keyframes":
+        cmd = _ffmpeg_frame_command(
+            video.source_path, clip.start_time, clip.end_time,
+            sampling_rate_fps, crop, grayscale, keyframes_only=True)
+        shape = _frame_shape(video.resolution, crop, grayscale)
+        yield from _read_keyframes_ffmpeg(
+            cmd, shape, clip.start_time,
+            [clip.start_time + offset for offset in times])
+        return
+
+    capture = cv2.VideoCapture(video.source_path)
     if not capture.isOpened():
-        raise AppError("Cannot open clip file for frame extraction.",
-                       internal_message=clip.file_path)
+        raise AppError("Cannot open video file for frame extraction.",
+                       internal_message=video.source_path)
+
+    # Sample times are absolute positions in the source
+    times = [clip.start_time + offset for offset in times]
+    frames = _read_frames(capture, times, mode,
+                          seek_threshold_frames, keyframe_index)
+
+    try:
+        for timestamp, frame in frames:
+            yield timestamp, _crop_and_convert(frame, crop, grayscale)
+    finally:
+        capture.release()
+
+
+def _validate_sampling_args(
+    video: Video,
+    sampling_rate_fps: float,
+    mode: str,
+    crop: Optional[ROI]
+) -> None:
+    if sampling_rate_fps <= 0:
+        raise ValueError("sampling_rate_fps must be greater than 0")
+    if mode not in SAMPLING_MODES:
+        raise ValueError(f"mode must be one of {SAMPLING_MODES}")
+    if crop is not None:
+        width, height = video.resolution
+        if crop.x < 0 or crop.y < 0 or crop.x + crop.width > width or crop.y + crop.height > height:
+            raise ValueError("crop must lie within the video resolution")
+
+
+def _new_batch(
+    clip: Clip,
+    rois: Optional[List[ROI]],
+    grayscale: bool,
+    capacity: int
+) -> Union[FrameBatch, ROIFrameBatch]:
+    if rois is not None:
+        return ROIFrameBatch(clip_id=clip.clip_id or -1, rois=rois,
+                             grayscale=grayscale, capacity=capacity)
+    return FrameBatch(clip_id=clip.clip_id or -1)
+
 
-    frame_batch = FrameBatch(clip_id=clip.clip_id or -1)
+def _sample_times(duration: float, sampling_rate_fps: float) -> List[float]:
+    """
+    Return the sampling grid [0, 1/fps, 2/fps, ...) up to `duration` seconds.
+    """
     frame_interval = 1.0 / sampling_rate_fps
+    times = []
     current_time = 0.0
-    duration = clip.end_time - clip.start_time
-
     while current_time < duration:
-        capture.set(cv2.CAP_PROP_POS_MSEC, (current_time * 1000))
+        times.append(current_time)
+        current_time += frame_interval
+    return times
+
+
+def _read_frames(
+    capture: cv2.VideoCapture,
+    times: List[float],
+    mode: str,
+    seek_threshold_frames: Optional[int],
+    keyframe_index: Optional[KeyframeIndex]
+) -> Iterator[Tuple[float, np.ndarray]]:
+    if mode == "sequential":
+        return _read_frames_sequential(
+            capture, times, seek_threshold_frames, keyframe_index)
+    return _read_frames_seek(capture, times, keyframe_index)
+
+
+def _read_frames_seek(
+    capture: cv2.VideoCapture,
+    times: List[float],
+    keyframe_index: Optional[KeyframeIndex] = None
+) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    Seek to every sample time and decode one frame. Stops at the first failed read.
+
+    With a keyframe index, each seek goes to the exact frame index of the
+    first frame at or after the sample time and that frame's PTS is yielded.
+    """
+    for t in times:
+        if keyframe_index is not None:
+            target = keyframe_index.frame_at(t)
+            if target >= len(keyframe_index):
+                break
+            capture.set(cv2.CAP_PROP_POS_FRAMES, target)
+            t = float(keyframe_index.pts_times[target])
+        else:
+            capture.set(cv2.CAP_PROP_POS_MSEC, (t * 1000))
         ret, frame = capture.read()
         if not ret:
             break
-        frame_batch.add_frame(frame, clip.start_time + current_time)
-        current_time += frame_interval
+        yield t, frame
 
-    capture.release()
-    return frame_batch
+
+def _read_frames_sequential(
+    capture: cv2.VideoCapture,
+    times: List[float],
+    seek_threshold_frames: Optional[int] = None,
+    keyframe_index: Optional[KeyframeIndex] = None
+) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    Decode forward through the stream, using grab() to step over unsampled
+    frames and retrieve() only for frames on the sampling grid.
+
+    For each gap the cheaper option is taken. With a keyframe index the cost
+    of a seek is known exactly (frames decoded from the preceding keyframe)
+    and sample times are mapped to real frame timestamps. Without one, gaps
+    of at most `seek_threshold_frames` frames are decoded forward and longer
+    gaps are seeked over. Falls back to per-sample seeking if the stream
+    reports no frame rate and no index is given.
+    """
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    if keyframe_index is None:
+        if not fps or fps <= 0:
+            yield from _read_frames_seek(capture, times)
+            return
+        if seek_threshold_frames is None:
+            seek_threshold_frames = max(
+                1, int(round(fps * DEFAULT_GOP_SECONDS)))
+
+    position = 0  # index of the frame the next grab() will return
+    last_index = -1
+    last_frame = None
+    for t in times:
+        if keyframe_index is not None:
+            target = keyframe_index.frame_at(t)
+            if target >= len(keyframe_index):
+                return
+            timestamp = float(keyframe_index.pts_times[target])
+        else:
+            target = int(round(t * fps))
+            timestamp = t
+        if last_frame is not None and target <= last_index:
+            # Sampling faster than the stream frame rate
+            yield timestamp, last_frame
+            continue
+
+        gap = target - position
+        if keyframe_index is not None:
+            seek = gap > target - keyframe_index.keyframe_before(target)
+        else:
+            seek = gap > seek_threshold_frames  # type: ignore
+        if seek:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, target)
+        else:
+            for _ in range(gap):
+                if not capture.grab():
+                    return
+        if not capture.grab():
+            return
+        ret, frame = capture.retrieve()
+        if not ret:
+            return
+        position = target + 1
+        last_index, last_frame = target, frame
+        yield timestamp, frame
+
+
+def _crop_and_convert(
+    frame: np.ndarray,
+    crop: Optional[ROI],
+    grayscale: bool
+) -> np.ndarray:
+    """
+    Apply the crop/grayscale options to a BGR frame decoded by OpenCV.
+    """
+    if crop is not None:
+        frame = frame[crop.y: crop.y + crop.height, crop.x: crop.x + crop.width]
+    if grayscale:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return frame
+
+
+def _ffmpeg_frame_command(
+    source_path: str,
+    start_time: float,
+    end_time: float,
+    sampling_rate_fps: float,
+    crop: Optional[ROI],
+    grayscale: bool,
+    keyframes_only: bool = False
+) -> List[str]:
+    """
+    Build an ffmpeg command that writes sampled raw frames to stdout.
+
+    With `keyframes_only`, only I-frames are decoded (-skip_frame nokey),
+    every decoded keyframe is output and its PTS is logged by showinfo.
+    """
+    input_args = ["-ss", str(start_time), "-to", str(end_time)]
+    output_args = ["-an", "-sn"]
+    if keyframes_only:
+        log_args = ["-hide_banner", "-nostats", "-v", "info"]
+        input_args = ["-skip_frame", "nokey"] + input_args
+        output_args += ["-fps_mode", "passthrough"]
+        filters = ["showinfo"]
+    else:
+        log_args = ["-v", "error"]
+        filters = [f"fps={sampling_rate_fps}"]
+    if crop is not None:
+        filters.append(
+            f"crop={crop.width}:{crop.height}:{crop.x}:{crop.y}")
+    filters.append("format=gray" if grayscale else "format=bgr24")
+    return [
+        "ffmpeg",
+        *log_args,
+        "-nostdin",
+        *input_args,
+        "-i", source_path,
+        *output_args,
+        "-vf", ",".join(filters),
+        "-f", "rawvideo",
+        "pipe:"
+    ]
+
+
+def _frame_shape(
+    resolution: Tuple[int, int],
+    crop: Optional[ROI],
+    grayscale: bool
+) -> Tuple[int, ...]:
+    """
+    Return the numpy shape of one output frame for the given crop/grayscale
+    options.
+    """
+    width, height = resolution
+    if crop is not None:
+        width, height = crop.width, crop.height
+    return (height, width) if grayscale else (height, width, 3)
+
+
+def _drain_ffmpeg_stderr(
+    stream: IO[bytes],
+    tail: Deque[str],
+    pts_times: "Optional[queue.Queue[Optional[float]]]"
+) -> None:
+    """
+    Read ffmpeg's stderr until EOF, keeping the last lines for error reports
+    and forwarding showinfo pts_time values to `pts_times`.
+    """
+    try:
+        for raw in stream:
+            line = raw.decode(errors="replace").rstrip()
+            tail.append(line)
+            if pts_times is not None and "showinfo" in line:
+                match = _SHOWINFO_PTS_RE.search(line)
+                if match:
+                    pts_times.put(float(match.group(1)))
+    finally:
+        if pts_times is not None:
+            pts_times.put(None)
+
+
+def _read_frames_ffmpeg(
+    cmd: List[str],
+    shape: Tuple[int, ...],
+    pts_times: "Optional[queue.Queue[Optional[float]]]" = None
+) -> Iterator[np.ndarray]:
+    """
+    Run `cmd` and yield fixed-size uint8 frames of `shape` read from its stdout.
+    Each frame is read directly into its own numpy buffer. stderr is drained
+    on a background thread; showinfo timestamps are put on `pts_times` if
+    given, followed by None at EOF.
+
+    Raises:
+        AppError if ffmpeg cannot be started or exits with an error.
+    """
+    try:
+        process = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as e:
+        raise AppError("Cannot start ffmpeg for frame extraction.",
+                       internal_message=str(e))
+
+    stderr_tail: Deque[str] = deque(maxlen=50)
+    drain = threading.Thread(
+        target=_drain_ffmpeg_stderr,
+        args=(process.stderr, stderr_tail, pts_times),
+        daemon=True)
+    drain.start()
+
+    finished = False
+    try:
+        while True:
+            frame = np.empty(shape, dtype=np.uint8)
+            view = memoryview(frame).cast("B")
+            filled = 0
+            while filled < len(view):
+                n = process.stdout.readinto(view[filled:])  # type: ignore
+                if not n:
+                    break
+                filled += n
+            if filled < len(view):
+                finished = True
+                break
+            yield frame
+    finally:
+        process.stdout.close()  # type: ignore
+        if not finished:
+            # Consumer stopped early; don't wait for the rest of the stream
+            process.kill()
+        drain.join()
+        process.stderr.close()  # type: ignore
+        returncode = process.wait()
+
+    if returncode != 0:
+        raise AppError("Frame extraction failed.",
+                       internal_message="\n".join(stderr_tail))
+
+
+def _read_keyframes_ffmpeg(
+    cmd: List[str],
+    shape: Tuple[int, ...],
+    start_time: float,
+    times: List[float]
+) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    Snap each sample time in `times` to the nearest keyframe decoded by a
+    keyframes_only command and yield (keyframe PTS, frame) once per keyframe
+    that at least one sample snapped to. At most two frames are held.
+    """
+    pts_times: "queue.Queue[Optional[float]]" = queue.Queue()
+    pending: Optional[Tuple[float, np.ndarray]] = None
+    i = 0
+    with closing(_read_frames_ffmpeg(cmd, shape, pts_times)) as frames:
+        for frame in frames:
+            relative = pts_times.get()
+            if relative is None:
+                raise AppError("Frame extraction failed.",
+                               internal_message="Missing showinfo timestamp")
+            pts = start_time + relative
+            if pending is not None:
+                # Samples before the midpoint are nearer the pending keyframe
+                midpoint = (pending[0] + pts) / 2.0
+                used = False
+                while i < len(times) and times[i] <= midpoint:
+                    used = True
+                    i += 1
+                if used:
+                    yield pending
+                if i == len(times):
+                    return
+            pending = (pts, frame)
+    if pending is not None and i < len(times):
+        yield pending
@@ -23,6 +23,22 @@ def test_roi_valid():
     assert roi2.height == 200
 
 
+def test_roi_schedule_roundtrip():
+    roi = ROI(0, 0, 10, 10, sample_interval=2.5)
+    assert roi.to_dict() == {"x": 0, "y": 0, "width": 10, "height": 10, "sample_interval": 2.5}
+    static = ROI.from_dict({"x": 0, "y": 0, "width": 10, "height": 10, "static": True})
+    assert static.static is True
+    assert static.sample_interval is None
+    assert ROI.from_dict(roi.to_dict()).sample_interval == 2.5
+
+
+@pytest.mark.parametrize("kwargs", [{"sample_interval": 0}, {"sample_interval": "1"},
+                                    {"static": "yes"}])
+def test_roi_invalid_schedule(kwargs):
+    with pytest.raises(ValueError):
+        ROI(0, 0, 10, 10, **kwargs)
+
+
 @pytest.mark.parametrize(
     "d, error_msg",
     [
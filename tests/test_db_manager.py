@@ -417,3 +417,68 @@ def test_export_to_csv_io_error(db_manager, tmp_path):
     with pytest.raises(IOError):
         # tmp_path is a directory, not a file
         db_manager.export_to_csv(rows, str(tmp_path))
+
+
+def test_save_and_get_video_index(db_manager):
+    """
+    A stored packet index round-trips; saving again replaces it.
+    """
+    vid_id = db_manager.insert_video(
+        source_type="file",
+        source_path="/v.mp4",
+        original_url=None,
+        duration=5.0,
+        resolution_w=320,
+        resolution_h=240,
+        import_timestamp="2025-06-06T11:00:00",
+    )
+    assert db_manager.get_video_index(vid_id) is None
+
+    db_manager.save_video_index(vid_id, [0.0, 0.5, 1.0], [True, False, True])
+    pts, flags = db_manager.get_video_index(vid_id)
+    assert list(pts) == [0.0, 0.5, 1.0]
+    assert list(flags) == [1, 0, 1]
+
+    db_manager.save_video_index(vid_id, [0.0], [True])
+    pts, flags = db_manager.get_video_index(vid_id)
+    assert list(pts) == [0.0] and list(flags) == [1]
+
+
+def test_save_video_index_validation(db_manager):
+    """
+    Mismatched lengths raise ValueError; unknown video_id violates the FK.
+    """
+    with pytest.raises(ValueError):
+        db_manager.save_video_index(1, [0.0, 1.0], [True])
+    with pytest.raises(sqlite3.IntegrityError):
+        db_manager.save_video_index(9999, [0.0], [True])
+
+
+def test_save_and_get_scene_scores(db_manager):
+    """
+    Stored scene scores round-trip with their settings; saving again replaces them.
+    """
+    vid_id = db_manager.insert_video(
+        source_type="file",
+        source_path="/v.mp4",
+        original_url=None,
+        duration=5.0,
+        resolution_w=320,
+        resolution_h=240,
+        import_timestamp="2025-06-06T11:00:00",
+    )
+    assert db_manager.get_scene_scores(vid_id) is None
+
+    db_manager.save_scene_scores(vid_id, "ffmpeg:160", [0.0, 0.5, 1.0], [0.0, 0.75, 0.125])
+    settings, pts, scores = db_manager.get_scene_scores(vid_id)
+    assert settings == "ffmpeg:160"
+    assert list(pts) == [0.0, 0.5, 1.0]
+    assert list(scores) == [0.0, 0.75, 0.125]
+
+    db_manager.save_scene_scores(vid_id, "numpy:160", [0.0], [0.0])
+    assert db_manager.get_scene_scores(vid_id)[0] == "numpy:160"
+
+    with pytest.raises(ValueError):
+        db_manager.save_scene_scores(vid_id, "x", [0.0, 1.0], [0.0])
+    with pytest.raises(sqlite3.IntegrityError):
+        db_manager.save_scene_scores(9999, "x", [0.0], [0.0])
@@ -0,0 +1,77 @@
+import multiprocessing
+import threading
+from concurrent.futures import CancelledError
+
+import numpy as np
+import pytest
+
+from src.frame_ring import SharedFrameRing
+
+
+def _fill_slot(ring, value, done):
+    slot = ring.acquire(timeout=5)
+    ring.write(slot, np.full(ring.slot_shape, value, dtype=ring.dtype))
+    done.put(slot)
+    ring.close()
+
+
+def test_write_view_release():
+    with SharedFrameRing((4, 6, 3), slots=2) as ring:
+        frame = np.arange(72, dtype=np.uint8).reshape(4, 6, 3)
+        slot = ring.acquire(timeout=1)
+        ring.write(slot, frame)
+        view = ring.view(slot)
+        np.testing.assert_array_equal(view, frame)
+        # Views share memory with the slot
+        assert not view.flags.owndata
+        del view
+
+        other = ring.acquire(timeout=1)
+        assert other != slot
+        with pytest.raises(TimeoutError):
+            ring.acquire(timeout=0.05)
+        ring.release(slot)
+        assert ring.acquire(timeout=1) == slot
+
+
+def test_acquire_stops_when_cancelled():
+    ctx = multiprocessing.get_context()
+    with SharedFrameRing((2, 2), slots=1, ctx=ctx) as ring:
+        cancel = ctx.Event()
+        assert ring.acquire(timeout=1, cancel=cancel) == 0
+        with pytest.raises(TimeoutError):
+            ring.acquire(timeout=0.05, cancel=cancel)
+
+        timer = threading.Timer(0.2, cancel.set)
+        timer.start()
+        with pytest.raises(CancelledError):
+            ring.acquire(cancel=cancel)
+        timer.join()
+
+
+def test_write_rejects_wrong_shape():
+    with SharedFrameRing((2, 2), slots=1) as ring:
+        with pytest.raises(ValueError):
+            ring.write(0, np.zeros((3, 2), dtype=np.uint8))
+
+
+@pytest.mark.parametrize("bad", [dict(slot_shape=(2, 2), slots=0),
+                                 dict(slot_shape=(0, 2), slots=1)])
+def test_invalid_arguments(bad):
+    with pytest.raises(ValueError):
+        SharedFrameRing(**bad)
+
+
+@pytest.mark.parametrize("method", ["fork", "spawn"])
+def test_child_process_writes_are_visible(method):
+    if method not in multiprocessing.get_all_start_methods():
+        pytest.skip(f"{method} start method not available")
+    ctx = multiprocessing.get_context(method)
+    with SharedFrameRing((8, 8), slots=2, ctx=ctx) as ring:
+        done = ctx.Queue()
+        proc = ctx.Process(target=_fill_slot, args=(ring, 7, done))
+        proc.start()
+        slot = done.get(timeout=30)
+        proc.join(timeout=30)
+        assert proc.exitcode == 0
+        assert int(ring.view(slot).sum()) == 7 * 64
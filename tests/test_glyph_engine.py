@@ -0,0 +1,107 @@
+import cv2
+import numpy as np
+import pytest
+
+from src.config_manager import ROI
+from src.glyph_engine import GlyphTemplateEngine, segment_glyphs
+from src.ocr_processor import process_frame_for_ocr
+
+
+def render(text, height=24, pitch=14):
+    """Draw `text` one character per fixed-pitch cell, like an overlay font."""
+    img = np.zeros((height, pitch * len(text) + 8), dtype=np.uint8)
+    for i, ch in enumerate(text):
+        cv2.putText(img, ch, (4 + pitch * i, 18), cv2.FONT_HERSHEY_PLAIN, 1.2, 255, 1)
+    return img
+
+
+TRAINING = ["0123456789", "N 51.23", "E 0.467:8"]
+
+
+class LabelEngine:
+    """Stands in for Tesseract: returns a fixed text per call, in order."""
+
+    def __init__(self, texts):
+        self.texts = list(texts)
+        self.calls = 0
+
+    def image_to_data(self, image):
+        text = self.texts[self.calls % len(self.texts)]
+        self.calls += 1
+        return {'text': text.split(), 'conf': ['95'] * len(text.split())}
+
+
+@pytest.fixture
+def trained():
+    engine = GlyphTemplateEngine()
+    assert engine.learn_labelled([render(t) for t in TRAINING], TRAINING) == 3
+    return engine
+
+
+def test_segment_glyphs_finds_word_breaks():
+    spans, space_before, band = segment_glyphs(render("N 51.23"))
+    assert len(spans) == 6
+    assert space_before == [False, True, False, False, False, False]
+    assert band == (0, 24)
+    assert segment_glyphs(np.zeros((10, 10), dtype=np.uint8))[0] == []
+
+
+def test_glyph_engine_recognizes_unseen_strings(trained):
+    data = trained.image_to_data(render("N 12.34"))
+    assert data['text'] == ["N", "12.34"]
+    assert all(c > 90 for c in data['conf'])
+    assert data['width'][1] > data['width'][0]
+    assert trained.image_to_data(render("E 9:05"))['text'] == ["E", "9:05"]
+    assert trained.glyph_calls == 2
+
+
+def test_glyph_engine_learn_skips_mislabelled_crops():
+    engine = GlyphTemplateEngine()
+    labeller = LabelEngine(["0123456789", "51"])
+    used = engine.learn([render("0123456789"), render("N 51.23")], engine=labeller)
+    assert used == 1
+    assert engine.characters == list("0123456789")
+    with pytest.raises(ValueError):
+        GlyphTemplateEngine().learn([render("1")])
+
+
+def test_glyph_engine_falls_back_on_low_confidence(trained):
+    fallback = LabelEngine(["km/h"])
+    trained.fallback = fallback
+    data = trained.image_to_data(render("W"))
+    assert data['text'] == ["km/h"]
+    assert (trained.fallback_calls, fallback.calls) == (1, 1)
+
+    # An untrained engine defers everything to its fallback
+    empty = GlyphTemplateEngine(fallback=fallback)
+    assert empty.image_to_data(render("12"))['text'] == ["km/h"]
+
+
+def test_glyph_engine_camera_profile_roundtrip(trained, tmp_path):
+    profile_dir = str(tmp_path / "profiles")
+    path = trained.save_for_camera("Dash Cam/1", profile_dir)
+    assert path == GlyphTemplateEngine.profile_path("Dash Cam/1", profile_dir)
+
+    loaded = GlyphTemplateEngine.for_camera("Dash Cam/1", profile_dir=profile_dir)
+    assert loaded.characters == trained.characters
+    assert loaded.image_to_data(render("E 51.8"))['text'] == ["E", "51.8"]
+    assert GlyphTemplateEngine.for_camera("other", profile_dir=profile_dir).characters == []
+
+
+def test_glyph_engine_cache_key_tracks_templates(trained):
+    key = trained.cache_key()
+    assert key != GlyphTemplateEngine().cache_key()
+    assert GlyphTemplateEngine().cache_key() != GlyphTemplateEngine(space_ratio=1.0).cache_key()
+    trained.learn_labelled([render("N 51.23")], ["N 51.23"])
+    assert trained.cache_key() != key
+
+
+def test_glyph_engine_with_process_frame_for_ocr(trained):
+    frame = np.zeros((40, 200, 3), dtype=np.uint8)
+    frame[10:34, 20:20 + render("N 51.23").shape[1]] = render("N 51.23")[:, :, None]
+    results = process_frame_for_ocr(frame, 1.5, 1, 1, [ROI(20, 10, 106, 24)], 0.5,
+                                    engine=trained)
+    assert len(results) == 1
+    # Words are joined without separators, as for Tesseract output
+    assert results[0].text == "N51.23"
+    assert results[0].confidence > 0.9
@@ -1,11 +1,14 @@
+import subprocess
+import time
+
 import pytest
 import numpy as np
 import pytesseract
 from pytesseract import TesseractNotFoundError
 
 from src.config_manager import ROI
-from src.video_processor import FrameBatch
-from src.ocr_processor import ROIManager, process_frame_for_ocr, process_batch_for_ocr, OCRResult
+from src.video_processor import FrameBatch, ROIFrameBatch
+from src.ocr_processor import OCRCache, OCRStats, PytesseractEngine, ROIManager, TesseractBatchEngine, TieredOCREngine, compile_roi_plan, process_frame_for_ocr, process_batch_for_ocr, iter_ocr_results, OCRResult, _engine_settings_key
 
 
 class DummyTesseract:
@@ -157,3 +160,513 @@ def test_process_batch_for_ocr_bad_threshold(thr):
     fb = FrameBatch(clip_id=1)
     with pytest.raises(ValueError):
         process_batch_for_ocr(fb, [], confidence_threshold=thr)
+
+
+def test_process_frame_for_ocr_grayscale_frame(monkeypatch):
+    seen = []
+
+    def capture(img, output_type=None):
+        seen.append(img.shape)
+        return {'text': ['X'], 'conf': ['90']}
+
+    monkeypatch.setattr(pytesseract, "image_to_data", capture)
+
+    frame = np.zeros((20, 20), dtype=np.uint8)
+    results = process_frame_for_ocr(
+        frame, 0.0, 1, 1, [ROI(0, 0, 10, 5)], confidence_threshold=0.5)
+    assert len(results) == 1
+    assert seen == [(5, 10)]
+
+
+def test_process_batch_for_ocr_roi_frame_batch(monkeypatch):
+    seen = []
+
+    def capture(img, output_type=None):
+        seen.append(img.shape)
+        return {'text': ['X'], 'conf': ['100']}
+
+    monkeypatch.setattr(pytesseract, "image_to_data", capture)
+
+    roi = ROI(1, 1, 3, 2)
+    fb = ROIFrameBatch(clip_id=5, rois=[roi], grayscale=False)
+    fb.add_frame(np.zeros((5, 5, 3), dtype=np.uint8), timestamp=0.1)
+    fb.add_frame(np.zeros((5, 5, 3), dtype=np.uint8), timestamp=0.2)
+
+    results = process_batch_for_ocr(
+        fb, [ROI(1, 1, 3, 2)], confidence_threshold=0.0)
+
+    assert [r.timestamp for r in results] == [0.1, 0.2]
+    assert all(r.clip_id == 5 for r in results)
+    assert seen == [(2, 3), (2, 3)]
+
+    with pytest.raises(ValueError):
+        process_batch_for_ocr(fb, [ROI(0, 0, 3, 2)], confidence_threshold=0.0)
+
+
+def test_iter_ocr_results_streams(monkeypatch):
+    def one_token(img, output_type=None):
+        return {'text': ['X'], 'conf': ['100']}
+
+    monkeypatch.setattr(pytesseract, "image_to_data", one_token)
+    decoded = []
+
+    def frames():
+        for ts in (0.0, 1.0, 2.0):
+            decoded.append(ts)
+            yield ts, np.zeros((5, 5, 3), dtype=np.uint8)
+
+    results = iter_ocr_results(frames(), 4, 9, [ROI(0, 0, 3, 3)], 0.5)
+    first = next(results)
+    # Only the first frame has been decoded when the first result appears
+    assert decoded == [0.0]
+    assert (first.video_id, first.clip_id, first.timestamp) == (4, 9, 0.0)
+    assert [r.timestamp for r in results] == [1.0, 2.0]
+
+
+def test_iter_ocr_results_bad_threshold():
+    with pytest.raises(ValueError):
+        iter_ocr_results(iter([]), 1, 1, [], confidence_threshold=2.0)
+
+
+TSV_HEADER = "level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext"
+
+
+def _tsv_row(level, page, conf, text=""):
+    return f"{level}\t{page}\t1\t1\t1\t1\t0\t0\t10\t10\t{conf}\t{text}"
+
+
+def test_tesseract_batch_engine_single_process(monkeypatch, tmp_path):
+    calls = []
+
+    def fake_run(cmd, stdout, stderr, check):
+        calls.append(cmd)
+        with open(cmd[1], encoding="utf-8") as f:
+            pages = f.read().split()
+        assert len(pages) == 4
+        rows = [TSV_HEADER]
+        for page in range(1, 5):
+            rows.append(_tsv_row(1, page, -1))
+            if page != 3:
+                rows.append(_tsv_row(5, page, 90, f"P{page}"))
+        return subprocess.CompletedProcess(cmd, 0, stdout="\n".join(rows).encode(), stderr=b"")
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+    engine = TesseractBatchEngine(config="--psm 7", temp_root=str(tmp_path))
+
+    fb = FrameBatch(clip_id=2)
+    fb.add_frame(np.zeros((20, 20, 3), dtype=np.uint8), timestamp=0.0)
+    fb.add_frame(np.zeros((20, 20, 3), dtype=np.uint8), timestamp=1.0)
+    rois = [ROI(0, 0, 5, 5), ROI(5, 5, 5, 5)]
+    results = process_batch_for_ocr(fb, rois, confidence_threshold=0.0, engine=engine)
+
+    assert len(calls) == 1
+    assert calls[0][-3:] == ["--psm", "7", "tsv"]
+    # Page 3 (frame 1.0, first ROI) had no text
+    assert [(r.timestamp, r.roi, r.text) for r in results] == [
+        (0.0, rois[0], "P1"), (0.0, rois[1], "P2"), (1.0, rois[1], "P4")]
+    # Confidence averages all rows, like pytesseract
+    assert results[0].confidence == pytest.approx((0.9 - 0.01) / 2)
+    # Temporary crops are cleaned up
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_tesseract_batch_engine_chunks_and_missing_binary(monkeypatch, tmp_path):
+    sizes = []
+
+    def fake_run(cmd, stdout, stderr, check):
+        with open(cmd[1], encoding="utf-8") as f:
+            sizes.append(len(f.read().split()))
+        return subprocess.CompletedProcess(cmd, 0, stdout=TSV_HEADER.encode(), stderr=b"")
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+    engine = TesseractBatchEngine(max_batch_size=2, temp_root=str(tmp_path))
+    data = engine.image_to_data_batch([np.zeros((4, 4), dtype=np.uint8)] * 5)
+    assert sizes == [2, 2, 1]
+    assert len(data) == 5 and data[0]["text"] == []
+
+    def missing(cmd, stdout, stderr, check):
+        raise FileNotFoundError(cmd[0])
+
+    monkeypatch.setattr(subprocess, "run", missing)
+    with pytest.raises(RuntimeError):
+        process_frame_for_ocr(np.zeros((10, 10, 3), dtype=np.uint8), 0.0, 1, 1,
+                              [ROI(0, 0, 5, 5)], 0.0, engine=engine)
+
+
+def test_tesseract_batch_engine_rejects_non_tsv_output(monkeypatch, tmp_path):
+    def fake_run(cmd, stdout, stderr, check):
+        return subprocess.CompletedProcess(
+            cmd, 0, stdout=b"Error opening data file eng.traineddata", stderr=b"")
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+    engine = TesseractBatchEngine(temp_root=str(tmp_path))
+    with pytest.raises(RuntimeError, match="eng.traineddata"):
+        engine.image_to_data_batch([np.zeros((4, 4), dtype=np.uint8)])
+
+
+class PixelEngine:
+    """Reads a crop's first pixel back as its text; later frames finish first."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def image_to_data(self, image):
+        self.calls += 1
+        value = int(image[0, 0])
+        time.sleep(0.002 * (10 - value % 10))
+        return {'text': [f"v{value}"], 'conf': ['90']}
+
+
+def _pixel_batch(n_frames):
+    fb = FrameBatch(clip_id=4)
+    for i in range(n_frames):
+        frame = np.zeros((10, 20, 3), dtype=np.uint8)
+        frame[:, :10] = 2 * i
+        frame[:, 10:] = 2 * i + 1
+        fb.add_frame(frame, timestamp=i * 0.5)
+    return fb, [ROI(0, 0, 10, 10), ROI(10, 0, 10, 10)]
+
+
+@pytest.mark.parametrize("executor,chunksize", [("thread", 1), ("thread", 3), ("process", 2)])
+def test_process_batch_for_ocr_parallel_preserves_order(executor, chunksize):
+    fb, rois = _pixel_batch(8)
+    serial = process_batch_for_ocr(fb, rois, 0.0, engine=PixelEngine())
+    parallel = process_batch_for_ocr(fb, rois, 0.0, executor=executor, workers=4,
+                                     chunksize=chunksize, engine_factory=PixelEngine)
+    expected = [(i * 0.5, rois[j], f"v{2 * i + j}") for i in range(8) for j in range(2)]
+    assert [(r.timestamp, r.roi, r.text) for r in serial] == expected
+    assert [(r.timestamp, r.roi, r.text) for r in parallel] == expected
+
+
+def test_process_batch_for_ocr_thread_pool_shares_engine_and_warms_up():
+    fb, rois = _pixel_batch(3)
+    engine = PixelEngine()
+    results = process_batch_for_ocr(fb, rois, 0.0, engine=engine,
+                                    executor="thread", workers=2, warmup=True)
+    assert len(results) == 6
+    # Six crops plus one blank warm-up crop per started thread
+    assert engine.calls - 6 in (1, 2)
+
+
+@pytest.mark.parametrize("kwargs", [{"executor": "gpu"}, {"workers": 0}, {"chunksize": 0}])
+def test_process_batch_for_ocr_bad_parallel_args(kwargs):
+    fb, rois = _pixel_batch(1)
+    with pytest.raises(ValueError):
+        process_batch_for_ocr(fb, rois, 0.0, engine=PixelEngine(), **kwargs)
+
+
+def test_ocr_cache_skips_repeated_crops():
+    fb = FrameBatch(clip_id=1)
+    for i in range(4):
+        frame = np.zeros((10, 20, 3), dtype=np.uint8)
+        frame[:, :10] = 7           # static overlay
+        frame[:, 10:] = i // 2      # changes every other frame
+        fb.add_frame(frame, timestamp=float(i))
+    rois = [ROI(0, 0, 10, 10), ROI(10, 0, 10, 10)]
+    engine = PixelEngine()
+    cache = OCRCache()
+
+    results = process_batch_for_ocr(fb, rois, 0.0, engine=engine, cache=cache)
+    assert [r.text for r in results] == ["v7", "v0", "v7", "v0", "v7", "v1", "v7", "v1"]
+    # Three distinct crops in the batch
+    assert engine.calls == 3
+    assert (cache.hits, cache.misses) == (0, 8)
+
+    frame_results = process_frame_for_ocr(fb.frames[3], 3.0, 1, 1, rois, 0.0,
+                                          engine=engine, cache=cache)
+    assert [r.text for r in frame_results] == ["v7", "v1"]
+    assert engine.calls == 3
+    assert (cache.hits, cache.misses) == (2, 8)
+
+
+def test_ocr_cache_keys_include_engine_settings():
+    crop = np.zeros((4, 4), dtype=np.uint8)
+    eng = _engine_settings_key(PytesseractEngine(lang="eng"))
+    deu = _engine_settings_key(PytesseractEngine(lang="deu"))
+    assert OCRCache.key(crop, eng) != OCRCache.key(crop, deu)
+    assert OCRCache.key(crop, eng) == OCRCache.key(crop.copy(), eng)
+    assert OCRCache.key(crop, eng) != OCRCache.key(crop.reshape(2, 8), eng)
+
+    # Validators and nested tiers change the result, so they change the key
+    fast = PytesseractEngine(config="--psm 7")
+    slow = PytesseractEngine(config="--psm 7 --tessdata-dir /usr/share/tessdata_best")
+    digits = _engine_settings_key(TieredOCREngine(fast, slow, validator=r"\d+"))
+    letters = _engine_settings_key(TieredOCREngine(fast, slow, validator=r"[A-Z]+"))
+    other_fast = _engine_settings_key(TieredOCREngine(
+        PytesseractEngine(lang="deu"), slow, validator=r"\d+"))
+    assert len({digits, letters, other_fast}) == 3
+    # Anonymous validators cannot be told apart by name
+    assert (_engine_settings_key(TieredOCREngine(fast, slow, validator=lambda t: True))
+            != _engine_settings_key(TieredOCREngine(fast, slow, validator=lambda t: False)))
+
+
+def test_ocr_cache_with_engine_factory_needs_explicit_key():
+    fb, rois = _pixel_batch(2)
+    with pytest.raises(ValueError):
+        process_batch_for_ocr(fb, rois, 0.0, executor="thread", workers=2,
+                              engine_factory=PixelEngine, cache=OCRCache())
+    cache = OCRCache()
+    for _ in range(2):
+        process_batch_for_ocr(fb, rois, 0.0, executor="thread", workers=2,
+                              engine_factory=PixelEngine, cache=cache,
+                              cache_key="pixel-v1")
+    assert (cache.hits, cache.misses) == (4, 4)
+
+
+def test_ocr_cache_lru_eviction_and_sqlite(tmp_path):
+    db_path = str(tmp_path / "ocr_cache.db")
+    cache = OCRCache(max_entries=2, db_path=db_path)
+    cache.put("a", ("A", 0.9))
+    cache.put("b", ("B", 0.8))
+    assert cache.get("a") == ("A", 0.9)
+    cache.put("c", ("C", 0.7))  # evicts "b", the least recently used
+    assert len(cache) == 2
+    assert "b" not in cache._entries
+    # Evicted entries are still served from disk
+    assert cache.get("b") == ("B", 0.8)
+    cache.close()
+
+    reopened = OCRCache(db_path=db_path)
+    assert reopened.get("c") == ("C", 0.7)
+    assert reopened.get("d") is None
+    assert reopened.hit_rate == pytest.approx(0.5)
+    reopened.clear()
+    assert reopened.get("c") is None
+    reopened.close()
+
+    with pytest.raises(ValueError):
+        OCRCache(max_entries=0)
+
+
+def _overlay_batch(values, noise=0):
+    fb = FrameBatch(clip_id=1)
+    rng = np.random.default_rng(0)
+    for i, value in enumerate(values):
+        frame = np.full((10, 10, 3), value, dtype=np.uint8)
+        if noise:
+            frame = np.clip(frame + rng.integers(0, noise, frame.shape), 0, 255).astype(np.uint8)
+        fb.add_frame(frame, timestamp=i * 0.1)
+    return fb
+
+
+@pytest.mark.parametrize("metric,threshold", [("mad", 2.0), ("dhash", 0)])
+def test_process_batch_for_ocr_carries_forward_unchanged(metric, threshold):
+    fb = FrameBatch(clip_id=1)
+    for i in range(6):
+        frame = np.zeros((10, 10, 3), dtype=np.uint8)
+        frame[:, (i // 3) * 5:] = 200  # overlay changes once, after frame 2
+        frame[0, 0] = 10 * (i // 3)
+        fb.add_frame(frame, timestamp=i * 0.1)
+    engine = PixelEngine()
+    stats = OCRStats()
+
+    results = process_batch_for_ocr(fb, [ROI(0, 0, 10, 10)], 0.0, engine=engine,
+                                    change_threshold=threshold, change_metric=metric,
+                                    stats=stats)
+    assert [r.timestamp for r in results] == pytest.approx([i * 0.1 for i in range(6)])
+    assert [r.text for r in results] == ["v0"] * 3 + ["v10"] * 3
+    assert engine.calls == 2
+    assert (stats.ocr_calls, stats.skipped_unchanged) == (2, 4)
+
+
+def test_process_batch_for_ocr_change_threshold_sees_noise_as_unchanged():
+    fb = _overlay_batch([100, 100, 100, 180], noise=3)
+    engine = PixelEngine()
+    stats = OCRStats()
+    process_batch_for_ocr(fb, [ROI(0, 0, 10, 10)], 0.0, engine=engine,
+                          change_threshold=5.0, stats=stats)
+    assert (stats.ocr_calls, stats.skipped_unchanged) == (2, 2)
+
+    stats.reset()
+    process_batch_for_ocr(fb, [ROI(0, 0, 10, 10)], 0.0, engine=engine, stats=stats)
+    assert (stats.ocr_calls, stats.skipped_unchanged) == (4, 0)
+
+
+def test_process_batch_for_ocr_change_threshold_catches_slow_drift():
+    # Each step is below the threshold, but the overlay drifts 12 levels
+    fb = _overlay_batch([100, 104, 108, 112, 116, 120])
+    engine = PixelEngine()
+    results = process_batch_for_ocr(fb, [ROI(0, 0, 10, 10)], 0.0, engine=engine,
+                                    change_threshold=5.0)
+    assert [r.text for r in results] == ["v100", "v100", "v108", "v108", "v116", "v116"]
+    assert engine.calls == 3
+
+
+@pytest.mark.parametrize("kwargs", [{"change_threshold": -1}, {"change_metric": "ssim"}])
+def test_process_batch_for_ocr_bad_change_args(kwargs):
+    fb = _overlay_batch([0])
+    with pytest.raises(ValueError):
+        process_batch_for_ocr(fb, [ROI(0, 0, 5, 5)], 0.0, engine=PixelEngine(), **kwargs)
+
+
+def test_process_batch_for_ocr_follows_roi_schedules():
+    fb, _ = _pixel_batch(8)  # frames every 0.5 s
+    rois = [ROI(0, 0, 10, 10, sample_interval=1.0), ROI(10, 0, 10, 10, static=True)]
+    engine = PixelEngine()
+    stats = OCRStats()
+    results = process_batch_for_ocr(fb, rois, 0.0, engine=engine, stats=stats)
+
+    clock = [r.timestamp for r in results if r.roi is rois[0]]
+    assert clock == [0.0, 1.0, 2.0, 3.0]
+    assert [(r.timestamp, r.text) for r in results if r.roi is rois[1]] == [(0.0, "v1")]
+    assert (stats.ocr_calls, stats.skipped_schedule) == (5, 11)
+    assert engine.calls == 5
+
+
+def test_iter_ocr_results_follows_roi_schedules():
+    fb, _ = _pixel_batch(4)
+    rois = [ROI(0, 0, 10, 10), ROI(10, 0, 10, 10, static=True)]
+    results = list(iter_ocr_results(zip(fb.timestamps, fb.frames), 1, 1, rois, 0.0,
+                                    engine=PixelEngine()))
+    assert [(r.timestamp, r.text) for r in results] == [
+        (0.0, "v0"), (0.0, "v1"), (0.5, "v2"), (1.0, "v4"), (1.5, "v6")]
+
+
+def test_static_roi_retries_until_a_result_is_accepted():
+    fb, _ = _pixel_batch(4)
+    rois = [ROI(0, 0, 10, 10), ROI(10, 0, 10, 10, static=True)]
+    # The static overlay is unreadable on the first two frames
+    answers = {v: (f"t{v}", 90) for v in range(8)}
+    answers[1] = ("", -1)
+    answers[3] = ("t3", 20)
+
+    stats = OCRStats()
+    results = process_batch_for_ocr(fb, rois, 0.5, engine=ScriptedEngine(answers),
+                                    stats=stats)
+    assert [(r.timestamp, r.text) for r in results] == [
+        (0.0, "t0"), (0.5, "t2"), (1.0, "t4"), (1.0, "t5"), (1.5, "t6")]
+    assert (stats.ocr_calls, stats.skipped_schedule) == (7, 1)
+
+    streamed = list(iter_ocr_results(zip(fb.timestamps, fb.frames), 4, 4, rois, 0.5,
+                                     engine=ScriptedEngine(answers)))
+    assert [(r.timestamp, r.text) for r in streamed] == [
+        (r.timestamp, r.text) for r in results]
+
+
+def test_roi_manager_keeps_schedules():
+    manager = ROIManager([ROI(0, 0, 5, 5, sample_interval=3.0, static=True)])
+    roi = manager.list_rois()[0]
+    assert (roi.sample_interval, roi.static) == (3.0, True)
+
+
+class ScriptedEngine:
+    """Returns a (text, conf) per crop keyed by the crop's first pixel."""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.images = []
+
+    def image_to_data(self, image):
+        self.images.append(image)
+        text, conf = self.answers.get(int(image[0, 0]), ("", -1))
+        return {'text': [text], 'conf': [conf], 'left': [4], 'top': [2],
+                'width': [20], 'height': [10]}
+
+
+def test_tiered_engine_escalates_low_confidence_and_invalid_text():
+    fast = ScriptedEngine({10: ("12:30", 95), 20: ("12:3O", 92), 30: ("12:31", 40)})
+    slow = ScriptedEngine({20: ("12:30", 90), 30: ("12:31", 88)})
+    engine = TieredOCREngine(fast, slow, confidence_threshold=0.8,
+                             validator=r"\d\d:\d\d", upscale=2.0, binarize=False)
+
+    crops = [np.full((8, 30), v, dtype=np.uint8) for v in (10, 20, 30)]
+    datas = engine.image_to_data_batch(crops)
+
+    assert [d['text'] for d in datas] == [["12:30"], ["12:30"], ["12:31"]]
+    assert len(fast.images) == 3
+    # Only the invalid and the low-confidence crop reach the slow tier, upscaled
+    assert len(slow.images) == 2
+    assert slow.images[0].shape == (16, 60)
+    assert datas[1]['left'] == [2] and datas[1]['width'] == [10]
+    assert (engine.escalated_invalid, engine.escalated_low_confidence) == (1, 1)
+    assert (engine.fast_stats.calls, engine.slow_stats.calls) == (3, 2)
+    assert engine.slow_stats.seconds >= 0.0
+
+
+def test_tiered_engine_binarizes_escalated_crops():
+    crop = np.full((8, 30), 100, dtype=np.uint8)
+    crop[:, 15:] = 200
+    fast = ScriptedEngine({})
+    slow = ScriptedEngine({0: ("A", 90)})
+    engine = TieredOCREngine(fast, slow, upscale=1.0)
+
+    results = process_frame_for_ocr(np.dstack([crop] * 3), 2.0, 1, 1,
+                                    [ROI(0, 0, 30, 8)], 0.5, engine=engine)
+    assert [r.text for r in results] == ["A"]
+    assert set(np.unique(slow.images[0])) == {0, 255}
+    assert engine.fast_stats.mean_seconds >= 0.0
+
+
+class PageRowsEngine:
+    """Returns pytesseract-shaped rows: page/block/par/line rows with conf -1."""
+
+    def __init__(self, word, conf):
+        self.word, self.conf = word, conf
+        self.calls = 0
+
+    def image_to_data(self, image):
+        self.calls += 1
+        return {'level': [1, 2, 3, 4, 5], 'text': ["", "", "", "", self.word],
+                'conf': [-1, -1, -1, -1, self.conf], 'left': [0] * 5, 'top': [0] * 5,
+                'width': [30] * 5, 'height': [8] * 5}
+
+
+def test_tiered_engine_scores_word_rows_only():
+    fast = PageRowsEngine("12:30", 96.5)
+    slow = ScriptedEngine({})
+    engine = TieredOCREngine(fast, slow, confidence_threshold=0.8)
+    crops = [np.zeros((8, 30), dtype=np.uint8)] * 5
+    datas = engine.image_to_data_batch(crops)
+    assert all(d['text'][-1] == "12:30" for d in datas)
+    assert slow.images == []
+    assert engine.escalated_low_confidence == 0
+    assert (engine.fast_stats.kept, engine.slow_stats.kept) == (5, 0)
+
+
+def test_tiered_engine_keeps_the_better_tier_result():
+    fast = ScriptedEngine({10: ("12:30", 60), 20: ("12:3O", 95), 30: ("12:31", 50)})
+    # The slow tier returns nothing, an invalid text, and a better reading
+    slow = ScriptedEngine({20: ("1Z:3O", 80), 30: ("12:31", 90)})
+    engine = TieredOCREngine(fast, slow, validator=r"\d\d:\d\d", upscale=1.0,
+                             binarize=False)
+    crops = [np.full((8, 30), v, dtype=np.uint8) for v in (10, 20, 30)]
+    datas = engine.image_to_data_batch(crops)
+    assert [d['text'] for d in datas] == [["12:30"], ["12:3O"], ["12:31"]]
+    assert datas[2]['conf'] == [90]
+    assert (engine.fast_stats.kept, engine.slow_stats.kept) == (2, 1)
+
+
+@pytest.mark.parametrize("kwargs", [{"confidence_threshold": 1.5}, {"upscale": 0.5}])
+def test_tiered_engine_invalid_args(kwargs):
+    with pytest.raises(ValueError):
+        TieredOCREngine(ScriptedEngine({}), ScriptedEngine({}), **kwargs)
+
+
+def test_compile_roi_plan_slices_and_caches():
+    rois = [ROI(0, 0, 4, 4), ROI(8, 8, 10, 10), ROI(2, 1, 3, 2)]
+    plan = compile_roi_plan(rois, (10, 12, 3))
+    assert plan.skipped == [rois[1]]
+    assert compile_roi_plan(rois, (10, 12, 3)) is plan
+    assert compile_roi_plan(rois, (20, 20, 3)) is not plan
+
+    frame = np.zeros((10, 12, 3), dtype=np.uint8)
+    frame[1:3, 2:5] = 255
+    crops = plan.crops(frame)
+    assert [i for i, _ in crops] == [0, 2]
+    assert crops[1][1].shape == (2, 3) and crops[1][1].min() == 255
+
+    with pytest.raises(ValueError):
+        compile_roi_plan(rois, (10, 12, 2))
+
+
+def test_out_of_bounds_roi_warns_once_per_resolution(caplog):
+    fb, rois = _pixel_batch(5)
+    rois = rois + [ROI(15, 0, 10, 10), ROI(0, 0, 5, 5, sample_interval=0.5)]
+    with caplog.at_level("WARNING", logger="src.roi_plan"):
+        results = process_batch_for_ocr(fb, rois, 0.0, engine=PixelEngine())
+        for ts, frame in zip(fb.timestamps, fb.frames):
+            process_frame_for_ocr(frame, ts, 1, 1, rois, 0.0, engine=PixelEngine())
+    assert len(results) == 5 * 3
+    warnings = [r for r in caplog.records if "out of bounds" in r.getMessage()]
+    assert len(warnings) == 1
+    assert "1 of 4 ROIs" in warnings[0].getMessage()
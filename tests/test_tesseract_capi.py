@@ -0,0 +1,154 @@
+import ctypes
+import ctypes.util
+
+import numpy as np
+import pytest
+
+import src.tesseract_capi as capi
+from src.config_manager import ROI
+from src.ocr_processor import process_frame_for_ocr
+from src.tesseract_capi import TesseractCAPIEngine
+
+
+class FakeTessLib:
+    """Simulates the libtesseract C API for a fixed list of recognized words."""
+
+    def __init__(self, words, init_result=0):
+        # (text, confidence, (left, top, right, bottom))
+        self.words = words
+        self.init_result = init_result
+        self.images = []
+        self.deleted_texts = 0
+        self.ended = False
+        self._buffers = {}
+        self._pos = 0
+
+    def TessVersion(self):
+        return b"5.5.0"
+
+    def TessBaseAPICreate(self):
+        return 1
+
+    def TessBaseAPIInit3(self, handle, datapath, lang):
+        self.lang = lang
+        return self.init_result
+
+    def TessBaseAPISetPageSegMode(self, handle, mode):
+        self.psm = mode
+
+    def TessBaseAPISetVariable(self, handle, name, value):
+        return 1
+
+    def TessBaseAPISetImage(self, handle, data, width, height, bpp, bpl):
+        self.images.append((width, height, bpp, bpl))
+
+    def TessBaseAPIRecognize(self, handle, monitor):
+        self._pos = 0
+        return 0
+
+    def TessBaseAPIGetIterator(self, handle):
+        return 2 if self.words else None
+
+    def TessBaseAPIClear(self, handle):
+        pass
+
+    def TessBaseAPIEnd(self, handle):
+        self.ended = True
+
+    def TessBaseAPIDelete(self, handle):
+        pass
+
+    def TessResultIteratorGetPageIterator(self, iterator):
+        return 3
+
+    def TessResultIteratorGetUTF8Text(self, iterator, level):
+        buf = ctypes.create_string_buffer(self.words[self._pos][0].encode())
+        address = ctypes.addressof(buf)
+        self._buffers[address] = buf
+        return address
+
+    def TessDeleteText(self, ptr):
+        del self._buffers[ptr]
+        self.deleted_texts += 1
+
+    def TessResultIteratorConfidence(self, iterator, level):
+        return self.words[self._pos][1]
+
+    def TessPageIteratorBoundingBox(self, iterator, level, left, top, right, bottom):
+        box = self.words[self._pos][2]
+        for arg, value in zip((left, top, right, bottom), box):
+            arg._obj.value = value
+        return 1
+
+    def TessResultIteratorNext(self, iterator, level):
+        self._pos += 1
+        return self._pos < len(self.words)
+
+    def TessResultIteratorDelete(self, iterator):
+        pass
+
+
+def test_image_to_data_returns_word_rows(monkeypatch):
+    lib = FakeTessLib([("12:01", 91.0, (2, 3, 40, 20)), ("km/h", 80.0, (50, 3, 90, 20))])
+    monkeypatch.setattr(capi, "_load_library", lambda path: lib)
+
+    engine = TesseractCAPIEngine(lang="eng", page_seg_mode=capi.PSM_SINGLE_LINE)
+    image = np.zeros((50, 200), dtype=np.uint8)
+    data = engine.image_to_data(image)
+
+    assert data["text"] == ["12:01", "km/h"]
+    assert data["conf"] == [91.0, 80.0]
+    assert data["left"] == [2, 50]
+    assert data["width"] == [38, 40]
+    assert data["height"] == [17, 17]
+    assert lib.images == [(200, 50, 1, 200)]
+    assert lib.deleted_texts == 2
+    assert lib.psm == capi.PSM_SINGLE_LINE
+
+    engine.close()
+    assert lib.ended
+    with pytest.raises(RuntimeError):
+        engine.image_to_data(image)
+
+
+def test_engine_plugs_into_process_frame_for_ocr(monkeypatch):
+    lib = FakeTessLib([("ABC", 95.0, (0, 0, 10, 10))])
+    monkeypatch.setattr(capi, "_load_library", lambda path: lib)
+
+    with TesseractCAPIEngine() as engine:
+        frame = np.zeros((40, 40, 3), dtype=np.uint8)
+        results = process_frame_for_ocr(
+            frame, 1.5, 1, 2, [ROI(0, 0, 20, 10)], 0.5, engine=engine)
+
+    assert len(results) == 1
+    assert results[0].text == "ABC"
+    assert results[0].confidence == pytest.approx(0.95)
+    assert lib.images == [(20, 10, 1, 20)]
+
+
+def test_cache_key_includes_model_path(monkeypatch):
+    monkeypatch.setattr(capi, "_load_library", lambda path: FakeTessLib([]))
+    fast = TesseractCAPIEngine(datapath="/usr/share/tessdata_fast")
+    best = TesseractCAPIEngine(datapath="/usr/share/tessdata_best")
+    assert fast.cache_key() != best.cache_key()
+    assert fast.cache_key() == TesseractCAPIEngine(datapath="/usr/share/tessdata_fast").cache_key()
+
+
+def test_init_failure_raises(monkeypatch):
+    monkeypatch.setattr(capi, "_load_library", lambda path: FakeTessLib([], init_result=-1))
+    with pytest.raises(RuntimeError):
+        TesseractCAPIEngine(lang="xyz")
+
+
+def test_missing_library_raises():
+    with pytest.raises(RuntimeError):
+        TesseractCAPIEngine(library_path="/nonexistent/libtesseract.so.5")
+
+
+@pytest.mark.skipif(not any(ctypes.util.find_library(n) for n in capi._LIBRARY_NAMES),
+                    reason="libtesseract not installed")
+def test_real_library_blank_image():
+    with TesseractCAPIEngine() as engine:
+        assert engine.version
+        data = engine.image_to_data(np.full((50, 200), 255, dtype=np.uint8))
+        assert "".join(data["text"]).strip() == ""
@@ -1,11 +1,14 @@
+import multiprocessing
 import os
 import tempfile
+import time
 import pytest
 import numpy as np
 import cv2
 
 from unittest.mock import MagicMock, patch
-from src.video_processor import Clip, FrameBatch, detect_clips, merge_clips, split_clip, extract_frames_for_clip
+from src.video_processor import Clip, FrameBatch, KeyframeIndex, ROIFrameBatch, SceneScores, build_keyframe_index, compute_scene_scores, load_scene_scores, load_keyframe_index, detect_clips, detect_clips_parallel, iter_detect_clips, merge_clips, split_clip, export_clip, extract_frames_for_clip, extract_frames_for_video, extract_frames_adaptive, extract_frames_and_detect_clips, extract_frames_parallel, iter_frames
+from src.config_manager import ROI
 from src.logger import AppError
 
 
@@ -39,6 +42,90 @@ def test_detect_clips_valid(mock_run, dummy_video):
     assert clips[2].end_time == dummy_video.duration
 
 
+@patch("subprocess.run")
+def test_detect_clips_low_resolution_command(mock_run, dummy_video):
+    mock_run.return_value = MagicMock(stderr="frame:0 pts_time:2.0\n", stdout="", returncode=0)
+    clips = detect_clips(dummy_video, scene_threshold=0.4, analysis_width=160,
+                         threads=2, lowres=1)
+    assert [(c.start_time, c.end_time) for c in clips] == [(0.0, 2.0), (2.0, 10.0)]
+
+    cmd = mock_run.call_args[0][0]
+    assert cmd.index("-threads") < cmd.index("-i")
+    assert cmd[cmd.index("-lowres") + 1] == "1"
+    graph = cmd[cmd.index("-filter_complex") + 1]
+    assert graph.startswith("scale=160:-2")
+    assert "select='gt(scene,0.4)',showinfo" in graph
+
+
+@pytest.mark.parametrize("kwargs", [{"analysis_width": 0}, {"threads": 0}, {"lowres": 4}])
+def test_detect_clips_invalid_low_resolution_args(dummy_video, kwargs):
+    with pytest.raises(ValueError):
+        detect_clips(dummy_video, **kwargs)
+
+
+class _LineStream:
+    """stderr stand-in that records how many lines have been consumed."""
+
+    def __init__(self, lines):
+        self.lines = [line.encode() + b"\n" for line in lines]
+        self.read = 0
+
+    def __iter__(self):
+        for line in self.lines:
+            self.read += 1
+            yield line
+
+    def close(self):
+        pass
+
+
+_SHOWINFO_LINES = [
+    "Input #0, mov,mp4,m4a,3gp,3g2,mj2, from 'test_video.mp4':",
+    "[Parsed_showinfo_1 @ 0x5581] n:   0 pts:  48000 pts_time:2.0     duration: 512",
+    "[Parsed_showinfo_1 @ 0x5581] n:   1 pts: 108000 pts_time:4.5     duration: 512",
+    "video:0kB audio:0kB subtitle:0kB",
+]
+
+
+@patch("subprocess.Popen")
+def test_iter_detect_clips_streams_cuts(mock_popen, dummy_video):
+    stream = _LineStream(_SHOWINFO_LINES)
+    process = MagicMock(stderr=stream)
+    process.wait.return_value = 0
+    mock_popen.return_value = process
+
+    clips = iter_detect_clips(dummy_video, scene_threshold=0.3)
+    mock_popen.assert_not_called()
+    first = next(clips)
+    assert (first.start_time, first.end_time) == (0.0, 2.0)
+    # The first clip arrives before ffmpeg's output has been read to the end
+    assert stream.read == 2
+    rest = list(clips)
+    assert [(c.start_time, c.end_time) for c in rest] == [(2.0, 4.5), (4.5, 10.0)]
+    assert "gt(scene,0.3)" in " ".join(mock_popen.call_args[0][0])
+    process.kill.assert_not_called()
+
+
+@patch("subprocess.Popen")
+def test_iter_detect_clips_failure_and_early_close(mock_popen, dummy_video):
+    failing = MagicMock(stderr=_LineStream(["Invalid data found when processing input"]))
+    failing.wait.return_value = 1
+    mock_popen.return_value = failing
+    with pytest.raises(AppError):
+        list(iter_detect_clips(dummy_video))
+
+    running = MagicMock(stderr=_LineStream(_SHOWINFO_LINES))
+    running.wait.return_value = -9
+    mock_popen.return_value = running
+    clips = iter_detect_clips(dummy_video)
+    next(clips)
+    clips.close()
+    running.kill.assert_called_once()
+
+    with pytest.raises(ValueError):
+        iter_detect_clips(dummy_video, scene_threshold=1.5)
+
+
 def test_merge_clips_success():
     clips = [Clip(1, 0.0, 5.0), Clip(1, 5.0, 10.0)]
     clips[0].clip_id = 101
@@ -90,3 +177,712 @@ def test_extract_frames_for_clip(mock_cv, mock_subproc, dummy_video):
     assert len(batch.frames) > 0
     assert len(batch.frames) == len(batch.timestamps)
     assert all(isinstance(f, np.ndarray) for f in batch.frames)
+
+
+def _sequential_capture(fps, n_frames):
+    frames = [np.full((4, 4, 3), i, dtype=np.uint8) for i in range(n_frames)]
+    state = {"pos": 0}
+    cap_mock = MagicMock()
+    cap_mock.isOpened.return_value = True
+    cap_mock.get.return_value = fps
+
+    def grab():
+        state["pos"] += 1
+        return state["pos"] <= n_frames
+
+    def retrieve():
+        return True, frames[state["pos"] - 1]
+
+    def read():
+        if not grab():
+            return False, None
+        return retrieve()
+
+    def set_prop(prop, value):
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            value = round(value / 1000.0 * fps)
+        state["pos"] = int(value)
+        return True
+
+    cap_mock.grab.side_effect = grab
+    cap_mock.retrieve.side_effect = retrieve
+    cap_mock.read.side_effect = read
+    cap_mock.set.side_effect = set_prop
+    return cap_mock
+
+
+@patch("cv2.VideoCapture")
+def test_extract_frames_for_clip_sequential(mock_cv, dummy_video):
+    cap_mock = _sequential_capture(fps=10.0, n_frames=30)
+    mock_cv.return_value = cap_mock
+    clip = Clip(1, 0.0, 3.0, file_path="clip.mp4")
+    clip.clip_id = 1
+
+    batch = extract_frames_for_clip(
+        clip, dummy_video, sampling_rate_fps=2, mode="sequential")
+
+    assert batch.timestamps == pytest.approx([0.0, 0.5, 1.0, 1.5, 2.0, 2.5])
+    assert [int(f[0, 0, 0]) for f in batch.frames] == [0, 5, 10, 15, 20, 25]
+    cap_mock.read.assert_not_called()
+    cap_mock.set.assert_not_called()
+
+
+@patch("cv2.VideoCapture")
+def test_extract_frames_for_clip_sequential_seeks_long_gaps(mock_cv, dummy_video):
+    cap_mock = _sequential_capture(fps=10.0, n_frames=30)
+    mock_cv.return_value = cap_mock
+    clip = Clip(1, 0.0, 3.0, file_path="clip.mp4")
+
+    batch = extract_frames_for_clip(
+        clip, dummy_video, sampling_rate_fps=0.5,
+        mode="sequential", seek_threshold_frames=5)
+
+    assert [int(f[0, 0, 0]) for f in batch.frames] == [0, 20]
+    cap_mock.set.assert_called_once_with(cv2.CAP_PROP_POS_FRAMES, 20)
+
+
+def test_extract_frames_for_clip_invalid_mode(dummy_video):
+    with pytest.raises(ValueError):
+        extract_frames_for_clip(Clip(1, 0.0, 1.0), dummy_video, 1.0, mode="bogus")
+
+
+def _fake_ffmpeg_process(payload, returncode=0, stderr=b""):
+    import io
+    process = MagicMock()
+    process.stdout = io.BytesIO(payload)
+    process.stderr = io.BytesIO(stderr)
+    process.wait.return_value = returncode
+    return process
+
+
+@patch("subprocess.Popen")
+def test_extract_frames_for_clip_ffmpeg_pipe(mock_popen, dummy_video):
+    dummy_video.resolution = (640, 480)
+    crop = ROI(10, 20, 8, 4)
+    frames = np.arange(3 * 4 * 8, dtype=np.uint8).reshape(3, 4, 8)
+    mock_popen.return_value = _fake_ffmpeg_process(frames.tobytes())
+    clip = Clip(1, 5.0, 6.5)
+
+    batch = extract_frames_for_clip(
+        clip, dummy_video, sampling_rate_fps=2, mode="ffmpeg",
+        crop=crop, grayscale=True)
+
+    cmd = mock_popen.call_args[0][0]
+    assert cmd[cmd.index("-ss") + 1] == "5.0"
+    assert cmd[cmd.index("-vf") + 1] == "fps=2,crop=8:4:10:20,format=gray"
+    assert batch.timestamps == pytest.approx([5.0, 5.5, 6.0])
+    for expected, actual in zip(frames, batch.frames):
+        assert actual.shape == (4, 8)
+        np.testing.assert_array_equal(actual, expected)
+    assert clip.file_path is None
+
+
+@patch("subprocess.Popen")
+def test_extract_frames_for_clip_ffmpeg_failure(mock_popen, dummy_video):
+    dummy_video.resolution = (4, 4)
+    mock_popen.return_value = _fake_ffmpeg_process(
+        b"", returncode=1, stderr=b"No such file")
+    with pytest.raises(AppError):
+        extract_frames_for_clip(
+            Clip(1, 0.0, 1.0), dummy_video, 1.0, mode="ffmpeg")
+
+
+def test_extract_frames_for_clip_crop_out_of_bounds(dummy_video):
+    dummy_video.resolution = (100, 100)
+    with pytest.raises(ValueError):
+        extract_frames_for_clip(
+            Clip(1, 0.0, 1.0), dummy_video, 1.0, mode="ffmpeg",
+            crop=ROI(90, 0, 20, 10))
+
+
+def test_roi_frame_batch_stores_only_crops():
+    rois = [ROI(0, 0, 4, 2), ROI(2, 3, 3, 3), ROI(8, 8, 5, 5)]
+    batch = ROIFrameBatch(clip_id=3, rois=rois, grayscale=True, capacity=2)
+    for i in range(5):
+        frame = np.full((10, 10, 3), i, dtype=np.uint8)
+        batch.add_frame(frame, timestamp=i * 0.5)
+
+    assert len(batch) == 5
+    np.testing.assert_allclose(batch.timestamps, [0.0, 0.5, 1.0, 1.5, 2.0])
+    first = batch.get_patches(0)
+    assert first.shape == (5, 2, 4)
+    assert [int(p[0, 0]) for p in first] == [0, 1, 2, 3, 4]
+    assert batch.get_patches(1).shape == (5, 3, 3)
+    # Out-of-bounds ROI is not stored
+    assert batch.get_patches(2) is None
+
+
+def test_roi_frame_batches_share_one_out_of_bounds_warning(caplog):
+    import src.roi_plan
+
+    src.roi_plan._roi_plan_cache.clear()
+    rois = [ROI(0, 0, 4, 2), ROI(8, 8, 5, 5)]
+    with caplog.at_level("WARNING"):
+        for clip_id in range(3):
+            batch = ROIFrameBatch(clip_id=clip_id, rois=rois, grayscale=False)
+            batch.add_frame(np.zeros((10, 10, 3), dtype=np.uint8), timestamp=0.0)
+            assert batch.get_patches(0).shape == (1, 2, 4, 3)
+            assert batch.get_patches(1) is None
+    warnings = [r for r in caplog.records if "out of bounds" in r.getMessage()]
+    assert len(warnings) == 1
+
+
+@patch("cv2.VideoCapture")
+def test_extract_frames_for_clip_with_rois(mock_cv, dummy_video):
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    cap_mock = MagicMock()
+    cap_mock.isOpened.return_value = True
+    cap_mock.read.side_effect = [(True, frame)] * 3 + [(False, None)]
+    mock_cv.return_value = cap_mock
+    clip = Clip(1, 0.0, 0.3, file_path="clip.mp4")
+
+    batch = extract_frames_for_clip(
+        clip, dummy_video, sampling_rate_fps=10,
+        grayscale=True, rois=[ROI(10, 10, 200, 50)])
+
+    assert isinstance(batch, ROIFrameBatch)
+    assert batch.get_patches(0).shape == (3, 50, 200)
+
+
+@patch("cv2.VideoCapture")
+def test_iter_frames_is_lazy(mock_cv, dummy_video):
+    cap_mock = _sequential_capture(fps=10.0, n_frames=30)
+    mock_cv.return_value = cap_mock
+    clip = Clip(1, 2.0, 5.0, file_path="clip.mp4")
+
+    frames = iter_frames(clip, dummy_video, 1.0, mode="sequential")
+    mock_cv.assert_not_called()
+    ts, frame = next(frames)
+    assert ts == 2.0 and int(frame[0, 0, 0]) == 20
+    frames.close()
+    cap_mock.release.assert_called_once()
+
+
+def test_iter_frames_validates_eagerly(dummy_video):
+    with pytest.raises(ValueError):
+        iter_frames(Clip(1, 0.0, 1.0), dummy_video, 0.0)
+
+
+@patch("subprocess.run")
+@patch("cv2.VideoCapture")
+def test_extract_frames_for_clip_decodes_source_window(mock_cv, mock_subproc, dummy_video):
+    cap_mock = _sequential_capture(fps=10.0, n_frames=100)
+    mock_cv.return_value = cap_mock
+    clip = Clip(1, 5.0, 6.0)
+
+    batch = extract_frames_for_clip(clip, dummy_video, 2, mode="seek")
+
+    mock_subproc.assert_not_called()
+    mock_cv.assert_called_once_with(dummy_video.source_path)
+    positions = [c.args[1] for c in cap_mock.set.call_args_list]
+    assert positions == pytest.approx([5000.0, 5500.0])
+    assert batch.timestamps == pytest.approx([5.0, 5.5])
+    assert clip.file_path is None
+
+
+@patch("subprocess.run")
+def test_export_clip(mock_run, dummy_video, tmp_path):
+    clip = Clip(1, 1.5, 4.0)
+    out = str(tmp_path / "clips" / "clip_1.mp4")
+    assert export_clip(clip, dummy_video, out) == out
+    cmd = mock_run.call_args[0][0]
+    assert cmd[cmd.index("-ss") + 1] == "1.5"
+    assert cmd[cmd.index("-to") + 1] == "4.0"
+    assert cmd[-1] == out
+    assert clip.file_path == out
+
+
+@patch("subprocess.run")
+def test_export_clip_failure(mock_run, dummy_video, tmp_path):
+    import subprocess
+    mock_run.side_effect = subprocess.CalledProcessError(1, "ffmpeg", stderr="boom")
+    clip = Clip(1, 0.0, 1.0)
+    with pytest.raises(AppError):
+        export_clip(clip, dummy_video, str(tmp_path / "c.mp4"))
+    assert clip.file_path is None
+
+
+@patch("cv2.VideoCapture")
+def test_extract_frames_for_video_single_pass(mock_cv, dummy_video):
+    cap_mock = _sequential_capture(fps=10.0, n_frames=100)
+    mock_cv.return_value = cap_mock
+    clips = [Clip(1, 4.0, 6.0), Clip(1, 0.0, 2.0), Clip(1, 2.0, 4.0)]
+    for i, c in enumerate(clips):
+        c.clip_id = i + 1
+
+    batches = extract_frames_for_video(dummy_video, clips, 1.0)
+
+    mock_cv.assert_called_once_with(dummy_video.source_path)
+    assert [b.clip_id for b in batches] == [1, 2, 3]
+    assert batches[0].timestamps == pytest.approx([4.0, 5.0])
+    assert batches[1].timestamps == pytest.approx([0.0, 1.0])
+    assert batches[2].timestamps == pytest.approx([2.0, 3.0])
+    assert [int(f[0, 0, 0]) for f in batches[2].frames] == [20, 30]
+    # Contiguous clips are walked forward without seeking
+    cap_mock.set.assert_not_called()
+
+
+def test_extract_frames_for_video_rejects_ffmpeg_mode(dummy_video):
+    with pytest.raises(ValueError):
+        extract_frames_for_video(dummy_video, [Clip(1, 0.0, 1.0)], 1.0, mode="ffmpeg")
+
+
+@patch("subprocess.Popen")
+def test_iter_frames_keyframes_snaps_to_nearest_keyframe(mock_popen, dummy_video):
+    dummy_video.resolution = (2, 2)
+    # Keyframes at 10.0, 12.0, 14.0, 16.0 (PTS relative to the -ss point)
+    keyframe_times = [0.0, 2.0, 4.0, 6.0]
+    frames = np.stack([np.full((2, 2), i, dtype=np.uint8) for i in range(4)])
+    stderr = "".join(
+        f"[Parsed_showinfo_0 @ 0x1] n:{i} pts:{int(t * 90000)} pts_time:{t:g} duration:1\n"
+        for i, t in enumerate(keyframe_times)).encode()
+    mock_popen.return_value = _fake_ffmpeg_process(frames.tobytes(), stderr=stderr)
+    clip = Clip(1, 10.0, 17.0)
+
+    samples = list(iter_frames(
+        clip, dummy_video, sampling_rate_fps=0.25, mode="keyframes", grayscale=True))
+
+    cmd = mock_popen.call_args[0][0]
+    assert cmd[cmd.index("-skip_frame") + 1] == "nokey"
+    assert cmd.index("-skip_frame") < cmd.index("-i")
+    # Sample grid 10, 14 -> keyframes 10 and 14; 12 and 16 are unused
+    assert [ts for ts, _ in samples] == pytest.approx([10.0, 14.0])
+    assert [int(f[0, 0]) for _, f in samples] == [0, 2]
+
+
+def test_keyframe_index_lookups():
+    # 10 fps, keyframe every 10 frames, packets in decode order
+    pts = np.arange(30) / 10.0
+    flags = (np.arange(30) % 10) == 0
+    order = np.random.RandomState(0).permutation(30)
+    index = KeyframeIndex(pts[order], flags[order])
+
+    assert len(index) == 30
+    np.testing.assert_allclose(index.keyframe_times, [0.0, 1.0, 2.0])
+    assert index.frame_at(1.25) == 13
+    assert index.frame_at(1.3) == 13
+    assert index.frame_at(5.0) == 30
+    assert index.keyframe_before(19) == 10
+    assert index.keyframe_time_before(1.95) == 1.0
+    assert index.keyframe_time_before(2.0) == 2.0
+
+
+@patch("subprocess.run")
+def test_build_keyframe_index(mock_run, dummy_video):
+    mock_run.return_value = MagicMock(
+        stdout="packet,0.000000,K__\npacket,0.066667,___\npacket,N/A,___\n"
+               "packet,0.033333,___\npacket,1.000000,K__\nstream,0.000000\n")
+    index = build_keyframe_index(dummy_video)
+    np.testing.assert_allclose(index.pts_times, [0.0, 0.033333, 0.066667, 1.0])
+    assert list(index.keyframe_flags) == [True, False, False, True]
+
+
+@patch("subprocess.run")
+def test_build_keyframe_index_counts_from_stream_start(mock_run, dummy_video):
+    # MPEG-TS style stream whose first PTS is 1.4s, with a B-frame delay
+    mock_run.return_value = MagicMock(
+        stdout="packet,1.466667,K__\npacket,1.533333,___\npacket,1.500000,___\n"
+               "packet,2.466667,K__\nstream,1.400000\n")
+    index = build_keyframe_index(dummy_video)
+    np.testing.assert_allclose(index.pts_times, [0.066667, 0.1, 0.133333, 1.066667])
+    assert index.keyframe_time_before(1.5) == pytest.approx(1.066667)
+
+    # Without a stream start_time the first PTS is time zero
+    mock_run.return_value = MagicMock(
+        stdout="packet,1.466667,K__\npacket,2.466667,K__\nstream,N/A\n")
+    np.testing.assert_allclose(build_keyframe_index(dummy_video).pts_times, [0.0, 1.0])
+
+
+@patch("src.video_processor.build_keyframe_index")
+def test_load_keyframe_index_uses_db(mock_build, tmp_path):
+    from src.db_manager import DBManager
+    import src.video_processor as vp
+
+    db = DBManager(db_path=str(tmp_path / "wm.db"))
+    video_id = db.insert_video("file", "/v.mp4", None, 3.0, 64, 48, "2025-06-06T11:00:00")
+    video = MagicMock(video_id=video_id, source_path=str(tmp_path / "v.mp4"))
+    mock_build.return_value = KeyframeIndex(np.array([0.0, 0.5]), np.array([True, False]))
+
+    first = load_keyframe_index(video, db)
+    assert load_keyframe_index(video, db) is first
+    mock_build.assert_called_once()
+
+    # A new process finds the stored index instead of re-scanning
+    vp._keyframe_index_cache.clear()
+    again = load_keyframe_index(video, db)
+    mock_build.assert_called_once()
+    np.testing.assert_allclose(again.pts_times, [0.0, 0.5])
+    vp._keyframe_index_cache.clear()
+    db.conn.close()
+
+
+@patch("cv2.VideoCapture")
+def test_extract_frames_for_clip_sequential_with_keyframe_index(mock_cv, dummy_video):
+    cap_mock = _sequential_capture(fps=10.0, n_frames=100)
+    mock_cv.return_value = cap_mock
+    # Real frames are offset by 0.02s from the nominal 10 fps grid
+    pts = np.arange(100) / 10.0 + 0.02
+    index = KeyframeIndex(pts, (np.arange(100) % 25) == 0)
+    clip = Clip(1, 5.0, 7.0)
+
+    batch = extract_frames_for_clip(
+        clip, dummy_video, 1.0, mode="sequential", keyframe_index=index)
+
+    # 5.0 -> frame 50 (seek from keyframe 50 is free); 6.0 -> frame 60 by grabbing
+    assert batch.timestamps == pytest.approx([5.02, 6.02])
+    assert [int(f[0, 0, 0]) for f in batch.frames] == [50, 60]
+    cap_mock.set.assert_called_once_with(cv2.CAP_PROP_POS_FRAMES, 50)
+
+
+@patch("subprocess.run")
+def test_export_clip_starts_at_indexed_keyframe(mock_run, dummy_video, tmp_path):
+    index = KeyframeIndex(np.arange(100) / 10.0, (np.arange(100) % 25) == 0)
+    export_clip(Clip(1, 6.3, 8.0), dummy_video, str(tmp_path / "c.mp4"), keyframe_index=index)
+    cmd = mock_run.call_args[0][0]
+    assert cmd[cmd.index("-ss") + 1] == "5.0"
+
+
+@pytest.fixture
+def synthetic_video(tmp_path):
+    """
+    A real 4-second, 10 fps MJPEG file whose frame i is filled with value 2*i.
+    """
+    path = str(tmp_path / "synthetic.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10.0, (32, 24))
+    if not writer.isOpened():
+        pytest.skip("OpenCV cannot write MJPEG video here")
+    for i in range(40):
+        writer.write(np.full((24, 32, 3), 2 * i, dtype=np.uint8))
+    writer.release()
+    return MagicMock(video_id=1, source_path=path, duration=4.0, resolution=(32, 24))
+
+
+@pytest.mark.parametrize("mode", ["seek", "sequential"])
+def test_extract_frames_parallel_matches_single_process(synthetic_video, mode):
+    clip = Clip(1, 0.5, 3.7)
+    clip.clip_id = 4
+
+    single = extract_frames_for_clip(clip, synthetic_video, 3.0, mode=mode)
+    parallel = extract_frames_parallel(clip, synthetic_video, 3.0, workers=3, mode=mode)
+
+    assert parallel.clip_id == 4
+    assert len(single.frames) == 10
+    assert parallel.timestamps == pytest.approx(single.timestamps)
+    for a, b in zip(single.frames, parallel.frames):
+        np.testing.assert_array_equal(a, b)
+
+
+@patch("src.video_processor.load_keyframe_index")
+def test_extract_frames_parallel_loads_keyframe_index(mock_load, synthetic_video):
+    mock_load.return_value = KeyframeIndex(np.arange(40) / 10.0, np.arange(40) % 10 == 0)
+    clip = Clip(1, 0.0, 4.0)
+    single = extract_frames_for_clip(clip, synthetic_video, 5.0, mode="seek")
+    parallel = extract_frames_parallel(clip, synthetic_video, 5.0, workers=3, mode="seek")
+    mock_load.assert_called_once_with(synthetic_video)
+    assert parallel.timestamps == pytest.approx(single.timestamps)
+    for a, b in zip(single.frames, parallel.frames):
+        np.testing.assert_array_equal(a, b)
+
+    # Without ffprobe, frames are still decoded on unaligned segments
+    mock_load.side_effect = FileNotFoundError("ffprobe")
+    unaligned = extract_frames_parallel(clip, synthetic_video, 5.0, workers=3, mode="seek")
+    assert unaligned.timestamps == pytest.approx(single.timestamps)
+
+
+def test_extract_frames_parallel_invalid_workers(dummy_video):
+    with pytest.raises(ValueError):
+        extract_frames_parallel(Clip(1, 0.0, 1.0), dummy_video, 1.0, workers=0)
+
+
+def test_extract_frames_parallel_shared_memory_transport(synthetic_video):
+    clip = Clip(1, 0.0, 4.0)
+    single = extract_frames_for_clip(clip, synthetic_video, 5.0, mode="sequential", grayscale=True)
+    shared = extract_frames_parallel(
+        clip, synthetic_video, 5.0, workers=2, grayscale=True,
+        transport="shared_memory", ring_slots=2)
+
+    assert shared.timestamps == pytest.approx(single.timestamps)
+    for a, b in zip(single.frames, shared.frames):
+        assert b.shape == (24, 32)
+        np.testing.assert_array_equal(a, b)
+
+
+def _fail_last_segment(capture, times, *args):
+    # Stands in for _read_frames: the segment starting at 1000s fails once
+    # the others have filled the ring, the others produce frames slowly
+    if times[0] >= 1000.0:
+        time.sleep(0.3)
+        raise RuntimeError("corrupt segment")
+    for t in times:
+        time.sleep(0.1)
+        yield t, np.zeros((24, 32, 3), dtype=np.uint8)
+
+
+def test_shared_memory_transport_cancels_workers_on_failure(synthetic_video, monkeypatch):
+    import src.video_processor as vp
+
+    if multiprocessing.get_start_method() != "fork":
+        pytest.skip("workers only see the patched reader when forked")
+    monkeypatch.setattr(vp, "_read_frames", _fail_last_segment)
+    segments = [[float(t) for t in range(40)], [float(t) for t in range(40, 80)],
+                [1000.0]]
+    start = time.monotonic()
+    with pytest.raises(RuntimeError, match="corrupt segment"):
+        vp._decode_segments_shared(synthetic_video.source_path, segments, 3, 1,
+                                   (24, 32, 3), "sequential", None, None, False, None)
+    # The healthy segments are cancelled instead of running to completion
+    assert time.monotonic() - start < 3.0
+
+
+@pytest.fixture
+def step_video(tmp_path):
+    """
+    A 4-second, 10 fps MJPEG file showing value 0, then 100 from frame 13
+    (1.3 s), then 200 from frame 27 (2.7 s).
+    """
+    path = str(tmp_path / "steps.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10.0, (32, 24))
+    if not writer.isOpened():
+        pytest.skip("OpenCV cannot write MJPEG video here")
+    for i in range(40):
+        writer.write(np.full((24, 32, 3), 0 if i < 13 else 100 if i < 27 else 200,
+                             dtype=np.uint8))
+    writer.release()
+    return MagicMock(video_id=1, source_path=path, duration=4.0, resolution=(32, 24))
+
+
+def test_extract_frames_adaptive_finds_exact_transitions(step_video):
+    clip = Clip(1, 0.0, 4.0)
+    clip.clip_id = 2
+    index = KeyframeIndex([i / 10.0 for i in range(40)], [True] * 40)
+    compared = []
+
+    def change_fn(previous, current):
+        compared.append(current)
+        return abs(int(previous[0, 0, 0]) - int(current[0, 0, 0])) > 10
+
+    batch = extract_frames_adaptive(clip, step_video, coarse_fps=1.0, resolution=0.01,
+                                    change_fn=change_fn, keyframe_index=index)
+    assert batch.clip_id == 2
+    assert batch.timestamps == pytest.approx([0.0, 1.3, 2.7])
+    assert [int(f[0, 0, 0]) for f in batch.frames] == pytest.approx([0, 100, 200], abs=3)
+    # Three coarse comparisons plus a few bisection steps per transition,
+    # instead of decoding all 40 frames
+    assert len(compared) < 15
+
+
+def test_extract_frames_adaptive_default_comparator_and_rois(step_video):
+    clip = Clip(1, 0.0, 4.0)
+    rois = [ROI(0, 0, 8, 8)]
+    batch = extract_frames_adaptive(clip, step_video, coarse_fps=1.0, resolution=0.1,
+                                    rois=rois, grayscale=True)
+    assert isinstance(batch, ROIFrameBatch)
+    assert len(batch.timestamps) == 3
+    assert 1.2 <= batch.timestamps[1] <= 1.4
+    assert 2.6 <= batch.timestamps[2] <= 2.8
+    assert batch.get_patches(0).shape == (3, 8, 8)
+
+    # A threshold above every step sees no transitions
+    quiet = extract_frames_adaptive(clip, step_video, change_threshold=150.0)
+    assert quiet.timestamps == [0.0]
+
+
+def test_extract_frames_adaptive_invalid_resolution(dummy_video):
+    with pytest.raises(ValueError):
+        extract_frames_adaptive(Clip(1, 0.0, 1.0), dummy_video, resolution=0)
+
+
+_METADATA_OUTPUT = """frame:0    pts:0       pts_time:0
+lavfi.scene_score=0.000000
+frame:1    pts:512     pts_time:0.5
+lavfi.scene_score=0.520000
+frame:2    pts:1024    pts_time:1
+lavfi.scene_score=0.310000
+frame:3    pts:1536    pts_time:1.5
+lavfi.scene_score=0.050000
+"""
+
+
+@patch("subprocess.run")
+def test_compute_scene_scores_parses_ffmpeg_metadata(mock_run, dummy_video):
+    mock_run.return_value = MagicMock(stdout=_METADATA_OUTPUT, stderr="", returncode=0)
+    scores = compute_scene_scores(dummy_video, analysis_width=160)
+
+    assert len(scores) == 4
+    np.testing.assert_allclose(scores.pts_times, [0.0, 0.5, 1.0, 1.5])
+    np.testing.assert_allclose(scores.scores, [0.0, 0.52, 0.31, 0.05], rtol=1e-6)
+    graph = mock_run.call_args[0][0][mock_run.call_args[0][0].index("-filter_complex") + 1]
+    assert graph == "scale=160:-2:flags=fast_bilinear,select='gte(scene,0)',metadata=print:file=-"
+
+
+@patch("subprocess.run")
+def test_detect_clips_from_scene_scores_needs_no_decode(mock_run, dummy_video):
+    scores = SceneScores(np.array([0.0, 0.5, 1.0, 1.5]), np.array([0.0, 0.52, 0.31, 0.4]))
+    clips = detect_clips(dummy_video, scene_threshold=0.4, scene_scores=scores)
+    assert [(c.start_time, c.end_time) for c in clips] == [(0.0, 0.5), (0.5, 10.0)]
+    # Strictly greater than, like gt(scene,threshold)
+    clips = detect_clips(dummy_video, scene_threshold=0.3, scene_scores=scores)
+    assert [c.start_time for c in clips] == [0.0, 0.5, 1.0, 1.5]
+    mock_run.assert_not_called()
+    with pytest.raises(ValueError):
+        detect_clips(dummy_video, scene_threshold=0.0, scene_scores=scores)
+
+
+def test_compute_scene_scores_numpy_fallback(step_video):
+    with patch("subprocess.run", side_effect=FileNotFoundError("ffmpeg")):
+        scores = compute_scene_scores(step_video, analysis_width=16)
+    assert len(scores) == 40
+    assert scores.method == "numpy"
+    assert scores.scores[0] == 0.0
+    # A 0 -> 100 step scores 100/256, as ffmpeg normalizes 8-bit planes
+    assert scores.scores[13] == pytest.approx(100 / 256, abs=0.02)
+    np.testing.assert_allclose(scores.pts_times[:3], [0.0, 0.1, 0.2], atol=1e-6)
+    # The two steps are the only frames above a small threshold
+    np.testing.assert_allclose(scores.cut_times(0.1), [1.3, 2.7], atol=1e-6)
+
+    with patch("subprocess.run", side_effect=FileNotFoundError("ffmpeg")):
+        with pytest.raises(AppError):
+            compute_scene_scores(step_video, method="ffmpeg")
+    with pytest.raises(ValueError):
+        compute_scene_scores(step_video, method="opencv")
+
+
+@patch("src.video_processor.compute_scene_scores")
+def test_load_scene_scores_uses_db(mock_compute, tmp_path):
+    from src.db_manager import DBManager
+    import src.video_processor as vp
+
+    db = DBManager(db_path=str(tmp_path / "wm.db"))
+    video_id = db.insert_video("file", "/v.mp4", None, 3.0, 64, 48, "2025-06-06T11:00:00")
+    video = MagicMock(video_id=video_id, source_path=str(tmp_path / "v.mp4"))
+    mock_compute.return_value = SceneScores(np.array([0.0, 0.5]), np.array([0.0, 0.6]))
+
+    first = load_scene_scores(video, db, analysis_width=160)
+    assert load_scene_scores(video, db, analysis_width=160) is first
+    mock_compute.assert_called_once()
+
+    # A new process finds the stored scores; other settings are recomputed
+    vp._scene_scores_cache.clear()
+    again = load_scene_scores(video, db, analysis_width=160)
+    mock_compute.assert_called_once()
+    np.testing.assert_allclose(again.scores, [0.0, 0.6])
+    load_scene_scores(video, db, analysis_width=320)
+    assert mock_compute.call_count == 2
+    vp._scene_scores_cache.clear()
+    db.conn.close()
+
+
+@patch("src.video_processor.compute_scene_scores")
+def test_load_scene_scores_keys_on_backend(mock_compute, tmp_path):
+    from src.db_manager import DBManager
+    import src.video_processor as vp
+
+    db = DBManager(db_path=str(tmp_path / "wm.db"))
+    video_id = db.insert_video("file", "/v.mp4", None, 3.0, 64, 48, "2025-06-06T11:00:00")
+    video = MagicMock(video_id=video_id, source_path=str(tmp_path / "v.mp4"))
+    # "auto" fell back to numpy because ffmpeg was missing
+    mock_compute.return_value = SceneScores(np.array([0.0, 0.5]), np.array([0.0, 0.3]),
+                                            method="numpy")
+    load_scene_scores(video, db, analysis_width=160)
+    assert db.get_scene_scores(video_id)[0] == "numpy:width=160,lowres=0"
+
+    vp._scene_scores_cache.clear()
+    assert load_scene_scores(video, db, analysis_width=160).method == "numpy"
+    assert mock_compute.call_count == 1
+
+    # Callers asking for ffmpeg scores never get the numpy ones
+    mock_compute.return_value = SceneScores(np.array([0.0, 0.5]), np.array([0.0, 0.6]))
+    ffmpeg_scores = load_scene_scores(video, db, analysis_width=160, method="ffmpeg")
+    assert ffmpeg_scores.method == "ffmpeg"
+    assert mock_compute.call_count == 2
+    assert db.get_scene_scores(video_id)[0] == "ffmpeg:width=160,lowres=0"
+    vp._scene_scores_cache.clear()
+    db.conn.close()
+
+
+def _showinfo(times):
+    return "".join(f"[Parsed_showinfo_1 @ 0x1] n:{i} pts_time:{t}\n" for i, t in enumerate(times))
+
+
+@patch("subprocess.run")
+@pytest.mark.parametrize("stream_start", [0.0, 1.4])
+def test_detect_clips_parallel_stitches_keyframe_segments(mock_run, dummy_video, stream_start):
+    # 10 s at 10 fps, keyframe every 2 s; times count from the start of the
+    # file, as in the keyframe index
+    index = KeyframeIndex(np.arange(100) / 10.0, (np.arange(100) % 20) == 0)
+    true_cuts = [1.5, 4.0, 4.3, 7.9]
+
+    def fake_ffmpeg(cmd, **kwargs):
+        start = float(cmd[cmd.index("-ss") + 1]) if "-ss" in cmd else 0.0
+        end = float(cmd[cmd.index("-to") + 1]) if "-to" in cmd else 10.0
+        # The first frame ffmpeg decodes has no history; the warm-up
+        # stretch before the segment reports its cuts too
+        seen = [t for t in true_cuts if start < t < end]
+        # showinfo counts from the seek point, or reports the raw stream
+        # PTS (which starts at stream_start) with -copyts
+        shift = stream_start if "-copyts" in cmd else -start
+        return MagicMock(stderr=_showinfo([t + shift for t in seen]), returncode=0)
+
+    mock_run.side_effect = fake_ffmpeg
+    clips = detect_clips_parallel(dummy_video, scene_threshold=0.4, workers=3,
+                                  keyframe_index=index)
+
+    assert [c.start_time for c in clips[1:]] == true_cuts
+    assert clips[-1].end_time == dummy_video.duration
+    commands = [call[0][0] for call in mock_run.call_args_list]
+    assert len(commands) == 3
+    # Segments start at keyframes 2.0 and 6.0; ffmpeg starts one keyframe earlier
+    starts = sorted(float(c[c.index("-ss") + 1]) for c in commands if "-ss" in c)
+    assert starts == [0.0, 4.0]
+    ends = sorted(float(c[c.index("-to") + 1]) for c in commands if "-to" in c)
+    assert ends == [2.0, 6.0]
+    assert all(c.index("-ss") < c.index("-i") for c in commands if "-ss" in c)
+
+
+@patch("subprocess.run")
+def test_detect_clips_parallel_errors(mock_run, dummy_video):
+    index = KeyframeIndex(np.arange(100) / 10.0, (np.arange(100) % 20) == 0)
+    with pytest.raises(ValueError):
+        detect_clips_parallel(dummy_video, workers=0, keyframe_index=index)
+    with pytest.raises(ValueError):
+        detect_clips_parallel(dummy_video, scene_threshold=1.0, keyframe_index=index)
+
+    import subprocess
+    mock_run.side_effect = subprocess.CalledProcessError(1, "ffmpeg", stderr="boom")
+    with pytest.raises(AppError):
+        detect_clips_parallel(dummy_video, workers=2, keyframe_index=index)
+
+
+def test_extract_frames_and_detect_clips_single_pass(step_video):
+    with patch("cv2.VideoCapture", wraps=cv2.VideoCapture) as opened:
+        results = extract_frames_and_detect_clips(step_video, sampling_rate_fps=2.0,
+                                                  scene_threshold=0.4)
+    opened.assert_called_once()
+
+    clips = [clip for clip, _ in results]
+    assert [(c.start_time, c.end_time) for c in clips] == pytest.approx(
+        [(0.0, 1.3), (1.3, 2.7), (2.7, 4.0)])
+    # The sampling grid restarts at every cut
+    assert [b.timestamps for _, b in results] == [
+        pytest.approx([0.0, 0.5, 1.0]),
+        pytest.approx([1.3, 1.8, 2.3]),
+        pytest.approx([2.7, 3.2, 3.7])]
+    assert [int(b.frames[0][0, 0, 0]) for _, b in results] == pytest.approx([0, 100, 200], abs=3)
+
+
+def test_extract_frames_and_detect_clips_rois_and_threshold(step_video):
+    rois = [ROI(0, 0, 4, 4)]
+    results = extract_frames_and_detect_clips(step_video, 1.0, scene_threshold=0.99,
+                                              rois=rois, grayscale=True)
+    # Each step moves every pixel to another bin (distance 1.0), so even a
+    # 0.99 threshold sees it
+    assert len(results) == 3
+    assert all(isinstance(b, ROIFrameBatch) for _, b in results)
+    assert results[0][1].get_patches(0).shape == (2, 4, 4)
+
+    with pytest.raises(ValueError):
+        extract_frames_and_detect_clips(step_video, 1.0, scene_threshold=1.0)
+    with pytest.raises(ValueError):
+        extract_frames_and_detect_clips(step_video, 1.0, histogram_bins=1)
+    with pytest.raises(ValueError):
+        extract_frames_and_detect_clips(step_video, 0)